@@ -0,0 +1,63 @@
+"""
+Compare scanning chat messages for conversions with the conversion regex
+alone against checking for braces first.
+
+Usage: python benchmarks/bench_conversion_prefilter.py [repeat]
+"""
+
+import sys
+import timeit
+
+from sandpiper.conversion.cog import conversion_pattern
+
+# Mostly ordinary chat, with the occasional conversion
+CORPUS = [
+    "lol yeah",
+    "are we still playing tonight?",
+    "I'll be on after dinner, probably around 8",
+    "did anyone see the new trailer",
+    "```py\nprint('hello world')\n```",
+    "no way that's so cool!!",
+    "brb",
+    "it's like {30f} outside right now",
+    "https://example.com/some/long/link?with=query&params=true",
+    "can you review my PR when you get a chance? it's the one about the "
+    "database migrations",
+    "let's meet at {9pm london}",
+    "ok",
+    "hahaha",
+    "my cat just knocked my coffee over",
+    "I ran {5 km} today",
+    "good night everyone",
+]
+
+
+def scan_regex(content: str):
+    return conversion_pattern.findall(content)
+
+
+def scan_prefiltered(content: str):
+    if "{" not in content or "}" not in content:
+        return []
+    return conversion_pattern.findall(content)
+
+
+def main(repeat: int = 5000):
+    for content in CORPUS:
+        assert scan_regex(content) == scan_prefiltered(content), content
+
+    n = len(CORPUS) * repeat
+    for fn in (scan_regex, scan_prefiltered):
+        time = min(
+            timeit.repeat(
+                lambda: [fn(content) for content in CORPUS], number=repeat, repeat=3
+            )
+        )
+        print(f"{fn.__name__:<18} {time / n * 1e6:8.3f} us/message")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print("Usage: bench_conversion_prefilter.py [repeat]")
+    else:
+        main(*map(int, sys.argv[1:2]))
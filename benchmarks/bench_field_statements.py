@@ -0,0 +1,55 @@
+"""
+Compare building a field lookup statement on every call against reusing a
+prebuilt statement with a bound parameter, like DatabaseSQLite does.
+
+Usage: python benchmarks/bench_field_statements.py [repeat]
+"""
+
+import sys
+import timeit
+
+import sqlalchemy as sa
+
+from sandpiper.user_data.models import Base, User
+
+FIELDS = ["preferred_name", "pronouns", "birthday", "timezone", "privacy_timezone"]
+USER_ID = 123456789012345678
+
+engine = sa.create_engine("sqlite://", future=True)
+Base.metadata.create_all(engine)
+with engine.begin() as conn:
+    conn.execute(sa.insert(User).values(user_id=USER_ID, preferred_name="Greg"))
+
+prebuilt = {
+    name: sa.select(getattr(User, name)).where(
+        User.user_id == sa.bindparam("user_id", type_=User.user_id.type)
+    )
+    for name in FIELDS
+}
+
+
+def build_each_call(conn: sa.engine.Connection):
+    for name in FIELDS:
+        conn.execute(
+            sa.select(getattr(User, name)).where(User.user_id == USER_ID)
+        ).scalar()
+
+
+def reuse_prebuilt(conn: sa.engine.Connection):
+    for name in FIELDS:
+        conn.execute(prebuilt[name], {"user_id": USER_ID}).scalar()
+
+
+def main(repeat: int = 5000):
+    n = len(FIELDS) * repeat
+    with engine.connect() as conn:
+        for fn in (build_each_call, reuse_prebuilt):
+            time = min(timeit.repeat(lambda: fn(conn), number=repeat, repeat=3))
+            print(f"{fn.__name__:<16} {time / n * 1e6:8.2f} us/query")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print("Usage: bench_field_statements.py [repeat]")
+    else:
+        main(*map(int, sys.argv[1:2]))
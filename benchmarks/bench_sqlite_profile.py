@@ -0,0 +1,76 @@
+"""
+Compare a file database using SQLite's and SQLAlchemy's default settings
+against the default SQLiteEngineProfile (WAL, pragmas, and a connection pool),
+under a mix of concurrent reads and occasional writes.
+
+Usage: python benchmarks/bench_sqlite_profile.py [repeat]
+"""
+
+import asyncio
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+import pytz
+
+from sandpiper.user_data import DatabaseSQLite, PrivacyType, SQLiteEngineProfile
+
+USERS = 200
+TIMEZONES = ["America/New_York", "Europe/London", "Europe/Amsterdam", "Asia/Tokyo"]
+# Concurrent requests per batch, and how many of them are writes
+BATCH_SIZE = 20
+WRITES_PER_BATCH = 2
+
+
+async def seed(db: DatabaseSQLite):
+    for user_id in range(1, USERS + 1):
+        tz = pytz.timezone(TIMEZONES[user_id % len(TIMEZONES)])
+        await db.set_timezone(user_id, tz)
+        await db.set_privacy_timezone(user_id, PrivacyType.PUBLIC)
+
+
+async def run_batch(db: DatabaseSQLite, batch: int):
+    requests = []
+    for i in range(BATCH_SIZE):
+        user_id = (batch * BATCH_SIZE + i) % USERS + 1
+        if i < WRITES_PER_BATCH:
+            requests.append(db.set_preferred_name(user_id, f"User {batch}"))
+        elif i % 5 == 0:
+            requests.append(db.get_all_timezones())
+        else:
+            requests.append(db.get_user_snapshot(user_id))
+    await asyncio.gather(*requests)
+
+
+async def bench(name: str, profile: SQLiteEngineProfile, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DatabaseSQLite(Path(tmp_dir) / "bench.db", profile)
+        await db.connect()
+        try:
+            await seed(db)
+            start = time.perf_counter()
+            for batch in range(repeat):
+                await run_batch(db, batch)
+            elapsed = time.perf_counter() - start
+        finally:
+            await db.disconnect()
+
+    n = repeat * BATCH_SIZE
+    print(f"{name:<16} {elapsed / n * 1e6:8.1f} us/request")
+
+
+async def main_async(repeat: int):
+    await bench("sqlite defaults", SQLiteEngineProfile.sqlite_defaults(), repeat)
+    await bench("tuned profile", SQLiteEngineProfile(), repeat)
+
+
+def main(repeat: int = 100):
+    asyncio.run(main_async(repeat))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print("Usage: bench_sqlite_profile.py [repeat]")
+    else:
+        main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,66 @@
+"""
+Compare parsing quantities with the simple quantity parser against pint's
+expression parser.
+
+Usage: python benchmarks/bench_unit_parsing.py [repeat]
+"""
+
+import sys
+import timeit
+
+from sandpiper.conversion import unit_conversion
+
+# Quantities like the ones people actually write in {conversion blocks}
+CORPUS = [
+    "5 km",
+    "72F",
+    "30f",
+    "-1.11c",
+    "180 lb",
+    "180 lbs",
+    "2 kg",
+    "6 ft",
+    "3 feet",
+    "10 miles",
+    "65 mph",
+    "100 kph",
+    "1.5 l",
+    "2 cups",
+    "500 ml",
+    "25 °C",
+    "8 oz",
+    "12 stone",
+    "5 hectares",
+    "30 psi",
+]
+
+
+def main(repeat: int = 2000):
+    ureg = unit_conversion.get_registry()
+    for quantity_str in CORPUS:
+        expected = ureg.parse_expression(quantity_str)
+        quantity = unit_conversion._parse_simple_quantity(quantity_str)
+        assert quantity is not None, quantity_str
+        assert (quantity.m, quantity.u) == (expected.m, expected.u), quantity_str
+
+    def parse_pint():
+        for quantity_str in CORPUS:
+            ureg.parse_expression(quantity_str)
+
+    def parse_simple():
+        for quantity_str in CORPUS:
+            unit_conversion._parse_simple_quantity(quantity_str)
+
+    n = len(CORPUS) * repeat
+    pint_time = min(timeit.repeat(parse_pint, number=repeat, repeat=3))
+    simple_time = min(timeit.repeat(parse_simple, number=repeat, repeat=3))
+    print(f"pint parse_expression:   {pint_time / n * 1e6:8.2f} us/quantity")
+    print(f"simple quantity parser:  {simple_time / n * 1e6:8.2f} us/quantity")
+    print(f"speedup:                 {pint_time / simple_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "-h":
+        print("Usage: bench_unit_parsing.py [repeat]")
+    else:
+        main(*map(int, sys.argv[1:2]))
@@ -1,7 +1,7 @@
 __all__ = ["Bios"]
 
 import logging
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 import discord
 from discord.ext.commands import BadArgument
@@ -14,6 +14,9 @@ from sandpiper.common.time import format_date, fuzzy_match_timezone
 from sandpiper.user_data import *
 from .strings import *
 
+if TYPE_CHECKING:
+    from sandpiper.conversion import Conversion
+
 logger = logging.getLogger("sandpiper.bios")
 
 
@@ -104,8 +107,9 @@ class Bios(commands.Cog):
             "privacy timezone",
         ):
             logger.debug(
-                f"Notifying birthdays cog about change from command "
-                f"{ctx.command.qualified_name} (user_id={ctx.author.id})"
+                "Notifying birthdays cog about change from command %s (user_id=%s)",
+                ctx.command.qualified_name,
+                ctx.author.id,
             )
             birthdays_cog: Birthdays
             birthdays_cog = self.bot.get_cog("Birthdays")
@@ -114,6 +118,30 @@ class Bios(commands.Cog):
                 return
             await birthdays_cog.notify_change(ctx.author.id)
 
+    @commands.Cog.listener("on_command_completion")
+    async def notify_conversion_cog(self, ctx: commands.Context):
+        if ctx.command_failed:
+            return
+
+        if ctx.command.qualified_name in (
+            "bio delete",
+            "timezone set",
+            "timezone delete",
+            "privacy all",
+            "privacy timezone",
+        ):
+            logger.debug(
+                "Notifying conversion cog about change from command %s (user_id=%s)",
+                ctx.command.qualified_name,
+                ctx.author.id,
+            )
+            conversion_cog: Conversion
+            conversion_cog = self.bot.get_cog("Conversion")
+            if conversion_cog is None:
+                logger.debug("No conversion cog loaded; skipping change notification")
+                return
+            await conversion_cog.notify_timezone_change(ctx.author.id)
+
     @auto_order
     @commands.group(
         brief="Personal info commands.",
@@ -134,27 +162,18 @@ class Bios(commands.Cog):
         user_id: int = ctx.author.id
         db = await self._get_database()
 
-        preferred_name = await db.get_preferred_name(user_id)
-        pronouns = await db.get_pronouns(user_id)
-        birthday = await db.get_birthday(user_id)
-        birthday = format_date(birthday)
-        age = await db.get_age(user_id)
+        user = await db.get_user_snapshot(user_id)
+        birthday = format_date(user.birthday)
+        age = user.get_age()
         age = age if age is not None else "N/A"
-        timezone = await db.get_timezone(user_id)
-
-        p_preferred_name = await db.get_privacy_preferred_name(user_id)
-        p_pronouns = await db.get_privacy_pronouns(user_id)
-        p_birthday = await db.get_privacy_birthday(user_id)
-        p_age = await db.get_privacy_age(user_id)
-        p_timezone = await db.get_privacy_timezone(user_id)
 
         await InfoEmbed(
             [
-                user_info_str("Name", preferred_name, p_preferred_name),
-                user_info_str("Pronouns", pronouns, p_pronouns),
-                user_info_str("Birthday", birthday, p_birthday),
-                user_info_str("Age", age, p_age),
-                user_info_str("Timezone", timezone, p_timezone),
+                user_info_str("Name", user.preferred_name, user.privacy_preferred_name),
+                user_info_str("Pronouns", user.pronouns, user.privacy_pronouns),
+                user_info_str("Birthday", birthday, user.privacy_birthday),
+                user_info_str("Age", age, user.privacy_age),
+                user_info_str("Timezone", user.timezone, user.privacy_timezone),
             ]
         ).send(ctx)
 
@@ -197,11 +216,14 @@ class Bios(commands.Cog):
     async def privacy_all(self, ctx: commands.Context, new_privacy: privacy_handler):
         user_id: int = ctx.author.id
         db = await self._get_database()
-        await db.set_privacy_preferred_name(user_id, new_privacy)
-        await db.set_privacy_pronouns(user_id, new_privacy)
-        await db.set_privacy_birthday(user_id, new_privacy)
-        await db.set_privacy_age(user_id, new_privacy)
-        await db.set_privacy_timezone(user_id, new_privacy)
+        await db.update_user(
+            user_id,
+            privacy_preferred_name=new_privacy,
+            privacy_pronouns=new_privacy,
+            privacy_birthday=new_privacy,
+            privacy_age=new_privacy,
+            privacy_timezone=new_privacy,
+        )
 
         embed = SuccessEmbed("All privacies set!", join="\n\n")
         if new_privacy is PrivacyType.PUBLIC:
@@ -224,7 +246,7 @@ class Bios(commands.Cog):
     async def privacy_name(self, ctx: commands.Context, new_privacy: privacy_handler):
         user_id: int = ctx.author.id
         db = await self._get_database()
-        await db.set_privacy_preferred_name(user_id, new_privacy)
+        await db.update_user(user_id, privacy_preferred_name=new_privacy)
         await SuccessEmbed("Name privacy set!").send(ctx)
 
     @auto_order
@@ -239,7 +261,7 @@ class Bios(commands.Cog):
     ):
         user_id: int = ctx.author.id
         db = await self._get_database()
-        await db.set_privacy_pronouns(user_id, new_privacy)
+        await db.update_user(user_id, privacy_pronouns=new_privacy)
         await SuccessEmbed("Pronouns privacy set!").send(ctx)
 
     @auto_order
@@ -254,7 +276,7 @@ class Bios(commands.Cog):
     ):
         user_id: int = ctx.author.id
         db = await self._get_database()
-        await db.set_privacy_birthday(user_id, new_privacy)
+        await db.update_user(user_id, privacy_birthday=new_privacy)
         embed = SuccessEmbed("Birthday privacy set!", join="\n\n")
 
         # Tell them how their privacy affects their birthday announcement
@@ -281,7 +303,7 @@ class Bios(commands.Cog):
     async def privacy_age(self, ctx: commands.Context, new_privacy: privacy_handler):
         user_id: int = ctx.author.id
         db = await self._get_database()
-        await db.set_privacy_age(user_id, new_privacy)
+        await db.update_user(user_id, privacy_age=new_privacy)
         embed = SuccessEmbed("Age privacy set!", join="\n\n")
 
         # Tell them how their privacy affects their birthday announcement
@@ -306,7 +328,7 @@ class Bios(commands.Cog):
     ):
         user_id: int = ctx.author.id
         db = await self._get_database()
-        await db.set_privacy_timezone(user_id, new_privacy)
+        await db.update_user(user_id, privacy_timezone=new_privacy)
         await SuccessEmbed("Timezone privacy set!").send(ctx)
 
     # Name
@@ -349,7 +371,7 @@ class Bios(commands.Cog):
             raise BadArgument(
                 f"Name must be 64 characters or less (yours: {len(new_name)})."
             )
-        await db.set_preferred_name(user_id, new_name)
+        await db.update_user(user_id, preferred_name=new_name)
         embed = SuccessEmbed("Preferred name set!", join="\n\n")
 
         if await db.get_privacy_preferred_name(user_id) is PrivacyType.PRIVATE:
@@ -365,7 +387,7 @@ class Bios(commands.Cog):
     async def name_delete(self, ctx: commands.Context):
         user_id: int = ctx.author.id
         db = await self._get_database()
-        await db.set_preferred_name(user_id, None)
+        await db.update_user(user_id, preferred_name=None)
         await SuccessEmbed("Preferred name deleted!").send(ctx)
 
     # Pronouns
@@ -407,7 +429,7 @@ class Bios(commands.Cog):
                 f"Pronouns must be 64 characters or less (yours: "
                 f"{len(new_pronouns)})."
             )
-        await db.set_pronouns(user_id, new_pronouns)
+        await db.update_user(user_id, pronouns=new_pronouns)
         embed = SuccessEmbed("Pronouns set!", join="\n\n")
 
         if await db.get_privacy_pronouns(user_id) == PrivacyType.PRIVATE:
@@ -423,7 +445,7 @@ class Bios(commands.Cog):
     async def pronouns_delete(self, ctx: commands.Context):
         user_id: int = ctx.author.id
         db = await self._get_database()
-        await db.set_pronouns(user_id, None)
+        await db.update_user(user_id, pronouns=None)
         await SuccessEmbed("Pronouns deleted!").send(ctx)
 
     # Birthday
@@ -473,7 +495,7 @@ class Bios(commands.Cog):
     async def birthday_set(self, ctx: commands.Context, *, new_birthday: date_handler):
         user_id: int = ctx.author.id
         db = await self._get_database()
-        await db.set_birthday(user_id, new_birthday)
+        await db.update_user(user_id, birthday=new_birthday)
 
         embed = SuccessEmbed("Birthday set!", join="\n\n")
 
@@ -501,7 +523,7 @@ class Bios(commands.Cog):
     async def birthday_delete(self, ctx: commands.Context):
         user_id: int = ctx.author.id
         db = await self._get_database()
-        await db.set_birthday(user_id, None)
+        await db.update_user(user_id, birthday=None)
         await SuccessEmbed("Birthday deleted!").send(ctx)
 
     # Age
@@ -644,7 +666,7 @@ class Bios(commands.Cog):
             return
 
         # Display best match with other possible matches
-        await db.set_timezone(user_id, tz_matches.best_match)
+        await db.update_user(user_id, timezone=tz_matches.best_match)
         embed = SuccessEmbed(
             [
                 f"Timezone set to **{tz_matches.best_match}**!",
@@ -666,7 +688,7 @@ class Bios(commands.Cog):
     async def timezone_delete(self, ctx: commands.Context):
         user_id: int = ctx.author.id
         db = await self._get_database()
-        await db.set_timezone(user_id, None)
+        await db.update_user(user_id, timezone=None)
         await SuccessEmbed("Timezone deleted!").send(ctx)
 
     # region Server commands
@@ -775,7 +797,6 @@ class Bios(commands.Cog):
 
         db = await self._get_database()
 
-        user_strs = []
         seen_users = set()
 
         def should_skip_user(user_id: int, *, skip_guild_check=False):
@@ -808,14 +829,15 @@ class Bios(commands.Cog):
                         return True
             return False
 
+        # Collect (user_id, known_names) for each found user so we can get
+        # all of their data at once
+        found_users: list[tuple[int, dict[str, str]]] = []
+
         for user_id, preferred_name in await db.find_users_by_preferred_name(name):
             # Get preferred names from database
             if should_skip_user(user_id):
                 continue
-            names = await user_names_str(
-                ctx, db, user_id, preferred_name=preferred_name
-            )
-            user_strs.append(names)
+            found_users.append((user_id, {"preferred_name": preferred_name}))
 
         for user_id, display_name in find_users_by_display_name(
             ctx.bot, ctx.author.id, name, guild=ctx.guild
@@ -825,15 +847,19 @@ class Bios(commands.Cog):
             # of its optimization, so we don't need to do that again
             if should_skip_user(user_id, skip_guild_check=True):
                 continue
-            names = await user_names_str(ctx, db, user_id, display_name=display_name)
-            user_strs.append(names)
+            found_users.append((user_id, {"display_name": display_name}))
 
         for user_id, username in find_users_by_username(ctx.bot, name):
             # Get usernames from client
             if should_skip_user(user_id):
                 continue
-            names = await user_names_str(ctx, db, user_id, username=username)
-            user_strs.append(names)
+            found_users.append((user_id, {"username": username}))
+
+        users_data = await db.get_users_bulk(user_id for user_id, _ in found_users)
+        user_strs = [
+            user_names_str(ctx, user_id, users_data.get(user_id), **known_names)
+            for user_id, known_names in found_users
+        ]
 
         if user_strs:
             await InfoEmbed(user_strs).send(ctx)
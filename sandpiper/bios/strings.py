@@ -13,7 +13,7 @@ from discord.ext import commands
 
 from sandpiper.common.discord import find_user_in_mutual_guilds
 from sandpiper.common.misc import join
-from sandpiper.user_data import Database, PrivacyType
+from sandpiper.user_data import PrivacyType, UserSnapshot
 
 privacy_emojis = {PrivacyType.PRIVATE: "⛔", PrivacyType.PUBLIC: "✅"}
 
@@ -64,10 +64,10 @@ def user_info_str(field_name: str, value: Any, privacy: PrivacyType):
     return f"{privacy_emoji} `{privacy:7}` | {info_str(field_name, value)}"
 
 
-async def user_names_str(
+def user_names_str(
     ctx: commands.Context,
-    db: Database,
     user_id: int,
+    user_data: Optional[UserSnapshot],
     *,
     preferred_name: str = None,
     username: str = None,
@@ -78,23 +78,25 @@ async def user_names_str(
     guild display names). You can supply ``preferred_name``, ``username``,
     or ``display_name`` to optimize the number of operations this function
     has to perform.
+
+    :param user_data: the user's stored data, or None if they have none
+        (e.g. from ``Database.get_users_bulk``)
     """
 
+    if user_data is None:
+        # Fall back to an empty (all private) snapshot
+        user_data = UserSnapshot(user_id)
+
     # Get pronouns
-    privacy_pronouns = await db.get_privacy_pronouns(user_id)
-    if privacy_pronouns == PrivacyType.PUBLIC:
-        pronouns = await db.get_pronouns(user_id)
-    else:
-        pronouns = None
+    pronouns = None
+    if user_data.privacy_pronouns == PrivacyType.PUBLIC:
+        pronouns = user_data.pronouns
 
     # Get preferred name
     if preferred_name is None:
-        privacy_preferred_name = await db.get_privacy_preferred_name(user_id)
-        if privacy_preferred_name == PrivacyType.PUBLIC:
-            preferred_name = await db.get_preferred_name(user_id)
-            if preferred_name is None:
-                preferred_name = "`No preferred name`"
-        else:
+        if user_data.privacy_preferred_name == PrivacyType.PUBLIC:
+            preferred_name = user_data.preferred_name
+        if preferred_name is None:
             preferred_name = "`No preferred name`"
 
     # Get discord username and discriminator
@@ -1,4 +1,4 @@
-__all__ = ["Birthdays"]
+__all__ = ["Birthdays", "BirthdayMessageNotSent"]
 
 import asyncio
 import datetime as dt
@@ -12,14 +12,38 @@ import discord.ext.tasks as tasks
 import pytz
 
 from sandpiper.birthdays.message import format_birthday_message
+from sandpiper.birthdays.scheduler import BirthdayScheduler
 from sandpiper.common.discord import AutoOrder, cheap_user_hash
 from sandpiper.common.time import sort_dates_no_year, utc_now
-from sandpiper.user_data import Database, PrivacyType, UserData, common_pronouns
+from sandpiper.user_data import (
+    Database,
+    PrivacyType,
+    UserData,
+    UserNotInDatabase,
+    UserSnapshot,
+    common_pronouns,
+)
 
 logger = logging.getLogger("sandpiper.birthdays")
 
 
+class BirthdayMessageNotSent(Exception):
+    pass
+
+
 class Birthdays(commands.Cog):
+
+    # The maximum number of birthday messages to send at once
+    MAX_CONCURRENT_SENDS = 10
+    # How many times to try sending a birthday notification before giving up
+    OUTBOX_MAX_ATTEMPTS = 5
+    # How long to wait before the first retry. Doubles with each attempt.
+    OUTBOX_RETRY_DELAY = dt.timedelta(minutes=1)
+    # How long after its fire time a birthday notification is still worth
+    # sending (i.e. until the end of the user's birthday). Older ones, e.g.
+    # after downtime, are dropped rather than sent late.
+    OUTBOX_EXPIRY = dt.timedelta(hours=24)
+
     def __init__(
         self,
         bot: commands.Bot,
@@ -35,15 +59,9 @@ class Birthdays(commands.Cog):
         self.message_templates_with_age = message_templates_with_age
         self.past_birthdays_day_range = past_birthdays_day_range
         self.upcoming_birthdays_day_range = upcoming_birthdays_day_range
-        self.tasks: dict[int, asyncio.Task] = {}
+        self.scheduler = BirthdayScheduler(self.deliver_birthday)
         asyncio.run_coroutine_threadsafe(self.init_daily_loop(), self.bot.loop)
 
-    def _create_birthday_task(self, user_id: int, midnight_delta: dt.timedelta):
-        self.tasks[user_id] = task = self.bot.loop.create_task(
-            self.send_birthday_message(user_id, midnight_delta)
-        )
-        task.add_done_callback(self._handle_task_exception)
-
     async def _get_database(self) -> Database:
         user_data: Optional[UserData] = self.bot.get_cog("UserData")
         if user_data is None:
@@ -55,24 +73,16 @@ class Birthdays(commands.Cog):
             return random.choice(self.message_templates_with_age)
         return random.choice(self.message_templates_no_age)
 
-    def _handle_task_exception(self, task: asyncio.Task) -> None:
-        try:
-            task.result()
-        except asyncio.CancelledError:
-            pass  # Task cancellation should not be logged as an error.
-        except Exception as e:
-            logger.error(f"Exception raised by task {task}", exc_info=e)
-
-    async def _try_cancel_task(self, user_id):
-        if user_id in self.tasks:
-            logger.info(f"Canceling birthday notification task (user={user_id})")
-            self.tasks[user_id].cancel()
-            del self.tasks[user_id]
-
     async def init_daily_loop(self):
         await self.bot.wait_until_ready()
+        await self.recover_outbox()
+        self.scheduler.start()
         self.daily_loop.start()
 
+    async def cog_unload(self):
+        self.daily_loop.cancel()
+        await self.scheduler.stop()
+
     @tasks.loop(hours=24)
     async def daily_loop(self):
         await self.schedule_todays_birthdays()
@@ -104,15 +114,17 @@ class Birthdays(commands.Cog):
         for user_id, birthday in birthdays_today_tomorrow:
             if await self.schedule_birthday(user_id, birthday, now=now):
                 scheduled_count += 1
-        logger.info(f"{scheduled_count} birthdays scheduled for today")
+        logger.info("%s birthdays scheduled for today", scheduled_count)
 
     async def schedule_birthday(
         self, user_id: int, birthday: dt.date, *, now: Optional[dt.datetime] = None
     ) -> bool:
         """
-        Schedule a task that will wish this user happy birthday if their
-        birthday is within the next 24 hours. Will try to access their timezone
-        to wish them happy birthday at midnight in their timezone.
+        Schedule a notification that will wish this user happy birthday if
+        their birthday is within the next 24 hours. Will try to access their
+        timezone to wish them happy birthday at midnight in their timezone.
+        The notification is stored in the database's birthday outbox so it
+        survives restarts.
 
         :param user_id: the user's Discord ID
         :param birthday: the user's birthday
@@ -127,15 +139,31 @@ class Birthdays(commands.Cog):
             now = utc_now()
         today = now.date()
 
-        # Cancel and remove the user's birthday task if it already exists.
-        # This may happen if the user changes their timezone or something
-        # when their birthday task is already scheduled.
-        # We want to overwrite it.
-        await self._try_cancel_task(user_id)
+        # The user's birthday notification may already be scheduled if they
+        # change their timezone or something. It's either overwritten below
+        # (in the same transaction, so a retry keeps its attempt count) or
+        # canceled if it no longer applies.
+        try:
+            user_data = await db.get_user_snapshot(user_id)
+        except UserNotInDatabase:
+            await self.cancel_birthday(user_id)
+            return False
+
+        last_notification = user_data.last_birthday_notification
+        if last_notification is not None:
+            if last_notification.tzinfo is None:
+                # Stored as naive UTC (values from before this was the case
+                # are converted from server-local time by a migration)
+                last_notification = pytz.utc.localize(last_notification)
+            if last_notification > now - dt.timedelta(hours=24):
+                # They were already wished happy birthday, so don't do it again
+                # (e.g. if they changed their timezone after the notification)
+                await self.cancel_birthday(user_id)
+                return False
 
         timezone = None
-        if await db.get_privacy_timezone(user_id) is PrivacyType.PUBLIC:
-            timezone = await db.get_timezone(user_id)
+        if user_data.privacy_timezone is PrivacyType.PUBLIC:
+            timezone = user_data.timezone
         if timezone is None:
             # If the user's timezone is null, just use UTC
             timezone = pytz.utc
@@ -147,48 +175,125 @@ class Birthdays(commands.Cog):
         midnight_utc = midnight_local.astimezone(pytz.utc)
         midnight_delta = midnight_utc - now
 
-        # Schedule the birthday task if their localized midnight is within the
-        # next 24 hours
-        # TODO I'm worried that it could be possible we lose a birthday
-        #   in a race condition here...
+        # Schedule the birthday notification if their localized midnight is
+        # within the next 24 hours
         if dt.timedelta(0) <= midnight_delta < dt.timedelta(hours=24):
-            self._create_birthday_task(user_id, midnight_delta)
-            return True
+            return await self._schedule_outbox(user_id, midnight_utc)
 
         # Otherwise, if we missed their midnight but it's still their birthday,
-        # we can send immediately (negative delta will not sleep)
+        # we can send immediately (a fire time in the past fires right away)
         now_local: dt.datetime = now.astimezone(timezone)
         if (
             midnight_delta < dt.timedelta(0)
             and now_local.date() == birthday_this_year.date()
         ):
-            self._create_birthday_task(user_id, midnight_delta)
-            return True
+            return await self._schedule_outbox(user_id, midnight_utc)
 
+        await self.cancel_birthday(user_id)
         return False
 
-    async def send_birthday_message(self, user_id: int, delta: dt.timedelta):
+    async def _schedule_outbox(self, user_id: int, fire_time: dt.datetime) -> bool:
+        db = await self._get_database()
+        fire_time = await db.set_birthday_outbox(user_id, fire_time)
+        if fire_time is None:
+            # Their notification is being sent right now, and rescheduling it
+            # would send it twice
+            logger.info(
+                "Birthday notification is already being sent (user=%s)", user_id
+            )
+            return False
+        self.scheduler.schedule(user_id, fire_time)
+        return True
+
+    async def cancel_birthday(self, user_id: int):
         """
-        Wait for `delta` time and then send a message wishing the user a happy
-        birthday in all guilds they share with Sandpiper.
+        Cancel the user's scheduled birthday notification, if any. A
+        notification that is currently being sent can't be canceled.
+        """
+        db = await self._get_database()
+        self.scheduler.cancel(user_id)
+        await db.delete_birthday_outbox(user_id)
+
+    async def recover_outbox(self):
+        """
+        Reschedule all birthday notifications that were in the outbox when
+        Sandpiper last stopped. Ones whose fire time has passed will be sent
+        right away, unless it's been longer than ``OUTBOX_EXPIRY``.
+        """
+        db = await self._get_database()
+        pending = await db.recover_birthday_outbox(
+            expire_before=utc_now() - self.OUTBOX_EXPIRY
+        )
+        for user_id, fire_time in pending:
+            self.scheduler.schedule(user_id, fire_time)
+        logger.info("%s birthday notifications recovered from outbox", len(pending))
+
+    async def deliver_birthday(self, user_id: int):
+        """
+        Send a user's birthday notification from the outbox. This is called by
+        the scheduler when the notification fires. If sending fails, it is
+        retried with exponential backoff up to ``OUTBOX_MAX_ATTEMPTS`` times.
 
         :param user_id: the user's Discord ID
-        :param delta: how long to wait before sending the message
-        :return:
         """
-        logger.info(
-            f"Waiting to send birthday message (user={user_id} "
-            f"seconds={delta.total_seconds()})"
+        db = await self._get_database()
+        attempt = await db.claim_birthday_outbox(
+            user_id, expire_before=utc_now() - self.OUTBOX_EXPIRY
         )
-        await asyncio.sleep(delta.total_seconds())
+        if attempt is None:
+            logger.info(
+                "Birthday notification is no longer pending or has expired; "
+                "not sending (user=%s)",
+                user_id,
+            )
+            return
 
-        logger.info(f"Sending birthday notifications for user (user={user_id})")
+        try:
+            await self.send_birthday_message(user_id)
+        except Exception as e:
+            if attempt >= self.OUTBOX_MAX_ATTEMPTS:
+                logger.error(
+                    "Failed to send birthday notification; giving up "
+                    "(user=%s attempts=%s)",
+                    user_id,
+                    attempt,
+                    exc_info=e,
+                )
+                await db.release_birthday_outbox(user_id, None)
+                return
+
+            retry_time = utc_now() + self.OUTBOX_RETRY_DELAY * 2 ** (attempt - 1)
+            logger.warning(
+                "Failed to send birthday notification; retrying "
+                "(user=%s attempts=%s retry_time=%s)",
+                user_id,
+                attempt,
+                retry_time,
+                exc_info=e,
+            )
+            await db.release_birthday_outbox(user_id, retry_time)
+            self.scheduler.schedule(user_id, retry_time)
+            return
+
+        await db.complete_birthday_outbox(user_id, utc_now())
+
+    async def send_birthday_message(self, user_id: int):
+        """
+        Send a message wishing the user a happy birthday in all guilds they
+        share with Sandpiper.
+
+        :param user_id: the user's Discord ID
+        :raises BirthdayMessageNotSent: if there were birthday channels to
+            send to but every send failed
+        """
+        logger.info("Sending birthday notifications for user (user=%s)", user_id)
         db = await self._get_database()
         user: discord.User = self.bot.get_user(user_id)
         if user is None:
             logger.info(
-                f"Tried to send birthday message, but user is not in any "
-                f"guilds with Sandpiper (user={user_id})"
+                "Tried to send birthday message, but user is not in any "
+                "guilds with Sandpiper (user=%s)",
+                user_id,
             )
             return
         if user is self.bot.user:
@@ -198,15 +303,23 @@ class Birthdays(commands.Cog):
             guilds: list[discord.Guild] = user.mutual_guilds
 
         # Get some user info to use in the message
+        try:
+            user_data = await db.get_user_snapshot(user_id)
+        except UserNotInDatabase:
+            logger.info(
+                "Tried to send birthday message, but user has no data stored (user=%s)",
+                user_id,
+            )
+            return
 
         name = None
-        if (await db.get_privacy_preferred_name(user_id)) is PrivacyType.PUBLIC:
-            name = await db.get_preferred_name(user_id)
+        if user_data.privacy_preferred_name is PrivacyType.PUBLIC:
+            name = user_data.preferred_name
         has_preferred_name = name is not None
 
         pronouns = None
-        if (await db.get_privacy_pronouns(user_id)) is PrivacyType.PUBLIC:
-            pronouns = await db.get_pronouns_parsed(user_id)
+        if user_data.privacy_pronouns is PrivacyType.PUBLIC:
+            pronouns = user_data.get_pronouns_parsed()
         if pronouns:
             # This is making an assumption that the first pronouns listed
             # are preferred over the others, which is NOT true for everyone,
@@ -216,36 +329,41 @@ class Birthdays(commands.Cog):
             pronouns = common_pronouns["they"]
 
         age = None
-        if (await db.get_privacy_age(user_id)) is PrivacyType.PUBLIC:
-            age = await db.get_age(user_id)
+        if user_data.privacy_age is PrivacyType.PUBLIC:
+            age = user_data.get_age()
 
         # Send the message to each guild they're in with Sandpiper
 
+        members: dict[int, discord.Member] = {}
         for guild in guilds:
             member: discord.Member = guild.get_member(user_id)
             if member is None:
                 logger.debug(
-                    f"User not found as a member in the guild while trying to "
-                    f"send birthday message, this is most likely a rare race "
-                    f"condition (user={user_id} guild={guild.id})"
+                    "User not found as a member in the guild while trying to "
+                    "send birthday message, this is most likely a rare race "
+                    "condition (user=%s guild=%s)",
+                    user_id,
+                    guild.id,
                 )
                 continue
+            members[guild.id] = member
 
-            bday_channel_id = await db.get_guild_birthday_channel(guild.id)
-            if bday_channel_id is None:
-                continue
-
+        bday_channel_ids = await db.get_guild_birthday_channels(members.keys())
+        sends = []
+        for guild_id, bday_channel_id in bday_channel_ids.items():
             bday_channel: discord.TextChannel
             bday_channel = self.bot.get_channel(bday_channel_id)
             if bday_channel is None:
                 logger.debug(
-                    f"Birthday channel does not exist (guild={guild.id} "
-                    f"channel={bday_channel_id})"
+                    "Birthday channel does not exist (guild=%s channel=%s)",
+                    guild_id,
+                    bday_channel_id,
                 )
                 continue
 
+            guild_name = name
             if not has_preferred_name:
-                name = member.display_name
+                guild_name = members[guild_id].display_name
 
             if user_id == self.bot.user.id:
                 # Little easter egg for Sandpiper's birthday
@@ -259,14 +377,63 @@ class Birthdays(commands.Cog):
             bday_msg = format_birthday_message(
                 bday_msg_template,
                 user_id=user_id,
-                name=name,
+                name=guild_name,
                 pronouns=pronouns,
                 age=age,
             )
-            await bday_channel.send(bday_msg)
+            sends.append((guild_id, bday_channel, bday_msg))
+
+        results = await self._send_to_channels(user_id, sends)
+        if results and all(r is not None for r in results.values()):
+            raise BirthdayMessageNotSent(
+                f"All birthday messages failed to send (user={user_id})"
+            )
+
+    async def _send_to_channels(
+        self,
+        user_id: int,
+        sends: list[tuple[int, discord.abc.Messageable, str]],
+    ) -> dict[int, Optional[Exception]]:
+        """
+        Send birthday messages to several guilds' birthday channels
+        concurrently. At most ``MAX_CONCURRENT_SENDS`` messages are in flight
+        at once; discord.py handles the rate limits of each channel.
+
+        :param user_id: the ID of the user whose birthday it is (for logging)
+        :param sends: a list of (guild_id, channel, message) to send
+        :return: a mapping of guild_id -> the exception raised while sending,
+            or None if the message was sent
+        """
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_SENDS)
+
+        async def send(channel: discord.abc.Messageable, msg: str):
+            async with semaphore:
+                await channel.send(msg)
 
-        # Store the time we sent the notification
-        await db.set_last_birthday_notification(user_id, utc_now())
+        results = await asyncio.gather(
+            *(send(channel, msg) for _, channel, msg in sends),
+            return_exceptions=True,
+        )
+
+        guild_results: dict[int, Optional[Exception]] = {}
+        for (guild_id, channel, _), result in zip(sends, results):
+            guild_results[guild_id] = result
+            if isinstance(result, Exception):
+                logger.warning(
+                    "Failed to send birthday message (user=%s guild=%s channel=%s)",
+                    user_id,
+                    guild_id,
+                    channel.id,
+                    exc_info=result,
+                )
+        sent_count = sum(1 for r in guild_results.values() if r is None)
+        logger.info(
+            "Sent birthday messages (user=%s sent=%s failed=%s)",
+            user_id,
+            sent_count,
+            len(guild_results) - sent_count,
+        )
+        return guild_results
 
     async def get_past_upcoming_birthdays(
         self, past_birthdays_day_range: int = 7, upcoming_birthdays_day_range: int = 14
@@ -307,7 +474,7 @@ class Birthdays(commands.Cog):
         # Either of these two conditions means the birthday must be canceled
         # and we will not reschedule
         if birthday is None or birthday_privacy is PrivacyType.PRIVATE:
-            await self._try_cancel_task(user_id)
+            await self.cancel_birthday(user_id)
             return
 
         await self.schedule_birthday(user_id, birthday)
@@ -328,17 +495,21 @@ class Birthdays(commands.Cog):
     async def birthdays(self, ctx: commands.Context):
         pass
 
-    async def format_bday_upcoming(
-        self, user_id: int, guild: discord.Guild, past: bool
+    def format_bday_upcoming(
+        self,
+        user_data: Optional[UserSnapshot],
+        user_id: int,
+        guild: discord.Guild,
+        past: bool,
     ) -> Optional[str]:
-        db = await self._get_database()
-
         user = self.bot.get_user(user_id)
         if user is None:
             return None
         if not guild.get_member(user_id):
             return None
-        if await db.get_privacy_birthday(user_id) is not PrivacyType.PUBLIC:
+        if user_data is None:
+            return None
+        if user_data.privacy_birthday is not PrivacyType.PUBLIC:
             return None
 
         emojis_set = (
@@ -346,11 +517,11 @@ class Birthdays(commands.Cog):
         )
         emoji = emojis_set[cheap_user_hash(user_id) % len(emojis_set)]
 
-        bday = await db.get_birthday(user_id)
+        bday = user_data.birthday
         user_qual = f"{user.name}#{user.discriminator}"
 
-        if await db.get_privacy_preferred_name(user_id) is PrivacyType.PUBLIC:
-            name = f"**{await db.get_preferred_name(user_id)}** ({user_qual})"
+        if user_data.privacy_preferred_name is PrivacyType.PUBLIC:
+            name = f"**{user_data.preferred_name}** ({user_qual})"
         else:
             name = f"**{user_qual}**"
 
@@ -361,20 +532,32 @@ class Birthdays(commands.Cog):
         name="upcoming", aliases=("soon",), help="View upcoming birthdays."
     )
     async def birthdays_upcoming(self, ctx: commands.Context):
+        db = await self._get_database()
         past_raw, upcoming_raw = await self.get_past_upcoming_birthdays(
             self.past_birthdays_day_range, self.upcoming_birthdays_day_range
         )
         now = utc_now()
 
+        # Get everyone's info at once rather than once per birthday
+        users_data = await db.get_users_bulk(
+            user_id
+            for user_id, _ in past_raw + upcoming_raw
+            if ctx.guild.get_member(user_id)
+        )
+
         past = []
         for user_id, _ in sort_dates_no_year(past_raw, lambda x: x[1], now):
-            bday_str = await self.format_bday_upcoming(user_id, ctx.guild, past=True)
+            bday_str = self.format_bday_upcoming(
+                users_data.get(user_id), user_id, ctx.guild, past=True
+            )
             if bday_str:
                 past.append(bday_str)
 
         upcoming = []
         for user_id, _ in sort_dates_no_year(upcoming_raw, lambda x: x[1], now):
-            bday_str = await self.format_bday_upcoming(user_id, ctx.guild, past=False)
+            bday_str = self.format_bday_upcoming(
+                users_data.get(user_id), user_id, ctx.guild, past=False
+            )
             if bday_str:
                 upcoming.append(bday_str)
 
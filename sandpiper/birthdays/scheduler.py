@@ -0,0 +1,177 @@
+__all__ = ["BirthdayScheduler"]
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import datetime as dt
+import heapq
+import itertools
+import logging
+from typing import Optional
+
+from sandpiper.common.time import utc_now
+
+logger = logging.getLogger("sandpiper.birthdays.scheduler")
+
+# Heap entries are [fire_time, sequence, user_id, active]. Canceled entries are
+# marked inactive and skipped when they reach the top of the heap.
+_FIRE_TIME, _SEQ, _USER_ID, _ACTIVE = range(4)
+
+
+class BirthdayScheduler:
+    """
+    Schedules birthday notifications using a heap keyed by fire time and a
+    single sleeper task that waits for the earliest one.
+
+    Each user has at most one pending notification. Scheduling a user again
+    replaces their pending notification, and both scheduling and canceling
+    take O(log n) time.
+    """
+
+    # Wake up at least this often so changes to the system clock don't cause
+    # a notification to be sent late
+    MAX_SLEEP = dt.timedelta(minutes=5)
+
+    def __init__(
+        self,
+        callback: Callable[[int], Awaitable[None]],
+        *,
+        now: Callable[[], dt.datetime] = utc_now,
+    ):
+        """
+        :param callback: the coroutine function to call with a user's ID when
+            their notification fires
+        :param now: a function returning the current timezone-aware datetime
+        """
+        self._callback = callback
+        self._now = now
+        self._heap: list[list] = []
+        self._entries: dict[int, list] = {}
+        self._canceled_count = 0
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._sleeper: Optional[asyncio.Task] = None
+        self._running_callbacks: set[asyncio.Task] = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._entries
+
+    @property
+    def running(self) -> bool:
+        return self._sleeper is not None and not self._sleeper.done()
+
+    def start(self):
+        """Start the sleeper task on the running event loop"""
+        if self.running:
+            return
+        self._sleeper = asyncio.get_running_loop().create_task(self._run())
+        self._sleeper.add_done_callback(self._handle_task_exception)
+
+    async def stop(self):
+        """Stop the sleeper task and cancel any callbacks still running"""
+        tasks = list(self._running_callbacks)
+        if self._sleeper is not None:
+            tasks.append(self._sleeper)
+            self._sleeper = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def schedule(self, user_id: int, fire_time: dt.datetime):
+        """
+        Schedule a notification for a user, replacing their pending one if it
+        exists. Fire times in the past will fire as soon as possible.
+
+        :param user_id: the user's Discord ID
+        :param fire_time: the timezone-aware datetime to fire at
+        """
+        self.cancel(user_id)
+        entry = [fire_time, next(self._counter), user_id, True]
+        self._entries[user_id] = entry
+        heapq.heappush(self._heap, entry)
+        logger.info(
+            "Scheduled birthday notification (user=%s fire_time=%s)", user_id, fire_time
+        )
+        if self._heap[0] is entry:
+            # This is the new earliest notification
+            self._wakeup.set()
+
+    def cancel(self, user_id: int) -> bool:
+        """
+        Cancel a user's pending notification.
+
+        :param user_id: the user's Discord ID
+        :return: whether the user had a pending notification
+        """
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return False
+        logger.info("Canceling birthday notification (user=%s)", user_id)
+        entry[_ACTIVE] = False
+        self._canceled_count += 1
+        if self._canceled_count > len(self._entries):
+            # Most of the heap is canceled entries, so clean it up
+            self._heap = [e for e in self._heap if e[_ACTIVE]]
+            heapq.heapify(self._heap)
+            self._canceled_count = 0
+        return True
+
+    def get_fire_time(self, user_id: int) -> Optional[dt.datetime]:
+        entry = self._entries.get(user_id)
+        return entry[_FIRE_TIME] if entry is not None else None
+
+    def pending(self) -> list[tuple[dt.datetime, int]]:
+        """
+        :return: a list of (fire_time, user_id) of all pending notifications,
+            sorted by fire time
+        """
+        return sorted((e[_FIRE_TIME], e[_USER_ID]) for e in self._heap if e[_ACTIVE])
+
+    def _peek(self) -> Optional[list]:
+        """Get the earliest active entry, discarding canceled ones"""
+        while self._heap and not self._heap[0][_ACTIVE]:
+            heapq.heappop(self._heap)
+            self._canceled_count -= 1
+        return self._heap[0] if self._heap else None
+
+    def _pop_due(self, now: dt.datetime) -> list[int]:
+        due = []
+        while (entry := self._peek()) is not None and entry[_FIRE_TIME] <= now:
+            heapq.heappop(self._heap)
+            del self._entries[entry[_USER_ID]]
+            due.append(entry[_USER_ID])
+        return due
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            for user_id in self._pop_due(self._now()):
+                self._fire(user_id)
+
+            entry = self._peek()
+            if entry is None:
+                await self._wakeup.wait()
+                continue
+
+            delay = min(entry[_FIRE_TIME] - self._now(), self.MAX_SLEEP)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay.total_seconds())
+            except asyncio.TimeoutError:
+                pass
+
+    def _fire(self, user_id: int):
+        task = asyncio.get_running_loop().create_task(self._callback(user_id))
+        self._running_callbacks.add(task)
+        task.add_done_callback(self._running_callbacks.discard)
+        task.add_done_callback(self._handle_task_exception)
+
+    @staticmethod
+    def _handle_task_exception(task: asyncio.Task) -> None:
+        try:
+            task.result()
+        except asyncio.CancelledError:
+            pass  # Task cancellation should not be logged as an error.
+        except Exception as e:
+            logger.error("Exception raised by task %s", task, exc_info=e)
@@ -7,36 +7,32 @@ __all__ = [
     "get_country_flag_emoji_from_timezone",
 ]
 
-from operator import setitem
+import json
 from pathlib import Path
-from typing import Callable, NoReturn, Union
+from typing import Union
 
-from sandpiper.common.time import TimezoneType
+from pytz.tzinfo import DstTzInfo, StaticTzInfo
 
 DEFAULT_FLAG = ":flag_white:"
 
 
-def _parse_db_file(file_name, per_line: Callable[[dict, list[str]], NoReturn]) -> dict:
-    file = Path(__file__).parent / file_name
+def _load_tables() -> dict[str, dict[str, str]]:
+    # Precomputed from the .tab files by generate.py
+    file = Path(__file__).parent / "iana.json"
     if not file.exists():
-        raise FileNotFoundError(f"Can't find IANA database file {file}")
+        raise FileNotFoundError(
+            f"Can't find IANA database file {file}. Generate it with "
+            f"`python sandpiper/common/IANA/generate.py`."
+        )
+    with file.open("rt", encoding="utf-8") as f:
+        return json.load(f)
 
-    out = {}
-    with file.open("rt") as f:
-        for line in f:
-            if line.startswith("#"):
-                continue
-            per_line(out, line.strip("\n").split("\t"))
 
-    return out
-
-
-country_code_to_country_name: dict[str, str] = _parse_db_file(
-    "iso3166.tab", lambda d, fields: setitem(d, fields[0], fields[1])
-)
-timezone_to_country_code: dict[str, str] = _parse_db_file(
-    "zone.tab", lambda d, fields: setitem(d, fields[2], fields[0])
-)
+_tables = _load_tables()
+country_code_to_country_name: dict[str, str] = _tables["countries"]
+timezone_to_country_code: dict[str, str] = _tables["timezones"]
+_timezone_to_flag: dict[str, str] = _tables["flags"]
+del _tables
 
 
 def to_regional_indicator(char: str) -> str:
@@ -52,11 +48,10 @@ def get_country_flag_emoji(country_id: str) -> str:
     return "".join(to_regional_indicator(i) for i in country_id)
 
 
-def get_country_flag_emoji_from_timezone(tz: Union[str, TimezoneType]):
-    if isinstance(tz, TimezoneType.__args__):
+def get_country_flag_emoji_from_timezone(tz: Union[str, StaticTzInfo, DstTzInfo]):
+    if isinstance(tz, (StaticTzInfo, DstTzInfo)):
         tz: str = tz.zone
     elif not isinstance(tz, str):
         raise TypeError(f"tz must be a str or pytz timezone, got {type(tz)}")
 
-    code = timezone_to_country_code.get(tz)
-    return get_country_flag_emoji(code) if code is not None else DEFAULT_FLAG
+    return _timezone_to_flag.get(tz, DEFAULT_FLAG)
@@ -0,0 +1,66 @@
+"""
+Generate ``iana.json`` from the IANA ``iso3166.tab`` and ``zone.tab`` files.
+
+Run this after updating the ``.tab`` files:
+
+    python sandpiper/common/IANA/generate.py
+"""
+
+__all__ = ["ARTIFACT_FILE", "build_tables", "parse_db_file", "write_artifact"]
+
+import json
+from pathlib import Path
+
+IANA_DIR = Path(__file__).parent
+ARTIFACT_FILE = IANA_DIR / "iana.json"
+
+
+def parse_db_file(file_name: str, key_col: int, value_col: int) -> dict[str, str]:
+    file = IANA_DIR / file_name
+    if not file.exists():
+        raise FileNotFoundError(f"Can't find IANA database file {file}")
+
+    out = {}
+    with file.open("rt", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            fields = line.strip("\n").split("\t")
+            out[fields[key_col]] = fields[value_col]
+    return out
+
+
+def _flag_emoji(country_code: str) -> str:
+    return "".join(chr(ord(char) + 127397) for char in country_code)
+
+
+def build_tables() -> dict[str, dict[str, str]]:
+    """
+    Parse the IANA database files into the tables stored in the artifact.
+
+    :return: a dict with the tables ``countries`` (country code -> country
+        name), ``timezones`` (timezone name -> country code), and ``flags``
+        (timezone name -> country flag emoji)
+    """
+    countries = parse_db_file("iso3166.tab", 0, 1)
+    timezones = parse_db_file("zone.tab", 2, 0)
+    flags = {tz: _flag_emoji(code) for tz, code in timezones.items()}
+    return {"countries": countries, "timezones": timezones, "flags": flags}
+
+
+def write_artifact(file: Path = ARTIFACT_FILE):
+    with file.open("wt", encoding="utf-8") as f:
+        json.dump(
+            build_tables(),
+            f,
+            ensure_ascii=False,
+            # One table entry per line keeps tzdata updates diffable
+            indent=1,
+            sort_keys=True,
+        )
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    write_artifact()
+    print(f"Wrote {ARTIFACT_FILE}")
@@ -0,0 +1,123 @@
+__all__ = ["MISSING", "CacheStats", "LRUCache"]
+
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+import time
+from typing import Any, Generic, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Returned by cache lookups for missing keys, since None may be a cached value
+MISSING = object()
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self):
+        return (
+            f"hits={self.hits} misses={self.misses} "
+            f"hit_rate={self.hit_rate:.1%} size={self.size}/{self.maxsize}"
+        )
+
+
+class LRUCache(Generic[K, V]):
+    """
+    A least-recently-used mapping with a bounded size and an optional
+    time-to-live for its entries. Lookups through ``get`` are counted as hits
+    or misses and can be inspected with ``stats``.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        *,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param maxsize: the maximum number of entries to keep. When the cache
+            is full, the least recently used entry is evicted. A maxsize of 0
+            disables caching.
+        :param ttl: if not None, entries expire this many seconds after they
+            were set
+        :param timer: the clock used to expire entries
+        """
+        if maxsize < 0:
+            raise ValueError(f"maxsize must be non-negative, got {maxsize}")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"ttl must be positive, got {ttl}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        # key -> (expiry time or None, value)
+        self._data: OrderedDict[K, tuple[Optional[float], V]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self._lookup(key) is not MISSING
+
+    def _lookup(self, key: K) -> Any:
+        try:
+            expires, value = self._data[key]
+        except KeyError:
+            return MISSING
+        if expires is not None and self._timer() >= expires:
+            del self._data[key]
+            return MISSING
+        return value
+
+    def get(self, key: K, default: Any = None) -> Any:
+        """
+        Get the value cached for ``key`` and mark it as recently used.
+
+        :param key: the key to look up
+        :param default: the value to return if the key is not cached
+        :return: the cached value or ``default``
+        """
+        value = self._lookup(key)
+        if value is MISSING:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V):
+        if self.maxsize == 0:
+            return
+        expires = self._timer() + self.ttl if self.ttl is not None else None
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: K):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self.hits, misses=self.misses, size=len(self), maxsize=self.maxsize
+        )
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
@@ -1,4 +1,5 @@
 __all__ = [
+    "MESSAGE_CONTENT_LIMIT",
     "AutoOrder",
     "date_handler",
     "privacy_handler",
@@ -6,6 +7,7 @@ __all__ = [
     "find_user_in_mutual_guilds",
     "find_users_by_display_name",
     "find_users_by_username",
+    "split_message",
 ]
 
 from datetime import date
@@ -20,6 +22,9 @@ from .time import parse_date
 
 logger = logging.getLogger("sandpiper.common.discord")
 
+# The maximum number of characters in a Discord message's content
+MESSAGE_CONTENT_LIMIT = 2000
+
 
 class AutoOrder:
     """
@@ -54,6 +59,37 @@ class AutoOrder:
         return command
 
 
+def split_message(content: str, limit: int = MESSAGE_CONTENT_LIMIT) -> list[str]:
+    """
+    Split message content into chunks that each fit in a Discord message.
+    Chunks are split on line boundaries where possible.
+
+    :param content: the message content to split
+    :param limit: the maximum number of characters in each chunk
+    :return: a list of chunks, which is empty if ``content`` is empty
+    """
+    chunks = []
+    chunk = ""
+    for line in content.split("\n"):
+        # Lines that can't fit in a message on their own are split anywhere
+        while len(line) > limit:
+            if chunk:
+                chunks.append(chunk)
+                chunk = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if not chunk:
+            chunk = line
+        elif len(chunk) + 1 + len(line) <= limit:
+            chunk += "\n" + line
+        else:
+            chunks.append(chunk)
+            chunk = line
+    if chunk.strip():
+        chunks.append(chunk)
+    return chunks
+
+
 def cheap_user_hash(user_id: int) -> int:
     return user_id >> 22
 
@@ -67,11 +67,9 @@ class SimpleEmbed:
             raise TypeError("msg must be of type str")
         self.message_parts.append(msg)
 
-    async def send(self, messageable: discord.abc.Messageable):
+    def build(self) -> discord.Embed:
         """
-        Send the embed to `messageable`.
-
-        :param messageable: a messageable interface to send the embed to
+        Build a Discord embed to send, e.g. along with message content.
         """
         desc = None
         if self.message_parts:
@@ -83,7 +81,15 @@ class SimpleEmbed:
             for name, value, inline in self.fields:
                 embed.add_field(name=name, value=value, inline=inline)
 
-        await messageable.send(embed=embed)
+        return embed
+
+    async def send(self, messageable: discord.abc.Messageable):
+        """
+        Send the embed to `messageable`.
+
+        :param messageable: a messageable interface to send the embed to
+        """
+        await messageable.send(embed=self.build())
 
 
 class SuccessEmbed(SimpleEmbed):
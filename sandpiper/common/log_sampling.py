@@ -0,0 +1,41 @@
+__all__ = ["SamplingFilter"]
+
+import logging
+import threading
+
+
+class SamplingFilter(logging.Filter):
+    """
+    A logging filter that only lets through one of every ``every`` records.
+
+    Add it to a logger for high-volume messages (like every database access)
+    to keep a representative trickle of them in the logs without the log
+    files growing huge. Records at WARNING or above always get through.
+    """
+
+    def __init__(self, every: int, name: str = ""):
+        """
+        :param every: let through one of every this many records. 1 lets
+            through every record.
+        :param name: passed to ``logging.Filter``
+        """
+        super().__init__(name)
+        if every < 1:
+            raise ValueError(f"every must be at least 1, got {every}")
+        self.every = every
+        self._count = 0
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not super().filter(record):
+            return False
+        if record.levelno >= logging.WARNING or self.every == 1:
+            return True
+        with self._lock:
+            self._count += 1
+            if self._count >= self.every:
+                self._count = 0
+                return True
+            self.dropped += 1
+            return False
@@ -0,0 +1,129 @@
+__all__ = ["RateLimitStats", "RateLimiter"]
+
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+import time
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+@dataclass(frozen=True)
+class RateLimitStats:
+    allowed: int
+    dropped: int
+    keys: int
+
+    def __str__(self):
+        return f"allowed={self.allowed} dropped={self.dropped} keys={self.keys}"
+
+
+class RateLimiter(Generic[K]):
+    """
+    A token bucket rate limiter with a separate bucket for each key.
+
+    Each bucket holds up to ``capacity`` tokens and refills at a rate of
+    ``capacity`` tokens every ``period`` seconds, so each key can make short
+    bursts of up to ``capacity`` requests but no more than that on average
+    over each period. Requests that are allowed or dropped are counted and
+    can be inspected with ``stats``.
+    """
+
+    # Forget about buckets that have refilled completely once there are this
+    # many, since a full bucket is the same as no bucket
+    PRUNE_THRESHOLD = 1024
+
+    def __init__(
+        self,
+        capacity: int,
+        period: float,
+        *,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param capacity: the maximum number of requests a key can make in a
+            burst. A capacity of 0 disables rate limiting.
+        :param period: the number of seconds it takes for an empty bucket to
+            refill completely
+        :param timer: the clock used to refill buckets
+        """
+        if capacity < 0:
+            raise ValueError(f"capacity must be non-negative, got {capacity}")
+        if period <= 0:
+            raise ValueError(f"period must be positive, got {period}")
+        self.capacity = capacity
+        self.period = period
+        self._rate = capacity / period
+        self._timer = timer
+        # key -> (tokens, time the tokens were counted)
+        self._buckets: dict[K, tuple[float, float]] = {}
+        self.allowed = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _tokens(self, key: K, now: float) -> float:
+        try:
+            tokens, last = self._buckets[key]
+        except KeyError:
+            return self.capacity
+        return min(self.capacity, tokens + (now - last) * self._rate)
+
+    def try_acquire(self, key: K) -> bool:
+        """
+        Take a token from a key's bucket if it has one.
+
+        :param key: the key to rate limit by
+        :return: whether the request is allowed
+        """
+        if not self.enabled:
+            self.allowed += 1
+            return True
+
+        now = self._timer()
+        tokens = self._tokens(key, now)
+        if tokens < 1:
+            self.dropped += 1
+            return False
+
+        self._buckets[key] = (tokens - 1, now)
+        self.allowed += 1
+        if len(self._buckets) > self.PRUNE_THRESHOLD:
+            self._prune(now)
+        return True
+
+    def refund(self, key: K):
+        """
+        Give back a token taken by ``try_acquire``, e.g. if the request was
+        dropped for some other reason. It's no longer counted as allowed.
+
+        :param key: the key the token was taken from
+        """
+        if not self.enabled:
+            self.allowed -= 1
+            return
+
+        now = self._timer()
+        self._buckets[key] = (min(self.capacity, self._tokens(key, now) + 1), now)
+        self.allowed -= 1
+
+    def _prune(self, now: float):
+        self._buckets = {
+            key: bucket
+            for key, bucket in self._buckets.items()
+            if self._tokens(key, now) < self.capacity
+        }
+
+    def clear(self):
+        self._buckets.clear()
+
+    def stats(self) -> RateLimitStats:
+        return RateLimitStats(
+            allowed=self.allowed, dropped=self.dropped, keys=len(self._buckets)
+        )
+
+    def reset_stats(self):
+        self.allowed = 0
+        self.dropped = 0
@@ -0,0 +1,106 @@
+import pytest
+
+from sandpiper.common.cache import LRUCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLRUCache:
+    def test_get_missing(self):
+        cache = LRUCache(2)
+        assert cache.get("a") is None
+        assert cache.get("a", 5) == 5
+
+    def test_set_get(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert "a" in cache
+        assert len(cache) == 1
+
+    def test_cached_none(self):
+        sentinel = object()
+        cache = LRUCache(2)
+        cache.set("a", None)
+        assert cache.get("a", sentinel) is None
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+
+    def test_maxsize_zero(self):
+        cache = LRUCache(0)
+        cache.set("a", 1)
+        assert "a" not in cache
+
+    def test_invalidate(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.invalidate("a")
+        cache.invalidate("b")
+        assert "a" not in cache
+
+    def test_clear(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_ttl(self):
+        timer = FakeTimer()
+        cache = LRUCache(2, ttl=10, timer=timer)
+        cache.set("a", 1)
+        timer.now = 9.9
+        assert cache.get("a") == 1
+        timer.now = 10
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_ttl_reset_on_set(self):
+        timer = FakeTimer()
+        cache = LRUCache(2, ttl=10, timer=timer)
+        cache.set("a", 1)
+        timer.now = 5
+        cache.set("a", 2)
+        timer.now = 12
+        assert cache.get("a") == 2
+
+    def test_stats(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+        stats = cache.stats()
+        assert stats.hits == 2
+        assert stats.misses == 1
+        assert stats.size == 1
+        assert stats.maxsize == 2
+        assert stats.hit_rate == pytest.approx(2 / 3)
+
+    def test_contains_not_counted(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.hits == 0
+        assert cache.misses == 0
+
+    def test_invalid_args(self):
+        with pytest.raises(ValueError):
+            LRUCache(-1)
+        with pytest.raises(ValueError):
+            LRUCache(1, ttl=0)
@@ -0,0 +1,38 @@
+import logging
+
+import pytest
+
+from sandpiper.common.log_sampling import SamplingFilter
+
+
+def make_record(level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("sandpiper.test", level, __file__, 0, "msg", (), None)
+
+
+class TestSamplingFilter:
+    def test_every_one(self):
+        f = SamplingFilter(1)
+        assert all(f.filter(make_record()) for _ in range(10))
+        assert f.dropped == 0
+
+    def test_samples(self):
+        f = SamplingFilter(3)
+        assert [f.filter(make_record()) for _ in range(6)] == [
+            False,
+            False,
+            True,
+            False,
+            False,
+            True,
+        ]
+        assert f.dropped == 4
+
+    def test_warnings_always_pass(self):
+        f = SamplingFilter(100)
+        assert f.filter(make_record(logging.WARNING))
+        assert f.filter(make_record(logging.ERROR))
+        assert f.dropped == 0
+
+    def test_invalid_every(self):
+        with pytest.raises(ValueError):
+            SamplingFilter(0)
@@ -0,0 +1,91 @@
+import pytest
+
+from sandpiper.common.rate_limit import RateLimiter
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRateLimiter:
+    def test_burst_then_drop(self):
+        limiter = RateLimiter(3, 10, timer=FakeTimer())
+        assert [limiter.try_acquire("a") for _ in range(4)] == [
+            True,
+            True,
+            True,
+            False,
+        ]
+
+    def test_keys_are_separate(self):
+        limiter = RateLimiter(1, 10, timer=FakeTimer())
+        assert limiter.try_acquire("a")
+        assert not limiter.try_acquire("a")
+        assert limiter.try_acquire("b")
+
+    def test_refill(self):
+        timer = FakeTimer()
+        limiter = RateLimiter(2, 10, timer=timer)
+        assert limiter.try_acquire("a")
+        assert limiter.try_acquire("a")
+        assert not limiter.try_acquire("a")
+        # One token refills every 5 seconds
+        timer.now = 4.9
+        assert not limiter.try_acquire("a")
+        timer.now = 5
+        assert limiter.try_acquire("a")
+        assert not limiter.try_acquire("a")
+
+    def test_refill_caps_at_capacity(self):
+        timer = FakeTimer()
+        limiter = RateLimiter(2, 10, timer=timer)
+        limiter.try_acquire("a")
+        timer.now = 1000
+        assert limiter.try_acquire("a")
+        assert limiter.try_acquire("a")
+        assert not limiter.try_acquire("a")
+
+    def test_disabled(self):
+        limiter = RateLimiter(0, 10, timer=FakeTimer())
+        assert not limiter.enabled
+        assert all(limiter.try_acquire("a") for _ in range(100))
+        assert limiter.stats().keys == 0
+
+    def test_invalid_args(self):
+        with pytest.raises(ValueError):
+            RateLimiter(-1, 10)
+        with pytest.raises(ValueError):
+            RateLimiter(1, 0)
+
+    def test_prune_full_buckets(self):
+        timer = FakeTimer()
+        limiter = RateLimiter(2, 10, timer=timer)
+        limiter.PRUNE_THRESHOLD = 3
+        for key in "abc":
+            limiter.try_acquire(key)
+        timer.now = 10
+        limiter.try_acquire("d")
+        assert limiter.stats().keys == 1
+
+    def test_stats(self):
+        limiter = RateLimiter(1, 10, timer=FakeTimer())
+        limiter.try_acquire("a")
+        limiter.try_acquire("a")
+        limiter.try_acquire("b")
+        stats = limiter.stats()
+        assert (stats.allowed, stats.dropped, stats.keys) == (2, 1, 2)
+        assert str(stats) == "allowed=2 dropped=1 keys=2"
+
+        limiter.reset_stats()
+        stats = limiter.stats()
+        assert (stats.allowed, stats.dropped) == (0, 0)
+
+    def test_clear(self):
+        limiter = RateLimiter(1, 10, timer=FakeTimer())
+        limiter.try_acquire("a")
+        limiter.clear()
+        assert limiter.try_acquire("a")
@@ -0,0 +1,73 @@
+from fuzzywuzzy import fuzz, process as fuzzy_process
+import pytest
+import pytz
+
+from sandpiper.common.time import fuzzy_match_timezone
+from sandpiper.common.timezone_search import TimezoneSearchIndex, timezone_search_index
+
+QUERIES = [
+    "new york",
+    "America/New_York",
+    "amst",
+    "london",
+    "los angeles",
+    "pacific",
+    "utc",
+    "gmt",
+    "eastern",
+    "Sao Paulo",
+    "São Paulo",
+    "tokyo japan",
+    "kolkata",
+    "a",
+    "xyz",
+    "",
+    "!!!",
+    "New_York America",
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+@pytest.mark.parametrize("score_cutoff", [0, 50, 75])
+def test_same_scores_as_fuzzywuzzy(query, score_cutoff):
+    expected = fuzzy_process.extractBests(
+        query,
+        pytz.common_timezones,
+        scorer=fuzz.partial_token_sort_ratio,
+        score_cutoff=score_cutoff,
+        limit=5,
+    )
+    assert timezone_search_index.search(query, score_cutoff, limit=5) == expected
+
+
+def test_no_limit():
+    matches = timezone_search_index.search("america", 50, limit=None)
+    assert len(matches) > 5
+    assert [score for _, score in matches] == sorted(
+        (score for _, score in matches), reverse=True
+    )
+
+
+class TestAliases:
+    def test_custom_aliases(self):
+        index = TimezoneSearchIndex(
+            ["Europe/Amsterdam"], {"Netherlands": "Europe/Amsterdam"}
+        )
+        assert index.search("netherlands", 50) == []
+        assert index.search("netherlands", 50, alias_threshold=75) == [
+            ("Europe/Amsterdam", 100)
+        ]
+
+    def test_alias_only_on_weak_match(self):
+        index = TimezoneSearchIndex(["Europe/Amsterdam"], {"Amsterdam": "Asia/Tokyo"})
+        assert index.search("amsterdam", 50, alias_threshold=75) == [
+            ("Europe/Amsterdam", 100)
+        ]
+
+    def test_country_name(self):
+        matches = fuzzy_match_timezone("netherlands")
+        assert matches.best_match == pytz.timezone("Europe/Amsterdam")
+
+    def test_multiple_timezone_country_not_aliased(self):
+        matches = timezone_search_index.search("united states", 50, alias_threshold=75)
+        assert all(score < 100 for _, score in matches)
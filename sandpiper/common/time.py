@@ -5,6 +5,10 @@ __all__ = [
     "parse_time",
     "parse_date",
     "format_date",
+    "Clock",
+    "FakeClock",
+    "get_clock",
+    "set_clock",
     "utc_now",
     "localize_time_to_datetime",
     "day_of_the_year",
@@ -18,10 +22,11 @@ import datetime as dt
 import re
 from typing import Optional, Union, cast
 
-from fuzzywuzzy import fuzz, process as fuzzy_process
 import pytz
 import tzlocal
 
+from sandpiper.common.timezone_search import timezone_search_index
+
 TimezoneType = Union[pytz.tzinfo.StaticTzInfo, pytz.tzinfo.DstTzInfo]
 
 time_pattern = re.compile(
@@ -121,10 +126,80 @@ except ValueError:
 time_format = f"%{no_zeropad}I:%M %p (%H:%M)"
 
 
+class Clock:
+    """
+    The system clock. The local timezone is looked up once and cached, since
+    it's expensive to look up and is very unlikely to change while the bot
+    is running.
+    """
+
+    def __init__(self):
+        self._local_zone: Optional[TimezoneType] = None
+
+    def now(self) -> dt.datetime:
+        """:return: the current time as an aware datetime in UTC"""
+        return dt.datetime.now(pytz.UTC)
+
+    def local_zone(self) -> TimezoneType:
+        """:return: the system-local timezone"""
+        if self._local_zone is None:
+            self._local_zone = cast(TimezoneType, tzlocal.get_localzone())
+        return self._local_zone
+
+    def local_now(self) -> dt.datetime:
+        """:return: the current time as an aware datetime in the local timezone"""
+        return self.now().astimezone(self.local_zone())
+
+
+class FakeClock(Clock):
+    """A clock that only moves when it's told to, for testing"""
+
+    def __init__(self, now: dt.datetime, local_zone: TimezoneType = pytz.UTC):
+        """
+        :param now: the time to start at. Naive datetimes are assumed to be
+            in UTC.
+        :param local_zone: the timezone to pretend is the system-local one
+        """
+        super().__init__()
+        self._local_zone = local_zone
+        self.set(now)
+
+    def set(self, now: dt.datetime):
+        if now.tzinfo is None:
+            now = pytz.UTC.localize(now)
+        self._now = now.astimezone(pytz.UTC)
+
+    def advance(self, delta: dt.timedelta):
+        self._now += delta
+
+    def now(self) -> dt.datetime:
+        return self._now
+
+
+_clock: Clock = Clock()
+
+
+def get_clock() -> Clock:
+    return _clock
+
+
+def set_clock(clock: Clock) -> Clock:
+    """
+    Replace the clock used by ``utc_now`` and the other functions in this
+    module.
+
+    :param clock: the new clock
+    :return: the previous clock, so it can be restored
+    """
+    global _clock
+    old_clock = _clock
+    _clock = clock
+    return old_clock
+
+
 def utc_now() -> dt.datetime:
-    # Get the system-local timezone and use it to localize dt.datetime.now()
-    local_tz = cast(TimezoneType, tzlocal.get_localzone())
-    return local_tz.localize(dt.datetime.now())
+    """:return: the current time as an aware datetime in UTC"""
+    return _clock.now()
 
 
 def parse_time(time_str: str) -> tuple[dt.time, Optional[str], bool]:
@@ -145,7 +220,7 @@ def parse_time(time_str: str) -> tuple[dt.time, Optional[str], bool]:
     # Handle keyword times
     if match["keyword"]:
         if match["now"]:
-            now = utc_now()
+            now = _clock.local_now()
             # This is a little heavy-handed because instead of just passing
             # back the localized datetime, we're passing the time and the
             # timezone name which will then be fuzzily matched elsewhere...
@@ -275,7 +350,9 @@ def fuzzy_match_timezone(
     tz_str: str, best_match_threshold=75, lower_score_cutoff=50, limit=5
 ) -> TimezoneMatches:
     """
-    Fuzzily match a timezone based on given timezone name.
+    Fuzzily match a timezone based on given timezone name. If no timezone name
+    scores above ``best_match_threshold``, the names of countries with a
+    single timezone are matched too.
 
     :param tz_str: timezone name to fuzzily match in pytz's list of timezones
     :param best_match_threshold: Score from 0-100 that the highest scoring
@@ -290,12 +367,11 @@ def fuzzy_match_timezone(
     # The regular token_sort_ratio just feels weird because it doesn't support
     # substrings. Searching "Amst" would pick "GMT" rather than "Amsterdam".
     # The _set_ratio methods are totally unusable.
-    matches: list[tuple[str, int]] = fuzzy_process.extractBests(
+    matches: list[tuple[str, int]] = timezone_search_index.search(
         tz_str,
-        pytz.common_timezones,
-        scorer=fuzz.partial_token_sort_ratio,
         score_cutoff=lower_score_cutoff,
         limit=limit,
+        alias_threshold=best_match_threshold,
     )
     tz_matches = TimezoneMatches(matches)
 
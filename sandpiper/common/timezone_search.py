@@ -0,0 +1,185 @@
+__all__ = ["TimezoneSearchIndex", "timezone_search_index"]
+
+from collections import Counter
+from collections.abc import Iterable
+import heapq
+from typing import Optional
+
+from fuzzywuzzy import fuzz, utils as fuzzy_utils
+import pytz
+
+from sandpiper.common.IANA import (
+    country_code_to_country_name,
+    timezone_to_country_code,
+)
+
+
+def _process(s: str) -> str:
+    """
+    Process a string the same way ``fuzz.partial_token_sort_ratio`` does:
+    strip non-alphanumerics, lowercase, and sort the tokens.
+    """
+    return " ".join(sorted(fuzzy_utils.full_process(s, force_ascii=True).split()))
+
+
+class _Entry:
+    __slots__ = ("name", "key", "chars")
+
+    def __init__(self, name: str, key: str):
+        self.name = name
+        self.key = key
+        self.chars = Counter(key)
+
+
+class TimezoneSearchIndex:
+    """
+    A prebuilt index for fuzzily searching timezone names.
+
+    Scores are exactly those of ``fuzz.partial_token_sort_ratio`` over the
+    timezone names, but every name is processed once when the index is built
+    instead of on every search. Before a name is scored, an upper bound on its
+    score is computed from the characters it has in common with the query,
+    and names that can't reach the score cutoff are skipped.
+
+    If no timezone name scores well enough to be a best match, country names
+    from the IANA ``iso3166.tab`` are searched too, scored with the stricter
+    ``fuzz.ratio``. Countries with a single
+    timezone (per ``zone.tab``) are aliases for that timezone, so "Netherlands"
+    can find Europe/Amsterdam.
+    """
+
+    # Aliases must score at least this high to be matched at all
+    ALIAS_SCORE_CUTOFF = 80
+
+    def __init__(
+        self,
+        timezone_names: Iterable[str],
+        country_aliases: Optional[dict[str, str]] = None,
+    ):
+        """
+        :param timezone_names: the names of the timezones to search
+        :param country_aliases: a dict of country name -> the name of the
+            country's only timezone
+        """
+        self._timezones = [_Entry(name, _process(name)) for name in timezone_names]
+        self._aliases = [
+            _Entry(tz_name, _process(country))
+            for country, tz_name in (country_aliases or {}).items()
+        ]
+
+    @classmethod
+    def from_iana(cls) -> "TimezoneSearchIndex":
+        """Build an index of pytz's common timezones and IANA country names"""
+        country_timezones: dict[str, list[str]] = {}
+        for tz_name, country_code in timezone_to_country_code.items():
+            if tz_name in pytz.common_timezones_set:
+                country_timezones.setdefault(country_code, []).append(tz_name)
+
+        country_aliases = {
+            country_code_to_country_name[code]: tz_names[0]
+            for code, tz_names in country_timezones.items()
+            if len(tz_names) == 1 and code in country_code_to_country_name
+        }
+        return cls(pytz.common_timezones, country_aliases)
+
+    @staticmethod
+    def _score_entries(
+        query: str,
+        entries: list[_Entry],
+        score_cutoff: int,
+        limit: Optional[int],
+        partial: bool = True,
+    ) -> list[tuple[str, int]]:
+        """
+        Score entries against an already processed query.
+
+        :param partial: whether to score with ``fuzz.partial_ratio`` rather
+            than ``fuzz.ratio``
+
+        :return: a list of (name, score) in the order of ``entries``. If
+            ``limit`` is not None, only entries that could be in the top
+            ``limit`` scores are guaranteed to be included.
+        """
+        query_chars = Counter(query)
+        matches = []
+        # The lowest of the best `limit` scores so far. Once we have that
+        # many matches, later entries must beat it to make the cut.
+        top_scores: list[int] = []
+        cutoff = score_cutoff
+        for entry in entries:
+            if cutoff > 0:
+                # At most `common` chars can match. partial_ratio compares
+                # the shorter string (length n) to a substring of the longer
+                # one, so its ratio is at most 2 * common / (n + common).
+                common = sum(
+                    min(count, entry.chars[char]) for char, count in query_chars.items()
+                )
+                if partial:
+                    length = min(len(query), len(entry.key)) + common
+                else:
+                    length = len(query) + len(entry.key)
+                if common == 0 or fuzzy_utils.intr(200 * common / length) < cutoff:
+                    continue
+            if partial:
+                score = fuzz.partial_ratio(query, entry.key)
+            else:
+                score = fuzz.ratio(query, entry.key)
+            if score < cutoff:
+                continue
+            matches.append((entry.name, score))
+            if limit is None or limit <= 0:
+                continue
+            if len(top_scores) < limit:
+                heapq.heappush(top_scores, score)
+            else:
+                heapq.heappushpop(top_scores, score)
+            if len(top_scores) == limit:
+                # Ties go to earlier entries, so later ones must score higher
+                cutoff = max(cutoff, top_scores[0] + 1)
+        return matches
+
+    def search(
+        self,
+        query: str,
+        score_cutoff: int = 0,
+        limit: Optional[int] = 5,
+        alias_threshold: Optional[int] = None,
+    ) -> list[tuple[str, int]]:
+        """
+        Search for timezones matching the query.
+
+        :param query: the timezone name to search for
+        :param score_cutoff: the minimum score from 0-100 of returned matches
+        :param limit: the maximum number of matches to return, or None for no
+            limit
+        :param alias_threshold: if the best timezone name scores below this,
+            country aliases are searched too. If None, aliases are never
+            searched.
+        :return: a list of (timezone_name, score) sorted by score descending
+        """
+        processed = _process(query)
+        matches = self._score_entries(processed, self._timezones, score_cutoff, limit)
+
+        best_score = max((score for _, score in matches), default=-1)
+        if alias_threshold is not None and best_score < alias_threshold:
+            scores = dict(matches)
+            # Country names are short, so partial or weak matches against
+            # them are too loose. Aliases can also raise the score of a timezone that
+            # was already matched, so don't cut them off at the top `limit`.
+            for tz_name, score in self._score_entries(
+                processed,
+                self._aliases,
+                max(score_cutoff, self.ALIAS_SCORE_CUTOFF),
+                None,
+                partial=False,
+            ):
+                if score > scores.get(tz_name, -1):
+                    scores[tz_name] = score
+            matches = list(scores.items())
+
+        if limit is None:
+            return sorted(matches, key=lambda i: i[1], reverse=True)
+        return heapq.nlargest(limit, matches, key=lambda i: i[1])
+
+
+timezone_search_index = TimezoneSearchIndex.from_iana()
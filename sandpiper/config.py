@@ -6,8 +6,9 @@ from functools import cached_property
 import logging
 from logging.handlers import TimedRotatingFileHandler
 from pathlib import Path
-from typing import Annotated, Literal
+from typing import Annotated, Literal, Optional
 
+from sandpiper.common.log_sampling import SamplingFilter
 from sandpiper.common.paths import MODULE_PATH
 from sandpiper.piperfig import *
 
@@ -31,8 +32,28 @@ class SandpiperConfig(ConfigSchema):
 
         class _Modules(ConfigSchema):
 
+            user_data: _UserData
             bios: _Bios
             birthdays: _Birthdays
+            conversion: _Conversion
+
+            class _UserData(ConfigSchema):
+
+                cache_max_users: Annotated[int, Bounded(0, None)] = 1024
+                cache_ttl: Optional[Annotated[int, Bounded(1, None)]] = None
+                sqlite: _SQLite
+
+                class _SQLite(ConfigSchema):
+
+                    journal_mode: Literal[
+                        "WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"
+                    ] = "WAL"
+                    synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+                    busy_timeout: Annotated[int, Bounded(0, None)] = 5000
+                    cache_size: Annotated[int, Bounded(0, None)] = 16384
+                    mmap_size: Annotated[int, Bounded(0, None)] = 64
+                    temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+                    pool_size: Optional[Annotated[int, Bounded(1, None)]] = 5
 
             class _Bios(ConfigSchema):
 
@@ -62,6 +83,16 @@ class SandpiperConfig(ConfigSchema):
                     "{They} just turned {age}! Happy birthday {ping}!!",
                 ]
 
+            class _Conversion(ConfigSchema):
+
+                timezone_cache_size: Annotated[int, Bounded(0, None)] = 512
+                group_timezones_by_offset = False
+                ignored_channels: list[int] = []
+                user_rate_limit_messages: Annotated[int, Bounded(0, None)] = 5
+                user_rate_limit_seconds: Annotated[int, Bounded(1, None)] = 10
+                channel_rate_limit_messages: Annotated[int, Bounded(0, None)] = 20
+                channel_rate_limit_seconds: Annotated[int, Bounded(1, None)] = 10
+
     class _Logging(ConfigSchema):
 
         _logging_levels = Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
@@ -75,6 +106,8 @@ class SandpiperConfig(ConfigSchema):
         interval: Annotated[int, Bounded(1, None)] = 1
         backup_count: Annotated[int, Bounded(0, None)] = 7
         format = "%(asctime)s %(levelname)s %(name)s | %(message)s"
+        user_data_access_log_sampling: Annotated[int, Bounded(1, None)] = 100
+        conversion_access_log_sampling: Annotated[int, Bounded(1, None)] = 10
 
         @cached_property
         def formatter(self):
@@ -91,6 +124,18 @@ class SandpiperConfig(ConfigSchema):
             handler.setFormatter(self.formatter)
             return handler
 
+        @cached_property
+        def access_log_filters(self) -> dict[str, SamplingFilter]:
+            """Sampling filters for high-volume loggers, keyed by logger name"""
+            return {
+                "sandpiper.user_data.access": SamplingFilter(
+                    self.user_data_access_log_sampling
+                ),
+                "sandpiper.conversion.access": SamplingFilter(
+                    self.conversion_access_log_sampling
+                ),
+            }
+
 
 if __name__ == "__main__":
     config = SandpiperConfig({"bot_token": "<BOT_TOKEN>"})
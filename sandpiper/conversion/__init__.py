@@ -1,7 +1,21 @@
-from discord.ext.commands import Bot
-
+from sandpiper import Sandpiper
 from .cog import Conversion
 
 
-async def setup(bot: Bot):
-    await bot.add_cog(Conversion(bot))
+async def setup(bot: Sandpiper):
+    config = bot.modules_config.conversion
+    conversion = Conversion(
+        bot,
+        timezone_cache_size=config.timezone_cache_size,
+        group_timezones_by_offset=config.group_timezones_by_offset,
+        ignored_channels=config.ignored_channels,
+        user_rate_limit=(
+            config.user_rate_limit_messages,
+            config.user_rate_limit_seconds,
+        ),
+        channel_rate_limit=(
+            config.channel_rate_limit_messages,
+            config.channel_rate_limit_seconds,
+        ),
+    )
+    await bot.add_cog(conversion)
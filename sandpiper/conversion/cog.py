@@ -1,18 +1,30 @@
+from collections.abc import Iterable
+import datetime as dt
 from decimal import Decimal
 import logging
-from typing import NoReturn
+from typing import Optional
 
 import discord
 import discord.ext.commands as commands
 import regex
 
+from sandpiper.common.discord import split_message
 from sandpiper.common.IANA import get_country_flag_emoji_from_timezone
 from sandpiper.common.embeds import *
 from sandpiper.common.misc import RuntimeMessages
+from sandpiper.common.rate_limit import RateLimiter
 from sandpiper.common.time import time_format
 from sandpiper.conversion.time_conversion import *
+from sandpiper.conversion.timezone_index import GuildTimezoneIndex
+from sandpiper.conversion.timezone_resolver import TimezoneResolver
 import sandpiper.conversion.unit_conversion as unit_conversion
-from sandpiper.user_data import DatabaseUnavailable, UserData
+from sandpiper.user_data import (
+    Database,
+    DatabaseUnavailable,
+    PrivacyType,
+    UserData,
+    UserNotInDatabase,
+)
 
 logger = logging.getLogger("sandpiper.unit_conversion")
 
@@ -27,101 +39,342 @@ conversion_pattern = regex.compile(
 )
 
 
+def _group_by_offset(
+    conversions: list[tuple[str, list[dt.datetime]]]
+) -> list[tuple[list[str], list[dt.datetime]]]:
+    """
+    Group converted times whose timezones have the same UTC offsets at every
+    converted time, so they'd be displayed with identical times.
+
+    :param conversions: a list of (timezone_name, converted_times) sorted by
+        UTC offset
+    :return: a list of (timezone_names, converted_times), with each group's
+        timezone names sorted
+    """
+    # offsets -> (timezone_names, converted_times)
+    groups: dict[tuple[dt.timedelta, ...], tuple[list[str], list[dt.datetime]]] = {}
+    for tz_name, times in conversions:
+        offsets = tuple(time.utcoffset() for time in times)
+        if offsets in groups:
+            groups[offsets][0].append(tz_name)
+        else:
+            groups[offsets] = ([tz_name], times)
+    return [(sorted(tz_names), times) for tz_names, times in groups.values()]
+
+
 class Conversion(commands.Cog):
-    def __init__(self, bot: commands.Bot):
+    def __init__(
+        self,
+        bot: commands.Bot,
+        *,
+        timezone_cache_size: int = 512,
+        group_timezones_by_offset: bool = False,
+        ignored_channels: Iterable[int] = (),
+        user_rate_limit: tuple[int, float] = (5, 10),
+        channel_rate_limit: tuple[int, float] = (20, 10),
+    ):
+        """
+        :param bot: the Discord bot
+        :param timezone_cache_size: the maximum number of timezone names to
+            cache when resolving timezones in time conversions
+        :param group_timezones_by_offset: whether to show timezones with the
+            same UTC offsets on a single line in time conversions
+        :param ignored_channels: IDs of channels where messages shouldn't be
+            scanned for conversions
+        :param user_rate_limit: a tuple of (messages, seconds). Each user can
+            get replies to this many messages with conversions in a burst,
+            refilling over this many seconds. 0 messages disables the limit.
+        :param channel_rate_limit: the same as ``user_rate_limit``, but for
+            each channel
+        """
         self.bot = bot
+        self.group_timezones_by_offset = group_timezones_by_offset
+        self.ignored_channels = frozenset(ignored_channels)
+        self.user_rate_limiter: RateLimiter[int] = RateLimiter(*user_rate_limit)
+        self.channel_rate_limiter: RateLimiter[int] = RateLimiter(*channel_rate_limit)
+        # (user_id, channel_id) -> the latest message that arrived while one
+        # from the same user and channel was being converted, or None
+        self._in_flight: dict[tuple[int, int], Optional[discord.Message]] = {}
+        # Number of messages that were skipped because a newer message from
+        # the same user and channel replaced them
+        self.coalesced_count = 0
+        self.timezone_index = GuildTimezoneIndex()
+        self.timezone_resolver = TimezoneResolver(timezone_cache_size)
+        self._index_building = False
+        # Users whose timezones changed while the index was being built
+        self._index_pending: set[int] = set()
+
+    async def _get_database(self) -> Optional[Database]:
+        user_data: UserData = self.bot.get_cog("UserData")
+        if user_data is None:
+            return None
+        try:
+            return await user_data.get_database()
+        except DatabaseUnavailable:
+            return None
+
+    async def cog_load(self):
+        # Start loading the unit registry now so it doesn't delay startup and
+        # is most likely ready by the first conversion
+        unit_conversion.warm_up()
+
+    async def cog_unload(self):
+        logger.info("Timezone name cache stats (%s)", self.timezone_resolver.stats)
+        logger.info(
+            "Conversion rate limit stats (user=%s channel=%s coalesced=%s)",
+            self.user_rate_limiter.stats(),
+            self.channel_rate_limiter.stats(),
+            self.coalesced_count,
+        )
+
+    # region Timezone index
+
+    @commands.Cog.listener(name="on_ready")
+    async def build_timezone_index(self):
+        """
+        Build the guild timezone index. Until it's built, time conversions
+        fall back to scanning the database.
+        """
+        db = await self._get_database()
+        if db is None:
+            logger.warning("Database unavailable; not building timezone index")
+            return
+
+        self._index_building = True
+        try:
+            all_timezones = await db.get_all_timezones()
+            self.timezone_index.build(all_timezones, self.bot.guilds)
+        finally:
+            self._index_building = False
+
+        # Catch up on any changes that happened during the build
+        pending = self._index_pending
+        self._index_pending = set()
+        for user_id in pending:
+            await self.notify_timezone_change(user_id)
+
+    async def notify_timezone_change(self, user_id: int):
+        """
+        This method should be called when a user's timezone or timezone
+        privacy changes so the timezone index can be updated.
+        """
+        if self._index_building:
+            self._index_pending.add(user_id)
+            return
+        if not self.timezone_index.built:
+            return
+
+        db = await self._get_database()
+        if db is None:
+            return
+
+        tz = None
+        if await db.get_privacy_timezone(user_id) is PrivacyType.PUBLIC:
+            try:
+                tz = await db.get_timezone(user_id)
+            except UserNotInDatabase:
+                pass
+        guild_ids = [g.id for g in self.bot.guilds if g.get_member(user_id)]
+        self.timezone_index.set_user_timezone(user_id, tz, guild_ids)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        self.timezone_index.add_member(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.timezone_index.remove_member(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        self.timezone_index.add_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.timezone_index.remove_guild(guild.id)
+
+    # endregion
 
     @commands.Cog.listener(name="on_message")
     async def conversions(self, msg: discord.Message):
         """
-        Scan a message for conversion strings.
+        Scan a message for conversion strings and reply with all conversions
+        and errors in a single message.
+
+        Each conversion string is classified once as a time or a quantity.
 
         :param msg: Discord message to scan for conversions
         """
-        if msg.author == self.bot.user:
+        content = msg.content
+        # Most messages don't have any conversions, so check for braces
+        # before running the much slower regex
+        if "{" not in content or "}" not in content:
+            return
+        if msg.author == self.bot.user or msg.channel.id in self.ignored_channels:
             return
 
+        key = (msg.author.id, msg.channel.id)
+        if key in self._in_flight:
+            # This user is already getting a conversion in this channel.
+            # Only keep their latest message to convert once it's done.
+            if self._in_flight[key] is not None:
+                self.coalesced_count += 1
+            self._in_flight[key] = msg
+            return
+
+        self._in_flight[key] = None
+        try:
+            while msg is not None:
+                if self._check_rate_limit(msg):
+                    await self.convert_message(msg)
+                msg = self._in_flight[key]
+                self._in_flight[key] = None
+        finally:
+            del self._in_flight[key]
+
+    def _check_rate_limit(self, msg: discord.Message) -> bool:
+        if not self.user_rate_limiter.try_acquire(msg.author.id):
+            logger.info(
+                "Dropping conversion; user is rate limited (user=%s)", msg.author.id
+            )
+            return False
+        if not self.channel_rate_limiter.try_acquire(msg.channel.id):
+            # The user shouldn't be charged for a message that wasn't converted
+            self.user_rate_limiter.refund(msg.author.id)
+            logger.info(
+                "Dropping conversion; channel is rate limited (channel=%s)",
+                msg.channel.id,
+            )
+            return False
+        return True
+
+    async def convert_message(self, msg: discord.Message):
+        """
+        Convert all conversion strings in a message and reply with all
+        conversions and errors in a single message. If the reply is too long
+        for one message, it's split across several.
+
+        :param msg: Discord message to convert
+        """
         conversion_strs = conversion_pattern.findall(msg.content)
         if not conversion_strs:
             return
 
-        conversion_strs = await self.convert_time(msg, conversion_strs)
-        await self.convert_measurements(msg.channel, conversion_strs)
+        # Classify each block once, as either a time or a quantity
+        time_msgs = RuntimeMessages()
+        times, quantity_strs = classify_conversions(
+            conversion_strs,
+            runtime_msgs=time_msgs,
+            timezone_resolver=self.timezone_resolver,
+        )
+        time_output = await self.convert_time(msg, times, time_msgs)
+        errors: list[Exception] = list(time_msgs.exceptions)
+        measurement_output = await self.convert_measurements(quantity_strs, errors)
+
+        content = "\n\n".join(
+            output for output in (time_output, measurement_output) if output
+        )
+        embed = None
+        if errors:
+            embed = ErrorEmbed([str(e) for e in errors], join="\n").build()
+        # Long replies are split across several messages, with the errors
+        # attached to the last one
+        chunks = split_message(content) or [None]
+        if chunks[-1] is None and embed is None:
+            return
+        for chunk in chunks[:-1]:
+            await msg.channel.send(chunk)
+        await msg.channel.send(chunks[-1], embed=embed)
 
     async def convert_time(
-        self, msg: discord.Message, time_strs: list[tuple[str, str]]
-    ) -> list[tuple[str, str]]:
+        self,
+        msg: discord.Message,
+        times: list[ParsedTime],
+        runtime_msgs: RuntimeMessages,
+    ) -> Optional[str]:
         """
-        Convert a list of time strings (like "5:45 PM") to different users'
-        timezones and reply with the conversions.
+        Convert a list of times to different users' timezones.
 
         :param msg: Discord message that triggered the conversion
-        :param time_strs: a list of strings that may be valid times
-        :returns: a list of strings that could not be converted
+        :param times: a list of times from ``classify_conversions``
+        :param runtime_msgs: the messages generated while classifying the
+            times, which conversion errors are added to
+        :returns: the formatted conversions, or None if there were none or
+            anything went wrong
         """
 
-        user_data: UserData = self.bot.get_cog("UserData")
-        if user_data is None:
-            # User data cog couldn't be retrieved, so consider all conversions
-            # failed
-            return time_strs
-
-        try:
-            db = await user_data.get_database()
-        except DatabaseUnavailable:
-            return time_strs
+        if not times:
+            return None
+        db = await self._get_database()
+        if db is None:
+            return None
 
-        runtime_msgs = RuntimeMessages()
-        converted_times, failed = await convert_time_to_user_timezones(
-            db, msg.author.id, msg.guild, time_strs, runtime_msgs=runtime_msgs
+        converted_times = await convert_time_to_user_timezones(
+            db,
+            msg.author.id,
+            msg.guild,
+            times,
+            runtime_msgs=runtime_msgs,
+            timezone_index=self.timezone_index,
         )
 
         if runtime_msgs.exceptions:
-            # Send embed with any errors that happened during conversion
-            await ErrorEmbed([str(e) for e in runtime_msgs.exceptions], join="\n").send(
-                msg.channel
-            )
-            return failed
-
-        if converted_times:
-            # Send successful conversions
-            output = []
-            for timezone_in, conversions in converted_times:
-                # There may be multiple input timezones
-                # We will group them under a header of that timezone name
-                if timezone_in is not None:
-                    # But if no input timezone was specified, don't print any
-                    # header
-                    output.append(f"Using timezone **{timezone_in}**")
-
-                for timezone_out, times in conversions:
-                    # Print the converted times for each timezone on a new line
-                    times = "  |  ".join(
-                        f"`{time.strftime(time_format)}`" for time in times
-                    )
-                    flag = get_country_flag_emoji_from_timezone(timezone_out)
-                    output.append(f"{flag}  **{timezone_out}**  -  {times}")
+            # Only report the errors if anything went wrong
+            return None
 
-                output.append("")
+        if not converted_times:
+            return None
 
-            await msg.channel.send("\n".join(output[:-1]))
+        output = []
+        for timezone_in, conversions in converted_times:
+            # There may be multiple input timezones
+            # We will group them under a header of that timezone name
+            if timezone_in is not None:
+                # But if no input timezone was specified, don't print any
+                # header
+                output.append(f"Using timezone **{timezone_in}**")
 
-        return failed
+            if self.group_timezones_by_offset:
+                groups = _group_by_offset(conversions)
+            else:
+                groups = [([tz], times) for tz, times in conversions]
+
+            for timezones_out, times in groups:
+                # Print the converted times for each timezone (or group of
+                # timezones) on a new line
+                times = "  |  ".join(
+                    f"`{time.strftime(time_format)}`" for time in times
+                )
+                flags = "".join(
+                    dict.fromkeys(
+                        get_country_flag_emoji_from_timezone(tz) for tz in timezones_out
+                    )
+                )
+                names = ", ".join(timezones_out)
+                output.append(f"{flags}  **{names}**  -  {times}")
+
+            output.append("")
+
+        return "\n".join(output[:-1])
 
     async def convert_measurements(
-        self, channel: discord.TextChannel, quantity_strs: list[tuple[str, str]]
-    ) -> NoReturn:
+        self, quantity_strs: list[tuple[str, str]], errors: list[Exception]
+    ) -> Optional[str]:
         """
         Convert a list of quantity strings (like "5 km") between imperial and
-        metric and reply with the conversions.
+        metric.
 
-        :param channel: Discord channel to send conversions message to
         :param quantity_strs: a list of strings that may be valid quantities
-        :returns: a list of strings that could not be converted
+        :param errors: a list to add errors to, which should be reported back
+            to the user
+        :returns: the formatted conversions, or None if there were none
         """
 
+        if not quantity_strs:
+            return None
+        await unit_conversion.wait_ready()
+
         conversions = []
-        failed: list[tuple[str, str]] = []
         runtime_msgs = RuntimeMessages()
         for qstr, unit in quantity_strs:
             q = unit_conversion.convert_measurement(
@@ -133,14 +386,6 @@ class Conversion(commands.Cog):
             elif isinstance(q, Decimal):
                 # We parsed as dimensionless and got a numeric type back
                 conversions.append(f"`{qstr}` = `{q}`")
-            else:
-                failed.append((qstr, unit))
-
-        if runtime_msgs.exceptions:
-            # Send embed with any errors that happened during conversion
-            await ErrorEmbed([str(e) for e in runtime_msgs.exceptions], join="\n").send(
-                channel
-            )
 
-        if conversions:
-            await channel.send("\n".join(conversions))
+        errors.extend(runtime_msgs.exceptions)
+        return "\n".join(conversions) or None
@@ -1,18 +1,29 @@
-__all__ = ["UserTimezoneUnset", "TimezoneNotFound", "convert_time_to_user_timezones"]
+__all__ = [
+    "UserTimezoneUnset",
+    "TimezoneNotFound",
+    "ParsedTime",
+    "classify_conversions",
+    "convert_time_to_user_timezones",
+]
 
 from collections import defaultdict
 from collections.abc import Iterable
+from dataclasses import dataclass
 import datetime as dt
 import logging
 from typing import Optional, Union, cast
 
 import discord
+import pytz
 
 from sandpiper.common.misc import RuntimeMessages
 from sandpiper.common.time import *
 from sandpiper.user_data import Database
+from .timezone_index import GuildTimezoneIndex
+from .timezone_resolver import TimezoneResolver
 
 logger = logging.getLogger("sandpiper.conversion.time_conversion")
+access_logger = logging.getLogger("sandpiper.conversion.access")
 
 T_ConvertedTimes = list[tuple[str, list[dt.datetime]]]
 T_ConvertedTimesGroupedUnderInputTimezones = list[
@@ -36,23 +47,40 @@ class TimezoneNotFound(Exception):
         return f'Timezone "{self.timezone}" not found'
 
 
-def _get_timezone(name: str) -> Optional[TimezoneType]:
+def _get_timezone(
+    name: str, timezone_resolver: Optional[TimezoneResolver] = None
+) -> Optional[TimezoneType]:
     """
     Get the timezone that best matches this name. May return None if the fuzzy
     search score is less than 50.
+
+    :param name: the timezone name to match
+    :param timezone_resolver: an optional resolver which caches matched
+        timezone names
     """
+    if timezone_resolver is not None:
+        return timezone_resolver.resolve(name)
     matches = fuzzy_match_timezone(name, best_match_threshold=50, limit=1)
     return matches.best_match or None
 
 
-async def _get_guild_timezones(db: Database, guild: discord.Guild) -> set[TimezoneType]:
+async def _get_guild_timezones(
+    db: Database,
+    guild: discord.Guild,
+    timezone_index: Optional[GuildTimezoneIndex] = None,
+) -> set[TimezoneType]:
     """
     Get all user timezones from the given guild.
 
     :param db: the Database to get user data from
     :param guild: the guild to limit the search to
+    :param timezone_index: an optional index of guild timezones. If it's been
+        built, it's used instead of scanning the database.
     :return: a set of user timezones in this guild
     """
+    if timezone_index is not None and timezone_index.built:
+        return timezone_index.get_guild_timezones(guild.id)
+
     all_timezones = await db.get_all_timezones()
     return {
         # Filter out timezones of users outside this guild
@@ -62,6 +90,18 @@ async def _get_guild_timezones(db: Database, guild: discord.Guild) -> set[Timezo
     }
 
 
+def _from_utc(utc_times: list[dt.datetime], tz: TimezoneType) -> list[dt.datetime]:
+    """
+    Convert naive UTC datetimes to a timezone with ``tz.fromutc``, which skips
+    the UTC conversion ``datetime.astimezone`` would do for every timezone.
+
+    :param utc_times: a list of naive datetimes in UTC
+    :param tz: the timezone to convert to
+    :return: a list of the datetimes localized to ``tz``
+    """
+    return [tz.fromutc(time.replace(tzinfo=tz)) for time in utc_times]
+
+
 async def _convert_times(
     times: list[dt.datetime], out_timezones: Union[TimezoneType, Iterable[TimezoneType]]
 ) -> T_ConvertedTimes:
@@ -76,45 +116,125 @@ async def _convert_times(
     if isinstance(out_timezones, TimezoneType.__args__):
         out_timezones = (out_timezones,)
 
-    conversions: T_ConvertedTimes = []
-    for tz in out_timezones:
-        times = [time.astimezone(tz) for time in times]
-        conversions.append((tz.zone, times))
+    # Convert to UTC once so each timezone only needs a lookup of its offset.
+    # Timezones are grouped by name so each one is only converted to once.
+    utc_times = [time.astimezone(pytz.utc).replace(tzinfo=None) for time in times]
+    out_timezones = {tz.zone: tz for tz in out_timezones}
+    conversions: T_ConvertedTimes = [
+        (name, _from_utc(utc_times, tz)) for name, tz in out_timezones.items()
+    ]
     conversions.sort(key=lambda conv: conv[1][0].utcoffset())
     return conversions
 
 
+@dataclass(frozen=True)
+class ParsedTime:
+    """A conversion block that was classified as a time"""
+
+    local_time: dt.time
+    # None means the user's own timezone
+    timezone_in: Optional[TimezoneType]
+    # None means every timezone in the guild
+    timezone_out: Optional[TimezoneType]
+
+
+def classify_conversions(
+    conversion_strs: list[tuple[str, str]],
+    *,
+    runtime_msgs: RuntimeMessages,
+    timezone_resolver: Optional[TimezoneResolver] = None,
+) -> tuple[list[ParsedTime], list[tuple[str, str]]]:
+    """
+    Classify each conversion block as a time or a quantity. Blocks which are
+    definitely times but can't be converted (e.g. an unknown timezone) are
+    reported in ``runtime_msgs`` and dropped.
+
+    :param conversion_strs: a list of tuples of (value, out) where ``value``
+        may be a time or a quantity and ``out`` is an optional output timezone
+        or unit
+    :param runtime_msgs: A collection of messages that were generated during
+        runtime. These may be reported back to the user.
+    :param timezone_resolver: an optional resolver which caches matched
+        timezone names
+    :returns: A tuple of (times, quantities). ``times`` is a list of parsed
+        times and ``quantities`` is a list of tuples of (quantity, unit) that
+        should be passed on to unit conversion.
+    """
+    times: list[ParsedTime] = []
+    quantities: list[tuple[str, str]] = []
+    for tstr, out_str in conversion_strs:
+        try:
+            parsed_time, timezone_in_str, definitely_time = parse_time(tstr)
+        except ValueError as e:
+            access_logger.info(
+                "Failed to parse time string (string=%r, reason=%s)", tstr, e
+            )
+            # Failed to parse as a time, so pass it on to unit conversion
+            quantities.append((tstr, out_str))
+            continue
+        except:
+            logger.warning(
+                "Unhandled exception while parsing time string (string=%r)",
+                tstr,
+                exc_info=True,
+            )
+            continue
+
+        timezone_out = None
+        if out_str:
+            # Parse the output timezone specified by the user
+            timezone_out = _get_timezone(out_str, timezone_resolver)
+            if timezone_out is None:
+                if definitely_time:
+                    # We know this is a time, so this unfound timezone should
+                    # be reported and not passed on to unit conversion
+                    runtime_msgs += TimezoneNotFound(out_str)
+                else:
+                    # This might be a unit
+                    quantities.append((tstr, out_str))
+                continue
+
+        timezone_in = None
+        if timezone_in_str is not None:
+            # User supplied a source timezone
+            timezone_in = _get_timezone(timezone_in_str, timezone_resolver)
+            if timezone_in is None:
+                # If we matched timezone_in, we already know tstr is definitely
+                # a time
+                runtime_msgs += TimezoneNotFound(timezone_in_str)
+                continue
+
+        times.append(ParsedTime(parsed_time, timezone_in, timezone_out))
+    return times, quantities
+
+
 async def convert_time_to_user_timezones(
     db: Database,
     user_id: int,
     guild: discord.Guild,
-    time_strs: list[tuple[str, str]],
+    times: list[ParsedTime],
     *,
     runtime_msgs: RuntimeMessages,
-) -> tuple[T_ConvertedTimesGroupedUnderInputTimezones, list[tuple[str, str]]]:
+    timezone_index: Optional[GuildTimezoneIndex] = None,
+) -> T_ConvertedTimesGroupedUnderInputTimezones:
     """
     Convert times.
 
     :param db: the Database adapter for getting user timezones
     :param user_id: the id of the user asking for a time conversion
     :param guild: the guild the conversion is occurring in
-    :param time_strs: a list of tuples of (time, timezone) where ``time`` is a
-        string that may be a time and ``timezone`` is an optional timezone
-        name
+    :param times: a list of times from ``classify_conversions``
     :param runtime_msgs: A collection of messages that were generated during
         runtime. These may be reported back to the user.
-    :returns: A tuple of (conversions, failed, exceptions).
-        ``failed`` is a list of tuples of (quantity, unit) that could not be converted.
-        ``conversions`` is a list of tuples of (tz_name, converted_times).
+    :param timezone_index: an optional index of guild timezones to use instead
+        of scanning the database for the guild's timezones
+    :returns: A list of tuples of (tz_name, converted_times).
         ``tz_name`` is the name of the timezone the following times are in.
         ``converted_times`` is a list of datetimes localized to every timezone
             occupied by users in the guild.
     """
 
-    # region Parse input
-
-    # Attempt to parse the strings as times and populate success and failure
-    # lists accordingly
+    # region Localize input
 
     # This dict is a mapping of timezone keys to datetimes
     # Each datetime under a given timezone will be converted to that timezone
@@ -123,32 +243,10 @@ async def convert_time_to_user_timezones(
     out_timezone_map: dict[Optional[TimezoneType], list[dt.datetime]] = defaultdict(
         list
     )
-    failed: list[tuple[str, str]] = []  # Strings that should pass on to unit conversion
     user_tz = None
-    for tstr, timezone_out_str in time_strs:
-        try:
-            parsed_time, timezone_in_str, definitely_time = parse_time(tstr)
-        except ValueError as e:
-            logger.info(f"Failed to parse time string (string={tstr!r}, reason={e})")
-            # Failed to parse as a time, so pass it on to unit conversion
-            failed.append((tstr, timezone_out_str))
-            continue
-        except:
-            logger.warning(
-                f"Unhandled exception while parsing time string " f"(string={tstr!r})",
-                exc_info=True,
-            )
-            continue
-
-        if timezone_in_str is not None:
-            # User supplied a source timezone
-            timezone_in = _get_timezone(timezone_in_str)
-            if timezone_in is None:
-                # If we matched timezone_in, we already know tstr is definitely
-                # a time
-                runtime_msgs += TimezoneNotFound(timezone_in_str)
-                continue
-        else:
+    for parsed in times:
+        timezone_in = parsed.timezone_in
+        if timezone_in is None:
             # Use the user's timezone
             if user_tz is None:
                 # Only get this once
@@ -157,25 +255,11 @@ async def convert_time_to_user_timezones(
                     runtime_msgs.add_type_once(UserTimezoneUnset())
             timezone_in = user_tz
 
-        if timezone_out_str:
-            # Parse the output timezone specified by the user
-            timezone_out = _get_timezone(timezone_out_str)
-            if timezone_out is None:
-                if definitely_time:
-                    # We know this is a time, so this unfound timezone should
-                    # be reported and not passed on to unit conversion
-                    runtime_msgs += TimezoneNotFound(timezone_out_str)
-                else:
-                    # This might be a unit
-                    failed.append((tstr, timezone_out_str))
-        else:
-            timezone_out = None
-
-        local_dt = localize_time_to_datetime(parsed_time, timezone_in)
-        out_timezone_map[timezone_out].append(local_dt)
+        local_dt = localize_time_to_datetime(parsed.local_time, timezone_in)
+        out_timezone_map[parsed.timezone_out].append(local_dt)
 
     if not out_timezone_map:
-        return [], failed
+        return []
 
     # endregion
     # region Do conversions
@@ -185,7 +269,8 @@ async def convert_time_to_user_timezones(
     if out_timezone_map[None]:
         # No specific output timezone, so use all the timezones in the guild
         converted = await _convert_times(
-            out_timezone_map[None], await _get_guild_timezones(db, guild)
+            out_timezone_map[None],
+            await _get_guild_timezones(db, guild, timezone_index),
         )
         if len(out_timezone_map) == 1:
             # If there aren't any other out timezones, don't print the timezone
@@ -205,6 +290,6 @@ async def convert_time_to_user_timezones(
         converted = await _convert_times(times, timezone_out)
         conversions.append((cast(TimezoneType, times[0].tzinfo).zone, converted))
 
-    return conversions, failed
+    return conversions
 
     # endregion
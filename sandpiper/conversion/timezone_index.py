@@ -0,0 +1,141 @@
+__all__ = ["GuildTimezoneIndex"]
+
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+import logging
+from typing import Optional
+
+import discord
+
+from sandpiper.common.time import TimezoneType
+
+logger = logging.getLogger("sandpiper.conversion.timezone_index")
+
+
+class GuildTimezoneIndex:
+    """
+    An in-memory index of which public user timezones are present in each
+    guild. Each guild holds a count of members per timezone, so getting a
+    guild's timezones only costs as much as the number of distinct timezones
+    in it.
+
+    The index is built once from the database with ``build`` and must then be
+    kept up to date with ``set_user_timezone`` (when a user's timezone or its
+    privacy changes) and the member/guild methods (when Discord membership
+    changes).
+    """
+
+    def __init__(self):
+        self.built = False
+        # Public timezones of indexed users
+        self._user_timezones: dict[int, TimezoneType] = {}
+        # user_id -> IDs of guilds where the user's timezone is counted
+        self._user_guilds: dict[int, set[int]] = defaultdict(set)
+        # guild_id -> count of members per timezone
+        self._guild_timezones: dict[int, Counter[TimezoneType]] = defaultdict(Counter)
+
+    def build(
+        self,
+        user_timezones: Iterable[tuple[int, TimezoneType]],
+        guilds: Iterable[discord.Guild],
+    ):
+        """
+        Rebuild the index from scratch.
+
+        :param user_timezones: a list of (user_id, timezone) of all users
+            whose timezones are public
+        :param guilds: the guilds to index
+        """
+        self._user_timezones.clear()
+        self._user_guilds.clear()
+        self._guild_timezones.clear()
+        self._user_timezones.update(user_timezones)
+
+        guilds = list(guilds)
+        for user_id, tz in self._user_timezones.items():
+            for guild in guilds:
+                if guild.get_member(user_id):
+                    self._add(guild.id, user_id, tz)
+
+        self.built = True
+        logger.info(
+            "Built guild timezone index (users=%s guilds=%s)",
+            len(self._user_timezones),
+            len(guilds),
+        )
+
+    def _add(self, guild_id: int, user_id: int, tz: TimezoneType):
+        guilds = self._user_guilds[user_id]
+        if guild_id in guilds:
+            return
+        guilds.add(guild_id)
+        self._guild_timezones[guild_id][tz] += 1
+
+    def _remove(self, guild_id: int, user_id: int, tz: TimezoneType):
+        guilds = self._user_guilds.get(user_id)
+        if guilds is None or guild_id not in guilds:
+            return
+        guilds.discard(guild_id)
+        if not guilds:
+            del self._user_guilds[user_id]
+
+        counter = self._guild_timezones[guild_id]
+        counter[tz] -= 1
+        if counter[tz] <= 0:
+            del counter[tz]
+
+    def get_guild_timezones(self, guild_id: int) -> set[TimezoneType]:
+        """
+        :param guild_id: the guild to get timezones for
+        :return: a set of the public timezones of members of this guild
+        """
+        counter = self._guild_timezones.get(guild_id)
+        if counter is None:
+            return set()
+        return set(counter)
+
+    def set_user_timezone(
+        self, user_id: int, tz: Optional[TimezoneType], guild_ids: Iterable[int]
+    ):
+        """
+        Update a user's timezone.
+
+        :param user_id: the user whose timezone changed
+        :param tz: the user's new timezone, or None if their timezone was
+            deleted or made private
+        :param guild_ids: the IDs of all indexed guilds the user is a member
+            of
+        """
+        old_tz = self._user_timezones.pop(user_id, None)
+        if old_tz is not None:
+            for guild_id in list(self._user_guilds.get(user_id, ())):
+                self._remove(guild_id, user_id, old_tz)
+
+        if tz is None:
+            return
+        self._user_timezones[user_id] = tz
+        for guild_id in guild_ids:
+            self._add(guild_id, user_id, tz)
+
+    def add_member(self, guild_id: int, user_id: int):
+        tz = self._user_timezones.get(user_id)
+        if tz is not None:
+            self._add(guild_id, user_id, tz)
+
+    def remove_member(self, guild_id: int, user_id: int):
+        tz = self._user_timezones.get(user_id)
+        if tz is not None:
+            self._remove(guild_id, user_id, tz)
+
+    def add_guild(self, guild: discord.Guild):
+        for user_id, tz in self._user_timezones.items():
+            if guild.get_member(user_id):
+                self._add(guild.id, user_id, tz)
+
+    def remove_guild(self, guild_id: int):
+        self._guild_timezones.pop(guild_id, None)
+        for user_id in list(self._user_guilds):
+            guilds = self._user_guilds[user_id]
+            guilds.discard(guild_id)
+            if not guilds:
+                del self._user_guilds[user_id]
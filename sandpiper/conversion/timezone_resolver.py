@@ -0,0 +1,56 @@
+__all__ = ["TimezoneResolver"]
+
+import logging
+from typing import Optional
+
+from sandpiper.common.cache import MISSING, CacheStats, LRUCache
+from sandpiper.common.time import TimezoneType, fuzzy_match_timezone
+
+logger = logging.getLogger("sandpiper.conversion.timezone_resolver")
+
+
+class TimezoneResolver:
+    """
+    Resolves timezone names typed in conversions (like "est" or "london") to
+    timezones, remembering recent results in an LRU cache so repeated names
+    skip fuzzy matching. Names that don't match any timezone are cached too.
+    """
+
+    def __init__(self, max_size: int = 512):
+        """
+        :param max_size: the maximum number of timezone names to cache. 0
+            disables the cache.
+        """
+        self._cache: LRUCache[str, Optional[TimezoneType]] = LRUCache(max_size)
+
+    @staticmethod
+    def _normalize(name: str) -> str:
+        # Fuzzy matching ignores case and extra whitespace, so these names
+        # all resolve to the same timezone
+        return " ".join(name.lower().split())
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats()
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def resolve(self, name: str) -> Optional[TimezoneType]:
+        """
+        Get the timezone that best matches this name. May return None if the
+        fuzzy search score is less than 50.
+
+        :param name: the timezone name to resolve
+        :return: the best matching timezone, or None if there isn't a good
+            enough match
+        """
+        key = self._normalize(name)
+        tz = self._cache.get(key, MISSING)
+        if tz is not MISSING:
+            return tz
+
+        matches = fuzzy_match_timezone(key, best_match_threshold=50, limit=1)
+        tz = matches.best_match or None
+        self._cache.set(key, tz)
+        return tz
@@ -1,81 +1,180 @@
 __all__ = ["convert_measurement"]
 
+import asyncio
+import concurrent.futures
 from decimal import Decimal
 import logging
 import re
-from typing import Union
+import threading
+from typing import Optional, Union
 
 from pint import UndefinedUnitError as PintUndefinedUnitError, Unit, UnitRegistry
 from pint.quantity import Quantity
 
+from sandpiper.common.cache import LRUCache
 from sandpiper.common.misc import RuntimeMessages
 from sandpiper.conversion.unit_map import UnitMap
 
 logger = logging.getLogger("sandpiper.conversion.unit_conversion")
+# Each conversion is logged here. There are a lot of them, so they're usually
+# sampled (see ``SandpiperConfig._Logging``).
+access_logger = logging.getLogger("sandpiper.conversion.access")
+
+# The unit registry takes a while to build, so it's loaded in a background
+# thread by warm_up() rather than on import
+ureg: Optional[UnitRegistry] = None
+Q_: Optional[type[Quantity]] = None
+unit_map: Optional[UnitMap[Unit]] = None
+# Unit names/symbols/aliases -> the units pint parses them as
+unit_aliases: Optional[dict[str, Unit]] = None
+_registry_future: Optional[concurrent.futures.Future] = None
+_registry_lock = threading.Lock()
+
+
+def _build_registry() -> tuple[UnitRegistry, UnitMap[Unit], dict[str, Unit]]:
+    ureg = UnitRegistry(
+        autoconvert_offset_to_baseunit=True, non_int_type=Decimal  # For temperatures
+    )
+    ureg.define(
+        "@alias degreeC = c = C = degreec = degc = degC = °C = °c "
+        "= Celsius = celsius"
+    )
+    ureg.define(
+        "@alias degreeF = f = F = degreef = degf = degF = °F = °f "
+        "= Fahrenheit = fahrenheit"
+    )
+    ureg.define("@alias hour = h")
+
+    unit_map: UnitMap[Unit] = UnitMap(
+        two_way={
+            # Length
+            ureg.km: ureg.mile,
+            ureg.meter: ureg.foot,
+            ureg.cm: ureg.inch,
+            # Area
+            ureg.hectare: ureg.acre,
+            # Speed
+            ureg.kilometer_per_hour: ureg.mile_per_hour,
+            # Mass
+            ureg.gram: ureg.ounce,
+            ureg.kilogram: ureg.pound,
+            # Volume
+            ureg.liter: ureg.gallon,
+            ureg.milliliter: ureg.cup,
+            # Pressure
+            ureg.pascal: ureg.pound_force_per_square_inch,
+            # Temperature
+            ureg.celsius: ureg.fahrenheit,
+            # Energy
+            ureg.joule: ureg.foot_pound,
+            # Angle
+            ureg.radian: ureg.degree,
+        },
+        one_way={
+            # Length
+            ureg.yard: ureg.meter,
+            # Speed
+            ureg.meter_per_second: ureg.kilometer_per_hour,
+            ureg.foot_per_second: ureg.mile_per_hour,
+            # Mass
+            ureg.stone: ureg.kilogram,
+            # Volume
+            ureg.pint: ureg.liter,
+            ureg.fluid_ounce: ureg.milliliter,
+            # Pressure
+            # These two are both derived from pascals, so I think these one-way
+            # mappings are reasonable
+            ureg.atmosphere: ureg.pound_force_per_square_inch,
+            ureg.bar: ureg.pound_force_per_square_inch,
+            # Temperature
+            ureg.kelvin: ureg.celsius,
+            # Time
+            ureg.second: ureg.minute,
+            ureg.minute: ureg.hour,
+            ureg.hour: ureg.day,
+            ureg.day: ureg.week,
+        },
+    )
+    return ureg, unit_map, _build_unit_aliases(ureg, unit_map)
+
+
+def _build_unit_aliases(ureg: UnitRegistry, unit_map: UnitMap[Unit]) -> dict[str, Unit]:
+    """
+    Find the names that can be used to write each unit in the unit map, for
+    parsing simple quantities without pint's expression parser.
+
+    Every name is checked with pint so it always parses to the same unit
+    pint would parse it as.
+    """
+    candidates = set()
+    for unit in unit_map.units():
+        name = str(unit)
+        definition = ureg._units.get(name)
+        if definition is None:
+            continue
+        names = {name, definition.symbol, *definition.aliases}
+        for n in list(names):
+            if n:
+                # Plurals like "miles" and "lbs"
+                names.add(f"{n}s")
+        candidates.update(n for n in names if n)
+
+    aliases = {}
+    for alias in candidates:
+        if not simple_unit_pattern.fullmatch(alias):
+            continue
+        try:
+            quantity = ureg.parse_expression(f"1 {alias}")
+        except Exception:
+            continue
+        if isinstance(quantity, Quantity) and quantity.m == 1:
+            aliases[alias] = quantity.u
+    return aliases
+
+
+def _load_registry(future: concurrent.futures.Future):
+    global ureg, Q_, unit_map, unit_aliases
+    try:
+        logger.info("Loading unit registry")
+        registry, mapping, aliases = _build_registry()
+        ureg, Q_, unit_map = registry, registry.Quantity, mapping
+        unit_aliases = aliases
+        logger.info("Unit registry loaded")
+    except BaseException as e:
+        future.set_exception(e)
+    else:
+        future.set_result(registry)
+
+
+def warm_up() -> concurrent.futures.Future:
+    """
+    Start loading the unit registry in a background thread if it isn't
+    already loading.
+
+    :return: a future which resolves to the unit registry once it's loaded
+    """
+    global _registry_future
+    with _registry_lock:
+        if _registry_future is None:
+            _registry_future = concurrent.futures.Future()
+            threading.Thread(
+                target=_load_registry,
+                args=(_registry_future,),
+                name="sandpiper-unit-registry",
+                daemon=True,
+            ).start()
+        return _registry_future
+
+
+async def wait_ready() -> UnitRegistry:
+    """Wait for the unit registry to finish loading without blocking"""
+    return await asyncio.wrap_future(warm_up())
+
+
+def get_registry() -> UnitRegistry:
+    """Get the unit registry, blocking until it's loaded"""
+    return warm_up().result()
 
-ureg = UnitRegistry(
-    autoconvert_offset_to_baseunit=True, non_int_type=Decimal  # For temperatures
-)
-ureg.define(
-    "@alias degreeC = c = C = degreec = degc = degC = °C = °c " "= Celsius = celsius"
-)
-ureg.define(
-    "@alias degreeF = f = F = degreef = degf = degF = °F = °f "
-    "= Fahrenheit = fahrenheit"
-)
-ureg.define("@alias hour = h")
-Q_ = ureg.Quantity
-
-unit_map: UnitMap[Unit] = UnitMap(
-    two_way={
-        # Length
-        ureg.km: ureg.mile,
-        ureg.meter: ureg.foot,
-        ureg.cm: ureg.inch,
-        # Area
-        ureg.hectare: ureg.acre,
-        # Speed
-        ureg.kilometer_per_hour: ureg.mile_per_hour,
-        # Mass
-        ureg.gram: ureg.ounce,
-        ureg.kilogram: ureg.pound,
-        # Volume
-        ureg.liter: ureg.gallon,
-        ureg.milliliter: ureg.cup,
-        # Pressure
-        ureg.pascal: ureg.pound_force_per_square_inch,
-        # Temperature
-        ureg.celsius: ureg.fahrenheit,
-        # Energy
-        ureg.joule: ureg.foot_pound,
-        # Angle
-        ureg.radian: ureg.degree,
-    },
-    one_way={
-        # Length
-        ureg.yard: ureg.meter,
-        # Speed
-        ureg.meter_per_second: ureg.kilometer_per_hour,
-        ureg.foot_per_second: ureg.mile_per_hour,
-        # Mass
-        ureg.stone: ureg.kilogram,
-        # Volume
-        ureg.pint: ureg.liter,
-        ureg.fluid_ounce: ureg.milliliter,
-        # Pressure
-        # These two are both derived from pascals, so I think these one-way
-        # mappings are reasonable
-        ureg.atmosphere: ureg.pound_force_per_square_inch,
-        ureg.bar: ureg.pound_force_per_square_inch,
-        # Temperature
-        ureg.kelvin: ureg.celsius,
-        # Time
-        ureg.second: ureg.minute,
-        ureg.minute: ureg.hour,
-        ureg.hour: ureg.day,
-        ureg.day: ureg.week,
-    },
-)
 
 imperial_shorthand_pattern = re.compile(
     # Either feet or inches may be excluded, but not both, so make sure
@@ -93,6 +192,31 @@ imperial_shorthand_pattern = re.compile(
 )
 
 
+# A number followed by a single unit name, like "5 km", "72F" or "-1.5 °C"
+simple_quantity_pattern = re.compile(
+    r"^(?P<number>[+-]?(?:[0-9]+(?:\.[0-9]+)?|\.[0-9]+)) ?"
+    r"(?P<unit>[^\W\d_]\w*|°[CcFf])$"
+)
+simple_unit_pattern = re.compile(r"[^\W\d_]\w*|°[CcFf]")
+
+
+def _parse_simple_quantity(quantity_str: str) -> Optional[Quantity]:
+    """
+    Parse a quantity made of a number and a unit from the unit map without
+    pint's expression parser, which is much slower. The magnitude is always
+    a Decimal, like pint gives with ``non_int_type=Decimal`` (integers too).
+
+    :return: the parsed quantity, or None if it's not a simple quantity
+    """
+    match = simple_quantity_pattern.match(quantity_str)
+    if match is None:
+        return None
+    unit = unit_aliases.get(match["unit"])
+    if unit is None:
+        return None
+    return Q_(Decimal(match["number"]), unit)
+
+
 class UndefinedUnitError(Exception):
     def __init__(self, unit: str):
         self.unit = unit
@@ -121,11 +245,25 @@ class UnmappedUnitError(Exception):
         )
 
 
+_ConversionResult = Union[tuple[Quantity, Quantity], Decimal, None]
+# (quantity_str, unit) -> (result, exception to report or None)
+class _UnexpectedParseError(Exception):
+    pass
+
+
+conversion_cache: LRUCache[
+    tuple[str, Optional[str]], tuple[_ConversionResult, Optional[Exception]]
+] = LRUCache(1024)
+
+
 def convert_measurement(
     quantity_str: str, unit: str = None, *, runtime_msgs: RuntimeMessages = None
-) -> Union[tuple[Quantity, Quantity], Decimal, None]:
+) -> _ConversionResult:
     """
-    Parse and convert a quantity string between imperial and metric
+    Parse and convert a quantity string between imperial and metric. Results
+    are cached, so converting the same quantity again skips parsing. This
+    blocks if the unit registry hasn't finished loading; await
+    ``wait_ready`` first to avoid that.
 
     :param quantity_str: a string that may contain a quantity to be
         converted
@@ -136,52 +274,82 @@ def convert_measurement(
         otherwise a tuple of original quantity and converted quantity
     """
 
-    logger.info(f"Attempting unit conversion for {quantity_str!r}")
+    access_logger.info("Attempting unit conversion for %r", quantity_str)
+    get_registry()
+
+    key = (quantity_str, unit or None)
+    cached = conversion_cache.get(key)
+    if cached is not None:
+        access_logger.info("Using cached unit conversion")
+        result, exc = cached
+    else:
+        try:
+            result, exc = _convert_measurement(quantity_str, unit)
+        except _UnexpectedParseError:
+            # Don't cache this, since the failure may be transient
+            return None
+        conversion_cache.set(key, (result, exc))
+
+    if exc is not None and runtime_msgs is not None:
+        runtime_msgs += exc
+    return result
+
+
+def _convert_measurement(
+    quantity_str: str, unit: Optional[str]
+) -> tuple[_ConversionResult, Optional[Exception]]:
+    """
+    Parse and convert a quantity string without caching.
+
+    :return: a tuple of (result, exception). ``result`` is the same as in
+        ``convert_measurement`` and ``exception`` is an exception to report
+        to the user, or None.
+    :raises _UnexpectedParseError: if pint failed to parse the string for
+        an unexpected reason
+    """
 
     if height := imperial_shorthand_pattern.match(quantity_str):
         # User used imperial length shorthand
         # e.g. 5' 8" == 5 feet + 8 inches
-        logger.info("Imperial length shorthand detected")
+        access_logger.info("Imperial length shorthand detected")
         foot = Q_(Decimal(foot), "foot") if (foot := height["foot"]) else 0
         inch = Q_(Decimal(inch), "inch") if (inch := height["inch"]) else 0
         quantity: Quantity = foot + inch
+    elif (quantity := _parse_simple_quantity(quantity_str)) is not None:
+        pass
     else:
         # Regular parsing
         try:
             quantity = ureg.parse_expression(quantity_str)
         except PintUndefinedUnitError as e:
             unit = e.args[0]
-            logger.info(f"Undefined unit {unit}")
-            if runtime_msgs is not None:
-                runtime_msgs += UndefinedUnitError(unit)
-            return None
+            access_logger.info("Undefined unit %s", unit)
+            return None, UndefinedUnitError(unit)
         except Exception as e:
             logger.error(
                 "Unexpected error while parsing in unit conversion", exc_info=e
             )
-            return None
+            raise _UnexpectedParseError() from e
 
     if isinstance(quantity, Decimal):
-        logger.info(f"Parsed as a decimal")
-        return quantity
+        access_logger.info("Parsed as a decimal")
+        return quantity, None
 
     if not isinstance(quantity, Quantity):
         logger.warning(
-            f"Unexpected type {type(quantity)} encountered after parsing " f"expression"
+            "Unexpected type %s encountered after parsing expression", type(quantity)
         )
-        return None
+        return None, None
 
     if unit:
         # User specified an output unit
         unit_out = unit
     else:
         # Try getting the output unit from the unit map
-        if quantity.u not in unit_map:
-            logger.info(f"Unit not mapped {quantity.u}")
-            if runtime_msgs is not None:
-                runtime_msgs += UnmappedUnitError(quantity)
-            return None
-        unit_out = unit_map[quantity.u]
+        unit_out = unit_map.get(quantity.u)
+        if unit_out is None:
+            access_logger.info("Unit not mapped %s", quantity.u)
+            return None, UnmappedUnitError(quantity)
 
     try:
         # Convert to output unit
@@ -189,10 +357,14 @@ def convert_measurement(
     except PintUndefinedUnitError as e:
         # User specified an undefined output unit
         unit = e.args[0]
-        logger.info(f"Undefined unit {unit}")
-        if runtime_msgs is not None:
-            runtime_msgs += UndefinedUnitError(unit)
-        return None
+        access_logger.info("Undefined unit %s", unit)
+        return None, UndefinedUnitError(unit)
 
-    logger.info(f"Conversion successful: " f"{quantity:.2f~P} -> {quantity_out:.2f~P}")
-    return quantity, quantity_out
+    if access_logger.isEnabledFor(logging.INFO):
+        # Pint's format spec can't be used with %-style args
+        access_logger.info(
+            "Conversion successful: %s -> %s",
+            format(quantity, ".2f~P"),
+            format(quantity_out, ".2f~P"),
+        )
+    return (quantity, quantity_out), None
@@ -9,6 +9,8 @@ class UnitMap(Generic[T]):
 
     _two_way: dict[T, T]
     _one_way: dict[T, T]
+    # Both mappings merged so lookups only need one dict access
+    _map: dict[T, T]
 
     def __init__(self, *, two_way: dict[T, T], one_way: dict[T, T] = None):
         if not isinstance(two_way, dict):
@@ -26,18 +28,23 @@ class UnitMap(Generic[T]):
                     f"mapping in one_way will never be used."
                 )
             self._one_way[key] = value
+        self._map = {**self._one_way, **self._two_way}
 
     def __getitem__(self, key):
         try:
-            return self._two_way[key]
+            return self._map[key]
         except KeyError:
-            try:
-                return self._one_way[key]
-            except KeyError:
-                raise KeyError(f"Key {key} does not exist")
+            raise KeyError(f"Key {key} does not exist")
 
     def __contains__(self, key):
-        return key in self._two_way or key in self._one_way
+        return key in self._map
+
+    def get(self, key, default=None):
+        return self._map.get(key, default)
+
+    def units(self) -> set[T]:
+        """Get every unit that is mapped from or to"""
+        return {*self._map, *self._map.values()}
 
     @staticmethod
     def _create_bidict(dict_: dict[T, T]) -> dict[T, T]:
@@ -114,6 +114,8 @@ def run_bot():
     logger = logging.getLogger("sandpiper")
     logger.setLevel(config.logging.sandpiper_logging_level)
     logger.addHandler(config.logging.handler)
+    for name, log_filter in config.logging.access_log_filters.items():
+        logging.getLogger(name).addFilter(log_filter)
 
     # Discord logging
     logger = logging.getLogger("discord")
@@ -9,6 +9,7 @@ import discord.ext.commands as commands
 import pytest
 import pytz
 
+from sandpiper.common.time import FakeClock, set_clock
 from sandpiper.user_data import DatabaseSQLite
 from .helpers.discord import *
 from .helpers.mocking import MagicMock_, patch_all_symbol_imports
@@ -496,15 +497,20 @@ async def database() -> DatabaseSQLite:
 
 
 @pytest.fixture()
-def patch_localzone_utc() -> pytz.UTC:
-    # Patch localzone to use UTC
-    patcher = mock.patch("tzlocal.get_localzone", autospec=True)
-    mock_localzone = patcher.start()
-    mock_localzone.return_value = pytz.UTC
+def fake_clock() -> FakeClock:
+    """Replace the clock used by ``utc_now`` with a fake one"""
+    clock = FakeClock(dt.datetime.now(pytz.UTC))
+    old_clock = set_clock(clock)
 
-    yield pytz.UTC
+    yield clock
 
-    patcher.stop()
+    set_clock(old_clock)
+
+
+@pytest.fixture()
+def patch_localzone_utc(fake_clock) -> pytz.UTC:
+    # The fake clock's local timezone is UTC
+    yield pytz.UTC
 
 
 @pytest.fixture()
@@ -528,8 +534,9 @@ def patch_datetime() -> list[mock.MagicMock]:
 
 
 @pytest.fixture()
-def patch_datetime_now(patch_datetime):
+def patch_datetime_now(patch_datetime, fake_clock):
     def f(static_datetime: dt.datetime) -> dt.datetime:
+        fake_clock.set(static_datetime)
         for dt_mock in patch_datetime:
             dt_mock.datetime.now.return_value = static_datetime
             dt_mock.date.today.return_value = static_datetime.date()
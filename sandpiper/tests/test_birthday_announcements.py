@@ -0,0 +1,189 @@
+import asyncio
+import datetime as dt
+from unittest import mock
+
+import pytest
+import pytz
+
+from sandpiper.birthdays import Birthdays
+from sandpiper.birthdays.cog import BirthdayMessageNotSent
+from sandpiper.user_data import UserData
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture()
+async def birthdays_cog(bot, database) -> Birthdays:
+    await bot.add_cog(UserData(bot))
+    # Don't start the daily loop
+    with mock.patch(
+        "asyncio.run_coroutine_threadsafe", side_effect=lambda coro, loop: coro.close()
+    ):
+        cog = Birthdays(
+            bot,
+            message_templates_no_age=["{name}"],
+            message_templates_with_age=["{name} {age}"],
+            past_birthdays_day_range=7,
+            upcoming_birthdays_day_range=14,
+        )
+    yield cog
+    await cog.scheduler.stop()
+
+
+def fake_channel(channel_id: int, send) -> mock.Mock:
+    channel = mock.Mock()
+    channel.id = channel_id
+    channel.send = send
+    return channel
+
+
+class TestSendToChannels:
+    async def test_concurrent(self, birthdays_cog):
+        in_flight = 0
+        max_in_flight = 0
+
+        async def send(msg):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+        sends = [(i, fake_channel(i, send), "hi") for i in range(25)]
+        results = await birthdays_cog._send_to_channels(1, sends)
+
+        assert results == {i: None for i in range(25)}
+        assert max_in_flight == Birthdays.MAX_CONCURRENT_SENDS
+
+    async def test_failures_collected(self, birthdays_cog):
+        error = RuntimeError("Missing permissions")
+        ok = fake_channel(10, mock.AsyncMock())
+        bad = fake_channel(20, mock.AsyncMock(side_effect=error))
+
+        results = await birthdays_cog._send_to_channels(
+            1, [(1, ok, "happy birthday"), (2, bad, "happy birthday")]
+        )
+
+        assert results == {1: None, 2: error}
+        ok.send.assert_awaited_once_with("happy birthday")
+
+
+class TestOutbox:
+    @pytest.fixture()
+    def fire_time(self) -> dt.datetime:
+        return pytz.utc.localize(dt.datetime(2021, 2, 14, 5, 0))
+
+    @pytest.fixture(autouse=True)
+    def now(self, fake_clock, fire_time) -> dt.datetime:
+        fake_clock.set(fire_time)
+        return fire_time
+
+    @pytest.fixture()
+    async def pending_user(self, database, new_id, fire_time) -> int:
+        user_id = new_id()
+        await database.create_user(user_id)
+        await database.set_birthday_outbox(user_id, fire_time)
+        return user_id
+
+    async def test_recover(self, birthdays_cog, pending_user, fire_time):
+        await birthdays_cog.recover_outbox()
+        assert birthdays_cog.scheduler.pending() == [(fire_time, pending_user)]
+
+    async def test_recover_expired(
+        self, birthdays_cog, database, pending_user, fake_clock, fire_time
+    ):
+        # e.g. the bot was down for several days
+        fake_clock.set(fire_time + dt.timedelta(days=3))
+        await birthdays_cog.recover_outbox()
+        assert birthdays_cog.scheduler.pending() == []
+        with mock.patch.object(birthdays_cog, "send_birthday_message") as send:
+            await birthdays_cog.deliver_birthday(pending_user)
+        send.assert_not_awaited()
+        assert (await database.recover_birthday_outbox()) == []
+
+    async def test_deliver_expired(self, birthdays_cog, pending_user, fake_clock):
+        fake_clock.advance(Birthdays.OUTBOX_EXPIRY + dt.timedelta(seconds=1))
+        with mock.patch.object(birthdays_cog, "send_birthday_message") as send:
+            await birthdays_cog.deliver_birthday(pending_user)
+        send.assert_not_awaited()
+
+    async def test_deliver(self, birthdays_cog, database, pending_user):
+        with mock.patch.object(birthdays_cog, "send_birthday_message") as send:
+            await birthdays_cog.deliver_birthday(pending_user)
+            # Already sent, so a second delivery does nothing
+            await birthdays_cog.deliver_birthday(pending_user)
+        send.assert_awaited_once_with(pending_user)
+        assert (await database.get_last_birthday_notification(pending_user)) is not None
+        assert (await database.recover_birthday_outbox()) == []
+
+    async def test_deliver_canceled(self, birthdays_cog, pending_user):
+        await birthdays_cog.cancel_birthday(pending_user)
+        with mock.patch.object(birthdays_cog, "send_birthday_message") as send:
+            await birthdays_cog.deliver_birthday(pending_user)
+        send.assert_not_awaited()
+
+    async def test_reschedule_while_sending(
+        self, birthdays_cog, database, pending_user, fire_time
+    ):
+        birthday = dt.date(2000, 2, 14)
+        await database.set_birthday(pending_user, birthday)
+
+        async def send(user_id):
+            # e.g. the user changes their timezone mid-send
+            scheduled = await birthdays_cog.schedule_birthday(
+                user_id, birthday, now=fire_time + dt.timedelta(hours=1)
+            )
+            assert not scheduled
+
+        send = mock.AsyncMock(side_effect=send)
+        with mock.patch.object(birthdays_cog, "send_birthday_message", send):
+            await birthdays_cog.deliver_birthday(pending_user)
+            assert birthdays_cog.scheduler.pending() == []
+            await birthdays_cog.deliver_birthday(pending_user)
+        send.assert_awaited_once_with(pending_user)
+        assert (await database.recover_birthday_outbox()) == []
+
+    async def test_reschedule_keeps_retry(
+        self, birthdays_cog, database, pending_user, fire_time
+    ):
+        birthday = dt.date(2000, 2, 14)
+        await database.set_birthday(pending_user, birthday)
+        send = mock.AsyncMock(side_effect=BirthdayMessageNotSent)
+        with mock.patch.object(birthdays_cog, "send_birthday_message", send):
+            await birthdays_cog.deliver_birthday(pending_user)
+        retry_time = birthdays_cog.scheduler.get_fire_time(pending_user)
+
+        assert await birthdays_cog.schedule_birthday(
+            pending_user, birthday, now=fire_time + dt.timedelta(hours=1)
+        )
+        assert birthdays_cog.scheduler.get_fire_time(pending_user) == retry_time
+        assert (await database.claim_birthday_outbox(pending_user)) == 2
+
+    async def test_retry_with_backoff(self, birthdays_cog, database, pending_user):
+        send = mock.AsyncMock(side_effect=BirthdayMessageNotSent)
+        with mock.patch.object(birthdays_cog, "send_birthday_message", send):
+            await birthdays_cog.deliver_birthday(pending_user)
+            first_retry = birthdays_cog.scheduler.get_fire_time(pending_user)
+            await birthdays_cog.deliver_birthday(pending_user)
+            second_retry = birthdays_cog.scheduler.get_fire_time(pending_user)
+
+        assert first_retry is not None
+        assert (await database.recover_birthday_outbox()) == [
+            (pending_user, second_retry)
+        ]
+        assert (
+            second_retry - first_retry
+        ).total_seconds() >= Birthdays.OUTBOX_RETRY_DELAY.total_seconds()
+        assert (await database.get_last_birthday_notification(pending_user)) is None
+
+    async def test_give_up(self, birthdays_cog, database, pending_user):
+        send = mock.AsyncMock(side_effect=BirthdayMessageNotSent)
+        with mock.patch.object(
+            birthdays_cog, "send_birthday_message", send
+        ), mock.patch("sandpiper.birthdays.cog.logger") as logger:
+            for _ in range(Birthdays.OUTBOX_MAX_ATTEMPTS + 1):
+                await birthdays_cog.deliver_birthday(pending_user)
+
+        assert send.await_count == Birthdays.OUTBOX_MAX_ATTEMPTS
+        logger.error.assert_called_once()
+        assert (await database.recover_birthday_outbox()) == []
@@ -0,0 +1,140 @@
+import asyncio
+import datetime as dt
+from unittest import mock
+
+import pytest
+import pytz
+
+from sandpiper.birthdays import scheduler as scheduler_module
+from sandpiper.birthdays.scheduler import BirthdayScheduler
+
+pytestmark = pytest.mark.asyncio
+
+
+def utc(*args) -> dt.datetime:
+    return pytz.utc.localize(dt.datetime(*args))
+
+
+@pytest.fixture()
+def fired() -> list[int]:
+    return []
+
+
+@pytest.fixture()
+def now() -> list[dt.datetime]:
+    # A mutable clock that tests can move forward
+    return [utc(2020, 6, 1)]
+
+
+@pytest.fixture()
+async def scheduler(fired, now) -> BirthdayScheduler:
+    async def callback(user_id: int):
+        fired.append(user_id)
+
+    scheduler = BirthdayScheduler(callback, now=lambda: now[0])
+    yield scheduler
+    await scheduler.stop()
+
+
+async def run_pending_callbacks():
+    # Let the sleeper wake up and the callbacks it spawned run
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestQueue:
+    async def test_empty(self, scheduler):
+        assert len(scheduler) == 0
+        assert scheduler.pending() == []
+
+    async def test_pending_sorted(self, scheduler):
+        scheduler.schedule(1, utc(2020, 6, 1, 12))
+        scheduler.schedule(2, utc(2020, 6, 1, 6))
+        scheduler.schedule(3, utc(2020, 6, 1, 18))
+        assert scheduler.pending() == [
+            (utc(2020, 6, 1, 6), 2),
+            (utc(2020, 6, 1, 12), 1),
+            (utc(2020, 6, 1, 18), 3),
+        ]
+        assert len(scheduler) == 3
+        assert 1 in scheduler
+
+    async def test_reschedule(self, scheduler):
+        scheduler.schedule(1, utc(2020, 6, 1, 12))
+        scheduler.schedule(1, utc(2020, 6, 1, 6))
+        assert scheduler.pending() == [(utc(2020, 6, 1, 6), 1)]
+        assert scheduler.get_fire_time(1) == utc(2020, 6, 1, 6)
+
+    async def test_cancel(self, scheduler):
+        scheduler.schedule(1, utc(2020, 6, 1, 12))
+        scheduler.schedule(2, utc(2020, 6, 1, 6))
+        assert scheduler.cancel(2) is True
+        assert scheduler.cancel(2) is False
+        assert scheduler.pending() == [(utc(2020, 6, 1, 12), 1)]
+        assert 2 not in scheduler
+        assert scheduler.get_fire_time(2) is None
+
+    async def test_canceled_entries_cleaned_up(self, scheduler):
+        for i in range(100):
+            scheduler.schedule(i, utc(2020, 6, 1, 12))
+        for i in range(100):
+            scheduler.cancel(i)
+        assert len(scheduler._heap) == 0
+
+
+class TestFiring:
+    async def test_fires_past_immediately(self, scheduler, fired):
+        scheduler.schedule(1, utc(2020, 5, 31, 23))
+        scheduler.start()
+        await run_pending_callbacks()
+        assert fired == [1]
+        assert len(scheduler) == 0
+
+    async def test_fires_in_order(self, scheduler, fired, now):
+        scheduler.start()
+        scheduler.schedule(1, utc(2020, 6, 1, 0, 0, 0, 20000))
+        scheduler.schedule(2, utc(2020, 6, 1, 0, 0, 0, 10000))
+        scheduler.schedule(3, utc(2020, 6, 2))
+        await run_pending_callbacks()
+        assert fired == []
+
+        # Move the clock forward and wait for the sleeper to time out
+        now[0] = utc(2020, 6, 1, 0, 0, 0, 30000)
+        await asyncio.sleep(0.05)
+        await run_pending_callbacks()
+        assert fired == [2, 1]
+        assert scheduler.pending() == [(utc(2020, 6, 2), 3)]
+
+    async def test_earlier_schedule_wakes_sleeper(self, scheduler, fired):
+        scheduler.start()
+        scheduler.schedule(1, utc(2020, 6, 2))
+        await run_pending_callbacks()
+        scheduler.schedule(2, utc(2020, 5, 31))
+        await run_pending_callbacks()
+        assert fired == [2]
+
+    async def test_canceled_does_not_fire(self, scheduler, fired):
+        scheduler.schedule(1, utc(2020, 5, 31))
+        scheduler.cancel(1)
+        scheduler.start()
+        await run_pending_callbacks()
+        assert fired == []
+
+    async def test_callback_exception_does_not_stop_scheduler(self, fired, now, caplog):
+        async def callback(user_id: int):
+            if user_id == 1:
+                raise ValueError("oops")
+            fired.append(user_id)
+
+        scheduler = BirthdayScheduler(callback, now=lambda: now[0])
+        scheduler.start()
+        try:
+            with mock.patch.object(scheduler_module.logger, "error") as log_error:
+                scheduler.schedule(1, utc(2020, 5, 31))
+                await run_pending_callbacks()
+                scheduler.schedule(2, utc(2020, 5, 31))
+                await run_pending_callbacks()
+        finally:
+            await scheduler.stop()
+        assert fired == [2]
+        log_error.assert_called_once()
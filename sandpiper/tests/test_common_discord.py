@@ -0,0 +1,21 @@
+from sandpiper.common.discord import split_message
+
+
+class TestSplitMessage:
+    def test_empty(self):
+        assert split_message("") == []
+
+    def test_fits(self):
+        assert split_message("abc\ndef", limit=7) == ["abc\ndef"]
+
+    def test_split_on_lines(self):
+        assert split_message("abc\ndef\ngh", limit=6) == ["abc", "def\ngh"]
+
+    def test_long_line(self):
+        assert split_message("a\nbcdefgh\ni", limit=3) == ["a", "bcd", "efg", "h\ni"]
+
+    def test_chunks_within_limit(self):
+        content = "\n".join(f"line {i}" for i in range(1000))
+        chunks = split_message(content)
+        assert all(len(chunk) <= 2000 for chunk in chunks)
+        assert "\n".join(chunks) == content
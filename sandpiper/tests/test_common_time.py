@@ -5,7 +5,7 @@ import unittest.mock as mock
 
 import pytz
 
-from sandpiper.common.time import parse_time
+from sandpiper.common.time import Clock, FakeClock, parse_time, set_clock, utc_now
 
 
 class TestParseTime(unittest.TestCase):
@@ -26,14 +26,9 @@ class TestParseTime(unittest.TestCase):
         mock_datetime.date.side_effect = lambda *a, **kw: dt.date(*a, **kw)
         mock_datetime.time.side_effect = lambda *a, **kw: dt.time(*a, **kw)
 
-        # Patch localzone to use UTC
-        patcher = mock.patch(
-            "sandpiper.common.time.tzlocal.get_localzone", autospec=True
-        )
-        mock_localzone = patcher.start()
-        self.addCleanup(patcher.stop)
-
-        mock_localzone.return_value = pytz.UTC
+        # Use a fake clock whose local timezone is UTC
+        old_clock = set_clock(FakeClock(self.STATIC_NOW))
+        self.addCleanup(set_clock, old_clock)
 
     def assert_time(
         self,
@@ -144,3 +139,37 @@ class TestParseTime(unittest.TestCase):
         self.assert_time("now new york", self.STATIC_NOW.time(), "UTC", True)
         self.assert_time("noon new york", dt.time(12, 0), "new york", True)
         self.assert_time("midnight new york", dt.time(0, 0), "new york", True)
+
+
+class TestClock:
+    def test_now_is_utc(self):
+        now = Clock().now()
+        assert now.tzinfo is pytz.UTC
+
+    def test_local_zone_cached(self):
+        clock = Clock()
+        with mock.patch(
+            "sandpiper.common.time.tzlocal.get_localzone", autospec=True
+        ) as get_localzone:
+            get_localzone.return_value = pytz.timezone("Europe/London")
+            assert clock.local_zone() is clock.local_zone()
+        get_localzone.assert_called_once()
+
+    def test_fake_clock(self):
+        clock = FakeClock(
+            dt.datetime(2020, 6, 1, 9, 32),
+            local_zone=pytz.timezone("America/New_York"),
+        )
+        assert clock.now() == pytz.UTC.localize(dt.datetime(2020, 6, 1, 9, 32))
+        clock.advance(dt.timedelta(hours=1))
+        assert clock.now().hour == 10
+        assert clock.local_now().hour == 6
+        assert clock.local_now().tzinfo.zone == "America/New_York"
+
+    def test_utc_now_uses_clock(self):
+        clock = FakeClock(dt.datetime(2020, 6, 1, 9, 32))
+        old_clock = set_clock(clock)
+        try:
+            assert utc_now() == clock.now()
+        finally:
+            set_clock(old_clock)
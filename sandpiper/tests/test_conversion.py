@@ -1,14 +1,21 @@
+import asyncio
 import datetime as dt
+from decimal import Decimal
 from typing import Optional, Union
 import unittest
+from unittest import mock
 
 import discord
 import discord.ext.commands as commands
 import pytest
 import pytz
 
+from sandpiper.common.misc import RuntimeMessages
+from sandpiper.common.rate_limit import RateLimiter, RateLimitStats
 from sandpiper.common.time import TimezoneType, utc_now
 from sandpiper.conversion.cog import Conversion, conversion_pattern
+from sandpiper.conversion.time_conversion import _from_utc
+from sandpiper.conversion import unit_conversion
 from sandpiper.conversion.unit_conversion import imperial_shorthand_pattern
 from sandpiper.user_data import UserData
 from sandpiper.user_data.enums import PrivacyType
@@ -20,11 +27,60 @@ pytestmark = pytest.mark.asyncio
 
 @pytest.fixture()
 async def bot(bot) -> commands.Bot:
-    await bot.add_cog(Conversion(bot))
+    # Rate limiting is tested on its own; don't let it drop replies elsewhere
+    await bot.add_cog(
+        Conversion(bot, user_rate_limit=(0, 10), channel_rate_limit=(0, 10))
+    )
     await bot.add_cog(UserData(bot))
     return bot
 
 
+class TestRateLimiter:
+    @pytest.fixture()
+    def clock(self) -> list[float]:
+        return [0.0]
+
+    @pytest.fixture()
+    def limiter(self, clock) -> RateLimiter[int]:
+        return RateLimiter(2, 10, timer=lambda: clock[0])
+
+    def test_burst(self, limiter):
+        assert limiter.try_acquire(1)
+        assert limiter.try_acquire(1)
+        assert not limiter.try_acquire(1)
+        # Other keys have their own buckets
+        assert limiter.try_acquire(2)
+        assert limiter.stats() == RateLimitStats(allowed=3, dropped=1, keys=2)
+
+    def test_refill(self, limiter, clock):
+        assert limiter.try_acquire(1)
+        assert limiter.try_acquire(1)
+        clock[0] = 4.9
+        assert not limiter.try_acquire(1)
+        clock[0] = 5
+        assert limiter.try_acquire(1)
+        assert not limiter.try_acquire(1)
+
+    def test_refund(self, limiter):
+        assert limiter.try_acquire(1)
+        assert limiter.try_acquire(1)
+        limiter.refund(1)
+        assert limiter.try_acquire(1)
+        assert not limiter.try_acquire(1)
+        assert limiter.stats().allowed == 2
+
+    def test_disabled(self, clock):
+        limiter = RateLimiter(0, 10, timer=lambda: clock[0])
+        assert not limiter.enabled
+        assert all(limiter.try_acquire(1) for _ in range(100))
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            RateLimiter(-1, 10)
+        with pytest.raises(ValueError):
+            RateLimiter(1, 0)
+
+
 class TestImperialShorthandRegex:
     @staticmethod
     def _assert(
@@ -287,6 +343,152 @@ class TestUnitConversion:
         assert_no_reply(send)
 
 
+class TestUnitRegistryWarmUp:
+    async def test_wait_ready(self):
+        assert unit_conversion.warm_up() is unit_conversion.warm_up()
+        ureg = await unit_conversion.wait_ready()
+        assert ureg is unit_conversion.get_registry()
+        assert unit_conversion.ureg is ureg
+        assert unit_conversion.unit_map[ureg.km] == ureg.mile
+
+
+class TestSimpleQuantityParser:
+    @pytest.fixture(autouse=True)
+    def ureg(self):
+        return unit_conversion.get_registry()
+
+    @pytest.mark.parametrize(
+        "quantity_str",
+        ["5 km", "5km", "72F", "-1.11c", "10 °C", ".5 m", "180 lbs", "5 mph", "3 ft"],
+    )
+    def test_same_as_pint(self, ureg, quantity_str):
+        quantity = unit_conversion._parse_simple_quantity(quantity_str)
+        expected = ureg.parse_expression(quantity_str)
+        assert quantity.u == expected.u
+        assert quantity.m == expected.m
+        assert isinstance(quantity.m, Decimal)
+
+    @pytest.mark.parametrize(
+        "quantity_str", ["5 km", "-40 F", "0 m", "5.0 km", "-40.5 F", ".5 m"]
+    )
+    def test_same_magnitude_type_as_pint(self, ureg, quantity_str):
+        # The registry uses Decimal for integers too, so both parsers must
+        # give the same type for integer and decimal inputs
+        quantity = unit_conversion._parse_simple_quantity(quantity_str)
+        expected = ureg.parse_expression(quantity_str)
+        assert type(quantity.m) is type(expected.m) is Decimal
+        assert str(quantity.m) == str(expected.m)
+
+    def test_all_aliases_same_as_pint(self, ureg):
+        for alias in unit_conversion.unit_aliases:
+            quantity_str = f"12.5 {alias}"
+            quantity = unit_conversion._parse_simple_quantity(quantity_str)
+            expected = ureg.parse_expression(quantity_str)
+            assert (quantity.m, quantity.u) == (expected.m, expected.u), alias
+
+    def test_unit_map_covered(self, ureg):
+        aliases = set(unit_conversion.unit_aliases.values())
+        for unit in unit_conversion.unit_map.units():
+            assert unit in aliases
+
+    @pytest.mark.parametrize(
+        "quantity_str",
+        ["5 hogshead", "100 km/h", "5e3 m", "1,000 m", "2 * 7", "5  km", "5 KM"],
+    )
+    def test_falls_back_to_pint(self, quantity_str):
+        assert unit_conversion._parse_simple_quantity(quantity_str) is None
+
+
+class TestMeasurementCache:
+    @pytest.fixture(autouse=True)
+    def convert(self):
+        unit_conversion.conversion_cache.clear()
+        with mock.patch.object(
+            unit_conversion,
+            "_convert_measurement",
+            wraps=unit_conversion._convert_measurement,
+        ) as convert:
+            yield convert
+
+    def test_cached(self, convert):
+        first = unit_conversion.convert_measurement("5 km")
+        second = unit_conversion.convert_measurement("5 km")
+        assert second == first
+        assert convert.call_count == 1
+
+    def test_keyed_on_out_unit(self, convert):
+        _, km = unit_conversion.convert_measurement("5 mi")
+        _, ft = unit_conversion.convert_measurement("5 mi", "ft")
+        assert f"{km:~P}".endswith("km")
+        assert f"{ft:~P}".endswith("ft")
+        assert convert.call_count == 2
+
+    def test_decimal_cached(self, convert):
+        assert unit_conversion.convert_measurement("2 * 7") == 14
+        assert unit_conversion.convert_measurement("2 * 7") == 14
+        assert convert.call_count == 1
+
+    def test_errors_reported_from_cache(self, convert):
+        for _ in range(2):
+            runtime_msgs = RuntimeMessages()
+            assert (
+                unit_conversion.convert_measurement(
+                    "12.5 donuts", runtime_msgs=runtime_msgs
+                )
+                is None
+            )
+            assert [str(e) for e in runtime_msgs.exceptions] == [
+                'Unknown unit "donuts"'
+            ]
+        assert convert.call_count == 1
+
+    def test_unmapped_reported_from_cache(self, convert):
+        for _ in range(2):
+            runtime_msgs = RuntimeMessages()
+            unit_conversion.convert_measurement("5 hogshead", runtime_msgs=runtime_msgs)
+            assert len(runtime_msgs.exceptions) == 1
+            assert isinstance(
+                runtime_msgs.exceptions[0], unit_conversion.UnmappedUnitError
+            )
+        assert convert.call_count == 1
+
+    def test_unexpected_error_not_cached(self, convert):
+        parse_expression = unit_conversion.ureg.parse_expression
+        with mock.patch.object(
+            unit_conversion.ureg,
+            "parse_expression",
+            side_effect=[RuntimeError("Registry not ready"), parse_expression("5 km")],
+        ), mock.patch.object(unit_conversion, "logger") as logger:
+            assert unit_conversion.convert_measurement("5 km * 1") is None
+            logger.error.assert_called_once()
+            assert unit_conversion.convert_measurement("5 km * 1") is not None
+        assert convert.call_count == 2
+
+
+class TestFromUtc:
+    @pytest.mark.parametrize(
+        "utc_time",
+        [
+            dt.datetime(1800, 1, 1),
+            dt.datetime(2021, 3, 14, 6, 59, 59),
+            dt.datetime(2021, 3, 14, 7, 0),
+            dt.datetime(2021, 11, 7, 5, 59, 59),
+            dt.datetime(2021, 11, 7, 6, 0),
+            dt.datetime(2021, 6, 1, 12, 0),
+            dt.datetime(2100, 1, 1),
+        ],
+    )
+    def test_same_as_astimezone(self, utc_time):
+        aware = pytz.utc.localize(utc_time)
+        for name in pytz.common_timezones:
+            tz = pytz.timezone(name)
+            (converted,) = _from_utc([utc_time], tz)
+            expected = aware.astimezone(tz)
+            assert converted == expected
+            assert converted.replace(tzinfo=None) == expected.replace(tzinfo=None)
+            assert converted.tzinfo is expected.tzinfo, name
+
+
 class TestTimeConversion:
 
     T_TimezoneUser = tuple[discord.User, dt.datetime]
@@ -356,6 +558,39 @@ class TestTimeConversion:
         assert len(contents) == 1
         assert_regex(contents[0], *patterns)
 
+    # region Group timezones by offset
+
+    @pytest.fixture()
+    async def german_user(self, make_user_with_timezone) -> discord.User:
+        yield await make_user_with_timezone(pytz.timezone("Europe/Berlin"))
+
+    async def test_not_grouped(
+        self, bot, message, dutch_user, german_user, dispatch_msg_get_contents
+    ):
+        message.author = dutch_user
+        contents = await dispatch_msg_get_contents("do you guys wanna play at {9pm}?")
+        self._assert(
+            contents,
+            r"Europe/Amsterdam\*\*.+9:00 PM",
+            r"Europe/Berlin\*\*.+9:00 PM",
+        )
+
+    async def test_grouped(
+        self, bot, message, dutch_user, german_user, dispatch_msg_get_contents
+    ):
+        bot.get_cog("Conversion").group_timezones_by_offset = True
+        message.author = dutch_user
+        contents = await dispatch_msg_get_contents("do you guys wanna play at {9pm}?")
+        self._assert(
+            contents,
+            "\U0001f1f3\U0001f1f1\U0001f1e9\U0001f1ea  "
+            r"\*\*Europe/Amsterdam, Europe/Berlin\*\*.+9:00 PM",
+            r"Europe/London.+8:00 PM",
+            r"America/New_York.+3:00 PM",
+        )
+        assert len(contents[0].splitlines()) == 3
+
+    # endregion
     # region Get user's timezone
 
     async def test_basic_hour_period(
@@ -727,4 +962,132 @@ class TestTimeConversion:
         )
         self._assert(contents, "🇺🇸", "🇬🇧", "🇳🇱")
 
+    async def test_no_braces_skips_regex(self, message, american_user, dispatch_msg):
+        message.author = american_user
+        with mock.patch("sandpiper.conversion.cog.conversion_pattern") as pattern:
+            send = await dispatch_msg("no conversions at 9pm here")
+            send_one_brace = await dispatch_msg("just one { brace at 9pm")
+        pattern.findall.assert_not_called()
+        assert_no_reply(send)
+        assert_no_reply(send_one_brace)
+
+    async def test_ignored_channel(self, bot, message, american_user, dispatch_msg):
+        bot.get_cog("Conversion").ignored_channels = frozenset({message.channel.id})
+        message.author = american_user
+        send = await dispatch_msg("at {9pm} I'll run {5 km}")
+        assert_no_reply(send)
+
+    async def test_time_and_unit_single_reply(
+        self, message, american_user, dispatch_msg
+    ):
+        message.author = american_user
+        send = await dispatch_msg("at {9pm} I'll run {5 km}")
+        send.assert_called_once()
+        contents = get_contents(send)
+        self._assert(contents, r"Europe/London.+2:00 AM", r"5.00 km.+3.11 mi")
+        assert get_embeds(send) == []
+
+    async def test_errors_single_reply(self, message, american_user, dispatch_msg):
+        message.author = american_user
+        send = await dispatch_msg("{8:00 ZBNMBSAEFHJBGEWB} and {12.5 donuts}")
+        send.assert_called_once()
+        assert get_contents(send) == []
+        assert_error(
+            get_embeds(send),
+            'Timezone "ZBNMBSAEFHJBGEWB" not found',
+            'Unknown unit "donuts"',
+        )
+
+    async def test_conversions_with_errors_single_reply(
+        self, message, american_user, dispatch_msg
+    ):
+        message.author = american_user
+        send = await dispatch_msg("{5 km} and {12.5 donuts}")
+        send.assert_called_once()
+        self._assert(get_contents(send), r"5.00 km.+3.11 mi")
+        assert_error(get_embeds(send), 'Unknown unit "donuts"')
+
+    async def test_long_reply_split(self, message, american_user, dispatch_msg):
+        message.author = american_user
+        # Each conversion line is ~25 characters, so this is over 2000
+        quantities = [f"{{{i} km}}" for i in range(1, 121)]
+        send = await dispatch_msg(" ".join(quantities) + " {12.5 donuts}")
+        contents = get_contents(send)
+        assert len(contents) > 1
+        assert all(len(content) <= 2000 for content in contents)
+        lines = "\n".join(contents).splitlines()
+        assert len(lines) == len(quantities)
+        assert lines[0].startswith("`1.00 km`")
+        assert lines[-1].startswith("`120.00 km`")
+        # The errors are attached to the last message
+        assert send.call_args_list[-1].kwargs["embed"] is not None
+        assert_error(get_embeds(send), 'Unknown unit "donuts"')
+        assert len(get_embeds(send)) == 1
+
+    async def test_user_rate_limited(self, bot, message, american_user, dispatch_msg):
+        cog = bot.get_cog("Conversion")
+        cog.user_rate_limiter = RateLimiter(2, 60, timer=lambda: 0)
+        message.author = american_user
+        sends = [await dispatch_msg("{5 km}") for _ in range(3)]
+        sends[0].assert_called_once()
+        sends[1].assert_called_once()
+        assert_no_reply(sends[2])
+        assert cog.user_rate_limiter.stats().dropped == 1
+
+    async def test_channel_rate_limited(
+        self, bot, message, american_user, dispatch_msg
+    ):
+        cog = bot.get_cog("Conversion")
+        cog.channel_rate_limiter = RateLimiter(1, 60, timer=lambda: 0)
+        message.author = american_user
+        send = await dispatch_msg("{5 km}")
+        send.assert_called_once()
+        send = await dispatch_msg("{5 km}")
+        assert_no_reply(send)
+        assert cog.channel_rate_limiter.stats().dropped == 1
+
+    async def test_channel_rate_limit_refunds_user(
+        self, bot, message, american_user, dispatch_msg
+    ):
+        cog = bot.get_cog("Conversion")
+        cog.user_rate_limiter = RateLimiter(2, 60, timer=lambda: 0)
+        cog.channel_rate_limiter = RateLimiter(1, 60, timer=lambda: 0)
+        message.author = american_user
+        await dispatch_msg("{5 km}")
+        for _ in range(3):
+            assert_no_reply(await dispatch_msg("{5 km}"))
+        # Only the converted message cost the user a token
+        assert cog.user_rate_limiter.stats().allowed == 1
+        cog.channel_rate_limiter.clear()
+        (await dispatch_msg("{5 km}")).assert_called_once()
+
+    async def test_bursts_coalesced(self, bot, message, american_user):
+        cog = bot.get_cog("Conversion")
+        message.author = american_user
+        converted = []
+        release = asyncio.Event()
+
+        async def convert_message(msg):
+            converted.append(msg.content)
+            await release.wait()
+
+        def make_message(content: str):
+            return mock.Mock(
+                content=content, author=message.author, channel=message.channel
+            )
+
+        with mock.patch.object(cog, "convert_message", convert_message):
+            first = asyncio.create_task(cog.conversions(make_message("{1 km}")))
+            await asyncio.sleep(0)
+            # These arrive while the first is still being converted, so only
+            # the latest one should be converted after it
+            await cog.conversions(make_message("{2 km}"))
+            await cog.conversions(make_message("{3 km}"))
+            release.set()
+            await first
+
+        assert converted == ["{1 km}", "{3 km}"]
+        assert cog.coalesced_count == 1
+        assert cog._in_flight == {}
+
     # endregion
@@ -1,11 +1,16 @@
 import datetime as dt
+import logging
+import time
 from typing import Optional
 
 import pytest
 import pytz
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import create_async_engine
 
 from sandpiper.common.time import TimezoneType
 from sandpiper.user_data import *
+from sandpiper.user_data import alembic_utils
 from .helpers.misc import *
 
 pytestmark = pytest.mark.asyncio
@@ -16,6 +21,22 @@ def user_id(new_id) -> int:
     return new_id()
 
 
+@pytest.fixture()
+def count_statements(database):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sa.event.listen(
+        database._engine.sync_engine, "before_cursor_execute", before_cursor_execute
+    )
+    yield statements
+    sa.event.remove(
+        database._engine.sync_engine, "before_cursor_execute", before_cursor_execute
+    )
+
+
 class TestConnection:
     async def test_connected(self, database):
         assert (await database.connected()) is True
@@ -26,6 +47,39 @@ class TestConnection:
         await database.disconnect()
         assert (await database.connected()) is False
 
+    async def test_engine_profile_pragmas(self, tmp_path):
+        database = DatabaseSQLite(
+            tmp_path / "sandpiper.db",
+            SQLiteEngineProfile(busy_timeout=1234, cache_size=2048),
+        )
+        await database.connect()
+        try:
+            async with database._engine.connect() as conn:
+
+                async def pragma(name: str):
+                    return (await conn.execute(sa.text(f"PRAGMA {name}"))).scalar()
+
+                assert (await pragma("journal_mode")) == "wal"
+                assert (await pragma("busy_timeout")) == 1234
+                assert (await pragma("cache_size")) == -2048
+                assert (await pragma("synchronous")) == 1  # NORMAL
+        finally:
+            await database.disconnect()
+
+    async def test_engine_profile_sqlite_defaults(self, tmp_path):
+        database = DatabaseSQLite(
+            tmp_path / "sandpiper.db", SQLiteEngineProfile.sqlite_defaults()
+        )
+        await database.connect()
+        try:
+            async with database._engine.connect() as conn:
+                journal_mode = (
+                    await conn.execute(sa.text("PRAGMA journal_mode"))
+                ).scalar()
+            assert journal_mode == "delete"
+        finally:
+            await database.disconnect()
+
 
 class TestSandpiper:
     async def test_get_version(self, database):
@@ -77,6 +131,86 @@ class TestFullUser:
         assert users_in_db == []
 
 
+class TestUserSnapshot:
+    async def test_get_no_user(self, database, user_id):
+        with pytest.raises(UserNotInDatabase):
+            await database.get_user_snapshot(user_id)
+
+    async def test_get_defaults(self, database, user_id):
+        await database.create_user(user_id)
+        assert (await database.get_user_snapshot(user_id)) == UserSnapshot(user_id)
+
+    async def test_get_all_fields(self, database, user_id):
+        tz = pytz.timezone("America/New_York")
+        await database.set_preferred_name(user_id, "Greg")
+        await database.set_pronouns(user_id, "He/Him")
+        await database.set_birthday(user_id, dt.date(2000, 2, 14))
+        await database.set_timezone(user_id, tz)
+        await database.set_privacy_pronouns(user_id, PrivacyType.PUBLIC)
+        await database.set_privacy_age(user_id, PrivacyType.PUBLIC)
+
+        snapshot = await database.get_user_snapshot(user_id)
+        assert snapshot.preferred_name == "Greg"
+        assert snapshot.pronouns == "He/Him"
+        assert snapshot.birthday == dt.date(2000, 2, 14)
+        assert snapshot.timezone == tz
+        assert snapshot.privacy_preferred_name is PrivacyType.PRIVATE
+        assert snapshot.privacy_pronouns is PrivacyType.PUBLIC
+        assert snapshot.privacy_birthday is PrivacyType.PRIVATE
+        assert snapshot.privacy_age is PrivacyType.PUBLIC
+        assert snapshot.privacy_timezone is PrivacyType.PRIVATE
+        assert snapshot.last_birthday_notification is None
+
+    async def test_immutable(self, database, user_id):
+        await database.create_user(user_id)
+        snapshot = await database.get_user_snapshot(user_id)
+        with pytest.raises(AttributeError):
+            snapshot.preferred_name = "Greg"
+
+    async def test_age(self, user_id):
+        snapshot = UserSnapshot(
+            user_id,
+            birthday=dt.date(2000, 2, 14),
+            timezone=pytz.timezone("America/New_York"),
+        )
+        assert (
+            snapshot.get_age(pytz.UTC.localize(dt.datetime(2020, 2, 14, 4, 59))) == 19
+        )
+        assert snapshot.get_age(pytz.UTC.localize(dt.datetime(2020, 2, 14, 5, 0))) == 20
+
+    async def test_age_yearless(self, user_id):
+        snapshot = UserSnapshot(user_id, birthday=dt.date(1, 2, 14))
+        assert snapshot.get_age() is None
+
+
+class TestGetUsersBulk:
+    async def test_no_ids(self, database):
+        assert (await database.get_users_bulk([])) == {}
+
+    async def test_basic(self, database, new_id):
+        uids = [new_id() for _ in range(3)]
+        for uid in uids:
+            await database.set_preferred_name(uid, f"User {uid}")
+        users = await database.get_users_bulk(uids)
+        assert users.keys() == set(uids)
+        for uid in uids:
+            assert users[uid].preferred_name == f"User {uid}"
+
+    async def test_missing_users_omitted(self, database, new_id):
+        uid_exists = new_id()
+        uid_missing = new_id()
+        await database.create_user(uid_exists)
+        users = await database.get_users_bulk([uid_exists, uid_missing])
+        assert users == {uid_exists: UserSnapshot(uid_exists)}
+
+    async def test_more_than_parameter_limit(self, database, new_id):
+        uids = [new_id() for _ in range(database.MAX_BOUND_PARAMETERS + 10)]
+        for uid in uids[::100]:
+            await database.create_user(uid)
+        users = await database.get_users_bulk(uids)
+        assert users.keys() == set(uids[::100])
+
+
 class TestPreferredName:
     async def test_get(self, database, user_id):
         await database.create_user(user_id)
@@ -173,6 +307,99 @@ class TestAge:
         assert (await database.get_privacy_age(user_id)) is value
 
 
+class TestUpserts:
+    async def test_set_is_one_statement(self, database, user_id, count_statements):
+        await database.set_preferred_name(user_id, "Greg")
+        await database.set_privacy_preferred_name(user_id, PrivacyType.PUBLIC)
+        assert len(count_statements) == 2
+
+    async def test_set_keeps_other_fields(self, database, user_id):
+        await database.set_preferred_name(user_id, "Greg")
+        await database.set_privacy_preferred_name(user_id, PrivacyType.PUBLIC)
+        await database.set_preferred_name(user_id, "Gregory")
+        assert (await database.get_preferred_name(user_id)) == "Gregory"
+        assert (
+            await database.get_privacy_preferred_name(user_id)
+        ) is PrivacyType.PUBLIC
+
+    async def test_delete_no_user(self, database, user_id):
+        with pytest.raises(UserNotInDatabase):
+            await database.set_preferred_name(user_id, None)
+        with pytest.raises(UserNotInDatabase):
+            await database.set_birthday(user_id, None)
+        assert user_id not in await database.get_all_user_ids()
+
+    async def test_delete_birthday_clears_month_day(self, database, user_id):
+        await database.set_birthday(user_id, dt.date(2000, 2, 14))
+        await database.set_privacy_birthday(user_id, PrivacyType.PUBLIC)
+        await database.set_birthday(user_id, None)
+        assert (await database.get_birthday(user_id)) is None
+        assert (
+            await database.get_birthdays_range(dt.date(1, 1, 1), dt.date(1, 12, 31))
+        ) == []
+
+
+class TestUpdateUser:
+    async def test_update_many(self, database, user_id, count_statements):
+        tz = pytz.timezone("Europe/London")
+        await database.update_user(
+            user_id,
+            preferred_name="Greg",
+            birthday=dt.date(2000, 2, 14),
+            timezone=tz,
+            privacy_birthday=PrivacyType.PUBLIC,
+            privacy_timezone=PrivacyType.PUBLIC,
+        )
+        assert len(count_statements) == 1
+
+        snapshot = await database.get_user_snapshot(user_id)
+        assert snapshot.preferred_name == "Greg"
+        assert snapshot.birthday == dt.date(2000, 2, 14)
+        assert snapshot.timezone == tz
+        assert snapshot.privacy_birthday is PrivacyType.PUBLIC
+        assert snapshot.privacy_timezone is PrivacyType.PUBLIC
+        assert (
+            await database.get_birthdays_range(dt.date(1, 2, 1), dt.date(1, 2, 28))
+        ) == [(user_id, dt.date(2000, 2, 14))]
+
+    async def test_update_none(self, database, user_id):
+        await database.update_user(user_id)
+        assert user_id not in await database.get_all_user_ids()
+
+    async def test_delete_many(self, database, user_id):
+        await database.update_user(user_id, preferred_name="Greg", pronouns="He/Him")
+        await database.update_user(user_id, preferred_name=None, pronouns=None)
+        snapshot = await database.get_user_snapshot(user_id)
+        assert snapshot.preferred_name is None
+        assert snapshot.pronouns is None
+
+    async def test_delete_no_user(self, database, user_id):
+        with pytest.raises(UserNotInDatabase):
+            await database.update_user(user_id, preferred_name=None, pronouns=None)
+        assert user_id not in await database.get_all_user_ids()
+
+    async def test_unknown_field(self, database, user_id):
+        with pytest.raises(ValueError):
+            await database.update_user(user_id, preferred_name="Greg", age=5)
+        assert user_id not in await database.get_all_user_ids()
+
+    async def test_invalid_privacy(self, database, user_id):
+        await database.create_user(user_id)
+        with pytest.raises(DatabaseError):
+            await database.update_user(
+                user_id, preferred_name="Greg", privacy_preferred_name=None
+            )
+        with pytest.raises(DatabaseError):
+            await database.update_user(user_id, privacy_age=5)
+        assert (await database.get_preferred_name(user_id)) is None
+
+    async def test_values_not_logged(self, database, user_id, caplog):
+        caplog.set_level(logging.INFO, "sandpiper.user_data")
+        await database.update_user(user_id, preferred_name="Greg")
+        assert "preferred_name" in caplog.text
+        assert "Greg" not in caplog.text
+
+
 class TestCalculateAge:
     @pytest.fixture()
     async def birthday(self) -> dt.date:
@@ -253,6 +480,153 @@ class TestGuildBirthdayChannel:
         assert (await database.get_guild_birthday_channel(user_id)) == value
 
 
+class TestGuildBirthdayChannels:
+    async def test_no_ids(self, database):
+        assert (await database.get_guild_birthday_channels([])) == {}
+
+    async def test_basic(self, database, new_id):
+        gids = [new_id() for _ in range(4)]
+        await database.set_guild_birthday_channel(gids[0], 100)
+        await database.set_guild_birthday_channel(gids[1], 101)
+        # Guilds with a deleted channel or no row are omitted
+        await database.set_guild_birthday_channel(gids[2], None)
+        channels = await database.get_guild_birthday_channels(gids)
+        assert channels == {gids[0]: 100, gids[1]: 101}
+
+    async def test_more_than_parameter_limit(self, database, new_id):
+        gids = [new_id() for _ in range(DatabaseSQLite.MAX_BOUND_PARAMETERS + 10)]
+        for gid in gids[::100]:
+            await database.set_guild_birthday_channel(gid, gid + 1)
+        channels = await database.get_guild_birthday_channels(gids)
+        assert channels == {gid: gid + 1 for gid in gids[::100]}
+
+
+class TestBirthdayOutbox:
+    @pytest.fixture()
+    def fire_time(self) -> dt.datetime:
+        return pytz.utc.localize(dt.datetime(2021, 2, 14, 5, 0))
+
+    async def test_empty(self, database):
+        assert (await database.recover_birthday_outbox()) == []
+
+    async def test_set_recover(self, database, user_id, fire_time):
+        assert (await database.set_birthday_outbox(user_id, fire_time)) == fire_time
+        assert (await database.recover_birthday_outbox()) == [(user_id, fire_time)]
+
+    async def test_set_converts_to_utc(self, database, user_id, fire_time):
+        tz = pytz.timezone("America/New_York")
+        await database.set_birthday_outbox(user_id, fire_time.astimezone(tz))
+        assert (await database.recover_birthday_outbox()) == [(user_id, fire_time)]
+
+    async def test_set_replaces(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        later = fire_time + dt.timedelta(hours=1)
+        await database.set_birthday_outbox(user_id, later)
+        assert (await database.recover_birthday_outbox()) == [(user_id, later)]
+
+    async def test_delete(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.delete_birthday_outbox(user_id)
+        assert (await database.recover_birthday_outbox()) == []
+
+    async def test_delete_claimed(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.claim_birthday_outbox(user_id)
+        await database.delete_birthday_outbox(user_id)
+        # It's still being sent, so it will be recovered
+        assert (await database.recover_birthday_outbox()) == [(user_id, fire_time)]
+
+    async def test_set_claimed(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.claim_birthday_outbox(user_id)
+        later = fire_time + dt.timedelta(hours=1)
+        assert (await database.set_birthday_outbox(user_id, later)) is None
+        assert (await database.recover_birthday_outbox()) == [(user_id, fire_time)]
+
+    async def test_set_keeps_retry(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.claim_birthday_outbox(user_id)
+        retry_time = fire_time + dt.timedelta(minutes=1)
+        await database.release_birthday_outbox(user_id, retry_time)
+        assert (await database.set_birthday_outbox(user_id, fire_time)) == retry_time
+        assert (await database.claim_birthday_outbox(user_id)) == 2
+
+    async def test_set_after_sent(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.claim_birthday_outbox(user_id)
+        await database.complete_birthday_outbox(user_id, fire_time)
+        later = fire_time + dt.timedelta(days=365)
+        assert (await database.set_birthday_outbox(user_id, later)) == later
+        assert (await database.claim_birthday_outbox(user_id)) == 1
+
+    async def test_delete_user(self, database, user_id, fire_time):
+        await database.create_user(user_id)
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.delete_user(user_id)
+        assert (await database.recover_birthday_outbox()) == []
+
+    async def test_claim(self, database, user_id, fire_time):
+        assert (await database.claim_birthday_outbox(user_id)) is None
+        await database.set_birthday_outbox(user_id, fire_time)
+        assert (await database.claim_birthday_outbox(user_id)) == 1
+        # Can only be claimed once
+        assert (await database.claim_birthday_outbox(user_id)) is None
+
+    async def test_recover_claimed(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.claim_birthday_outbox(user_id)
+        assert (await database.recover_birthday_outbox()) == [(user_id, fire_time)]
+        assert (await database.claim_birthday_outbox(user_id)) == 2
+
+    async def test_recover_expired(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.claim_birthday_outbox(user_id)
+        assert (await database.recover_birthday_outbox(fire_time)) == [
+            (user_id, fire_time)
+        ]
+        expire_before = fire_time + dt.timedelta(seconds=1)
+        assert (await database.recover_birthday_outbox(expire_before)) == []
+        assert (await database.claim_birthday_outbox(user_id)) is None
+
+    async def test_claim_expired(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        expire_before = fire_time + dt.timedelta(seconds=1)
+        assert (await database.claim_birthday_outbox(user_id, expire_before)) is None
+        assert (await database.recover_birthday_outbox()) == []
+
+    async def test_release_retry(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.claim_birthday_outbox(user_id)
+        retry_time = fire_time + dt.timedelta(minutes=1)
+        await database.release_birthday_outbox(user_id, retry_time)
+        assert (await database.recover_birthday_outbox()) == [(user_id, retry_time)]
+        assert (await database.claim_birthday_outbox(user_id)) == 2
+
+    async def test_release_give_up(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.claim_birthday_outbox(user_id)
+        await database.release_birthday_outbox(user_id, None)
+        assert (await database.recover_birthday_outbox()) == []
+        assert (await database.claim_birthday_outbox(user_id)) is None
+
+    async def test_complete(self, database, user_id, fire_time):
+        await database.create_user(user_id)
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.claim_birthday_outbox(user_id)
+        sent_time = dt.datetime(2021, 2, 14, 5, 0, 1)
+        await database.complete_birthday_outbox(user_id, sent_time)
+        assert (await database.recover_birthday_outbox()) == []
+        assert (await database.claim_birthday_outbox(user_id)) is None
+        assert (await database.get_last_birthday_notification(user_id)) == sent_time
+
+    async def test_complete_deleted_user(self, database, user_id, fire_time):
+        await database.set_birthday_outbox(user_id, fire_time)
+        await database.claim_birthday_outbox(user_id)
+        await database.complete_birthday_outbox(user_id, dt.datetime(2021, 2, 14))
+        # The user isn't recreated
+        assert (await database.get_all_user_ids()) == []
+
+
 class TestFindUsersByPreferredName:
     @pytest.fixture()
     def user_factory(self, database, new_id):
@@ -411,6 +785,25 @@ class TestGetBirthdaysRange:
         )
         assert_count_equal(result, [birthdays[0], birthdays[1]])
 
+    async def test_deleted(self, database, birthdays):
+        await database.set_birthday(birthdays[0][0], None)
+        result = await database.get_birthdays_range(
+            dt.date(2021, 3, 1), dt.date(2021, 3, 31)
+        )
+        assert_count_equal(result, [birthdays[1]])
+
+    async def test_changed(self, database, birthdays):
+        uid = birthdays[0][0]
+        await database.set_birthday(uid, dt.date(2000, 6, 1))
+        result = await database.get_birthdays_range(
+            dt.date(2021, 3, 1), dt.date(2021, 3, 31)
+        )
+        assert_count_equal(result, [birthdays[1]])
+        result = await database.get_birthdays_range(
+            dt.date(2021, 6, 1), dt.date(2021, 6, 1)
+        )
+        assert_count_equal(result, [(uid, dt.date(2000, 6, 1))])
+
     @pytest.fixture
     async def birthdays_with_last_notif(self, user_factory):
         yield [
@@ -472,6 +865,73 @@ class TestGetBirthdaysRange:
         assert_count_equal(result, birthdays)
 
 
+class TestBirthdayMonthDayMigration:
+    async def test_backfill(self, tmp_path):
+        db_path = tmp_path / "sandpiper.db"
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        await alembic_utils.upgrade(engine, "eaa603d93189")
+        async with engine.begin() as conn:
+            await conn.execute(
+                sa.text(
+                    "INSERT INTO users (user_id, birthday, privacy_birthday) "
+                    "VALUES ('1', '2000-02-14', 1), ('2', '0001-12-31', 1), "
+                    "('3', NULL, 1)"
+                )
+            )
+        await engine.dispose()
+
+        # Connecting upgrades to head
+        database = DatabaseSQLite(db_path)
+        await database.connect()
+        try:
+            result = await database.get_birthdays_range(
+                dt.date(2020, 12, 1), dt.date(2021, 2, 20)
+            )
+        finally:
+            await database.disconnect()
+        assert_count_equal(result, [(1, dt.date(2000, 2, 14)), (2, dt.date(1, 12, 31))])
+
+
+class TestLastBirthdayNotificationMigration:
+    @pytest.fixture()
+    def local_zone_new_york(self, monkeypatch):
+        monkeypatch.setenv("TZ", "America/New_York")
+        time.tzset()
+        yield
+        monkeypatch.undo()
+        time.tzset()
+
+    async def test_local_to_utc(self, tmp_path, local_zone_new_york):
+        db_path = tmp_path / "sandpiper.db"
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        await alembic_utils.upgrade(engine, "b7e2d94c0a61")
+        async with engine.begin() as conn:
+            await conn.execute(
+                sa.text(
+                    "INSERT INTO users (user_id, last_birthday_notification) "
+                    "VALUES ('1', '2021-02-14 00:00:00.000000'), "
+                    "('2', '2021-07-04 00:00:00.000000'), ('3', NULL)"
+                )
+            )
+        await engine.dispose()
+
+        # Connecting upgrades to head
+        database = DatabaseSQLite(db_path)
+        await database.connect()
+        try:
+            result = [
+                await database.get_last_birthday_notification(user_id)
+                for user_id in (1, 2, 3)
+            ]
+        finally:
+            await database.disconnect()
+        assert result == [
+            dt.datetime(2021, 2, 14, 5, 0),
+            dt.datetime(2021, 7, 4, 4, 0),
+            None,
+        ]
+
+
 class TestGetAllTimezones:
     @pytest.fixture()
     def user_factory(self, database, new_id):
@@ -0,0 +1,199 @@
+import datetime as dt
+from unittest import mock
+
+import pytest
+import pytz
+
+from sandpiper.user_data import *
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def user_id(new_id) -> int:
+    return new_id()
+
+
+@pytest.fixture()
+async def inner_database() -> DatabaseSQLite:
+    db = DatabaseSQLite(":memory:")
+    await db.connect()
+    yield db
+    if await db.connected():
+        await db.disconnect()
+
+
+@pytest.fixture()
+def cached_database(inner_database) -> CachedDatabase:
+    return CachedDatabase(inner_database, max_users=4)
+
+
+@pytest.fixture()
+def spy_snapshot(inner_database):
+    with mock.patch.object(
+        inner_database,
+        "get_user_snapshot",
+        wraps=inner_database.get_user_snapshot,
+    ) as spy:
+        yield spy
+
+
+class TestReads:
+    async def test_fields_served_from_one_read(
+        self, cached_database, inner_database, spy_snapshot, user_id
+    ):
+        await inner_database.set_preferred_name(user_id, "Greg")
+        await inner_database.set_pronouns(user_id, "he/him")
+        await inner_database.set_timezone(user_id, pytz.timezone("Europe/London"))
+        await inner_database.set_privacy_timezone(user_id, PrivacyType.PUBLIC)
+
+        assert await cached_database.get_preferred_name(user_id) == "Greg"
+        assert await cached_database.get_pronouns(user_id) == "he/him"
+        assert (await cached_database.get_timezone(user_id)).zone == "Europe/London"
+        assert (
+            await cached_database.get_privacy_timezone(user_id)
+        ) is PrivacyType.PUBLIC
+        assert spy_snapshot.await_count == 1
+
+        stats = cached_database.stats
+        assert stats.misses == 1
+        assert stats.hits == 3
+
+    async def test_missing_user(self, cached_database, spy_snapshot, user_id):
+        with pytest.raises(UserNotInDatabase):
+            await cached_database.get_timezone(user_id)
+        with pytest.raises(UserNotInDatabase):
+            await cached_database.get_user_snapshot(user_id)
+        assert (await cached_database.get_privacy_timezone(user_id)) is None
+        # Missing users are cached too
+        assert spy_snapshot.await_count == 1
+
+    async def test_bulk(self, cached_database, inner_database, new_id):
+        uids = [new_id() for _ in range(3)]
+        await inner_database.set_preferred_name(uids[0], "A")
+        await inner_database.set_preferred_name(uids[1], "B")
+        assert (await cached_database.get_preferred_name(uids[0])) == "A"
+
+        with mock.patch.object(
+            inner_database, "get_users_bulk", wraps=inner_database.get_users_bulk
+        ) as spy:
+            users = await cached_database.get_users_bulk(uids)
+            spy.assert_awaited_once_with([uids[1], uids[2]])
+        assert users.keys() == {uids[0], uids[1]}
+        assert users[uids[1]].preferred_name == "B"
+
+        with mock.patch.object(inner_database, "get_users_bulk") as spy:
+            users = await cached_database.get_users_bulk(uids)
+            spy.assert_not_called()
+        assert users.keys() == {uids[0], uids[1]}
+
+    async def test_eviction(self, cached_database, spy_snapshot, new_id):
+        uids = [new_id() for _ in range(5)]
+        for uid in uids:
+            await cached_database.get_privacy_age(uid)
+        assert len(cached_database._users) == 4
+        await cached_database.get_privacy_age(uids[0])
+        assert spy_snapshot.await_count == 6
+
+    async def test_ttl(self, inner_database, spy_snapshot, user_id):
+        cached_database = CachedDatabase(inner_database, ttl=60)
+        cached_database._users._timer = timer = mock.Mock(return_value=0)
+        await cached_database.get_privacy_age(user_id)
+        timer.return_value = 59
+        await cached_database.get_privacy_age(user_id)
+        assert spy_snapshot.await_count == 1
+        timer.return_value = 60
+        await cached_database.get_privacy_age(user_id)
+        assert spy_snapshot.await_count == 2
+
+
+class TestInvalidation:
+    async def test_set_field(self, cached_database, user_id):
+        await cached_database.set_preferred_name(user_id, "Greg")
+        assert (await cached_database.get_preferred_name(user_id)) == "Greg"
+        await cached_database.set_preferred_name(user_id, "Gregory")
+        assert (await cached_database.get_preferred_name(user_id)) == "Gregory"
+
+    async def test_set_privacy(self, cached_database, user_id):
+        assert (await cached_database.get_privacy_birthday(user_id)) is None
+        await cached_database.set_privacy_birthday(user_id, PrivacyType.PUBLIC)
+        assert (
+            await cached_database.get_privacy_birthday(user_id)
+        ) is PrivacyType.PUBLIC
+
+    async def test_update_user(self, cached_database, user_id):
+        assert (await cached_database.get_privacy_age(user_id)) is None
+        await cached_database.update_user(
+            user_id, preferred_name="Greg", privacy_age=PrivacyType.PUBLIC
+        )
+        assert (await cached_database.get_preferred_name(user_id)) == "Greg"
+        assert (await cached_database.get_privacy_age(user_id)) is PrivacyType.PUBLIC
+
+    async def test_set_birthday(self, cached_database, user_id):
+        await cached_database.set_birthday(user_id, dt.date(2000, 2, 14))
+        assert (await cached_database.get_birthday(user_id)) == dt.date(2000, 2, 14)
+        await cached_database.set_birthday(user_id, dt.date(2001, 3, 15))
+        assert (await cached_database.get_birthday(user_id)) == dt.date(2001, 3, 15)
+
+    async def test_set_last_birthday_notification(self, cached_database, user_id):
+        await cached_database.create_user(user_id)
+        assert (await cached_database.get_last_birthday_notification(user_id)) is None
+        now = dt.datetime(2021, 1, 1)
+        await cached_database.set_last_birthday_notification(user_id, now)
+        assert (await cached_database.get_last_birthday_notification(user_id)) == now
+
+    async def test_create_user(self, cached_database, user_id):
+        with pytest.raises(UserNotInDatabase):
+            await cached_database.get_user_snapshot(user_id)
+        await cached_database.create_user(user_id)
+        snapshot = await cached_database.get_user_snapshot(user_id)
+        assert snapshot.user_id == user_id
+
+    async def test_delete_user(self, cached_database, user_id):
+        await cached_database.set_pronouns(user_id, "she/her")
+        assert (await cached_database.get_pronouns(user_id)) == "she/her"
+        await cached_database.delete_user(user_id)
+        with pytest.raises(UserNotInDatabase):
+            await cached_database.get_pronouns(user_id)
+
+    async def test_failed_write_invalidates(self, cached_database, user_id):
+        await cached_database.get_privacy_pronouns(user_id)
+        with pytest.raises(UserNotInDatabase):
+            await cached_database.set_pronouns(user_id, None)
+        assert user_id not in cached_database._users
+
+    async def test_write_during_read_not_cached(
+        self, cached_database, inner_database, user_id
+    ):
+        await inner_database.set_preferred_name(user_id, "Old")
+        get_snapshot = inner_database.get_user_snapshot
+
+        async def write_during_read(uid):
+            snapshot = await get_snapshot(uid)
+            await cached_database.set_preferred_name(uid, "New")
+            return snapshot
+
+        with mock.patch.object(
+            inner_database, "get_user_snapshot", side_effect=write_during_read
+        ):
+            assert (await cached_database.get_preferred_name(user_id)) == "Old"
+        assert (await cached_database.get_preferred_name(user_id)) == "New"
+
+
+class TestPassthrough:
+    async def test_guild_birthday_channel(self, cached_database, new_id):
+        guild_id = new_id()
+        await cached_database.set_guild_birthday_channel(guild_id, 123)
+        assert (await cached_database.get_guild_birthday_channel(guild_id)) == 123
+
+    async def test_get_all_timezones(self, cached_database, user_id):
+        tz = pytz.timezone("Europe/London")
+        await cached_database.set_timezone(user_id, tz)
+        await cached_database.set_privacy_timezone(user_id, PrivacyType.PUBLIC)
+        assert (await cached_database.get_all_timezones()) == [(user_id, tz)]
+
+    async def test_disconnect(self, cached_database):
+        await cached_database.get_privacy_age(1)
+        await cached_database.disconnect()
+        assert (await cached_database.connected()) is False
+        assert len(cached_database._users) == 0
@@ -0,0 +1,31 @@
+import json
+
+import pytz
+
+from sandpiper.common.IANA import (
+    DEFAULT_FLAG,
+    get_country_flag_emoji,
+    get_country_flag_emoji_from_timezone,
+    timezone_to_country_code,
+)
+from sandpiper.common.IANA.generate import ARTIFACT_FILE, build_tables
+
+
+class TestIANA:
+    def test_artifact_up_to_date(self):
+        # If this fails, regenerate it with `python sandpiper/common/IANA/generate.py`
+        with ARTIFACT_FILE.open("rt", encoding="utf-8") as f:
+            assert json.load(f) == build_tables()
+
+    def test_flags_match_country_codes(self):
+        for tz, code in timezone_to_country_code.items():
+            assert get_country_flag_emoji_from_timezone(tz) == get_country_flag_emoji(
+                code
+            )
+
+    def test_flag_from_timezone(self):
+        assert get_country_flag_emoji_from_timezone("Europe/London") == "🇬🇧"
+        assert get_country_flag_emoji_from_timezone(pytz.timezone("Asia/Tokyo")) == (
+            "🇯🇵"
+        )
+        assert get_country_flag_emoji_from_timezone("UTC") == DEFAULT_FLAG
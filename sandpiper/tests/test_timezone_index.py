@@ -0,0 +1,156 @@
+from unittest import mock
+
+import pytest
+import pytz
+
+from sandpiper.conversion.cog import Conversion
+from sandpiper.conversion.time_conversion import _get_guild_timezones
+from sandpiper.conversion.timezone_index import GuildTimezoneIndex
+from sandpiper.user_data import PrivacyType, UserData
+
+pytestmark = pytest.mark.asyncio
+
+tz_london = pytz.timezone("Europe/London")
+tz_new_york = pytz.timezone("America/New_York")
+tz_tokyo = pytz.timezone("Asia/Tokyo")
+
+
+def fake_guild(guild_id: int, member_ids: set[int]) -> mock.Mock:
+    guild = mock.Mock()
+    guild.id = guild_id
+    guild.get_member.side_effect = lambda user_id: (
+        mock.Mock(id=user_id) if user_id in member_ids else None
+    )
+    return guild
+
+
+@pytest.fixture()
+def index() -> GuildTimezoneIndex:
+    index = GuildTimezoneIndex()
+    index.build(
+        [(1, tz_london), (2, tz_london), (3, tz_new_york)],
+        [fake_guild(100, {1, 2, 3}), fake_guild(200, {2, 4})],
+    )
+    return index
+
+
+class TestGuildTimezoneIndex:
+    def test_not_built(self):
+        index = GuildTimezoneIndex()
+        assert index.built is False
+        assert index.get_guild_timezones(100) == set()
+
+    def test_build(self, index):
+        assert index.built is True
+        assert index.get_guild_timezones(100) == {tz_london, tz_new_york}
+        assert index.get_guild_timezones(200) == {tz_london}
+        assert index.get_guild_timezones(300) == set()
+
+    def test_set_new_user(self, index):
+        index.set_user_timezone(4, tz_tokyo, [200])
+        assert index.get_guild_timezones(200) == {tz_london, tz_tokyo}
+
+    def test_change_timezone(self, index):
+        index.set_user_timezone(3, tz_tokyo, [100])
+        assert index.get_guild_timezones(100) == {tz_london, tz_tokyo}
+
+    def test_shared_timezone_counted(self, index):
+        index.set_user_timezone(1, None, [100])
+        assert index.get_guild_timezones(100) == {tz_london, tz_new_york}
+        index.set_user_timezone(2, None, [100, 200])
+        assert index.get_guild_timezones(100) == {tz_new_york}
+        assert index.get_guild_timezones(200) == set()
+
+    def test_member_join_leave(self, index):
+        index.add_member(200, 3)
+        assert index.get_guild_timezones(200) == {tz_london, tz_new_york}
+        index.remove_member(200, 3)
+        assert index.get_guild_timezones(200) == {tz_london}
+
+    def test_member_join_twice(self, index):
+        index.add_member(100, 3)
+        index.remove_member(100, 3)
+        assert index.get_guild_timezones(100) == {tz_london}
+
+    def test_unindexed_member(self, index):
+        index.add_member(200, 5)
+        index.remove_member(100, 5)
+        assert index.get_guild_timezones(200) == {tz_london}
+
+    def test_guild_join_leave(self, index):
+        index.add_guild(fake_guild(300, {3}))
+        assert index.get_guild_timezones(300) == {tz_new_york}
+        index.remove_guild(300)
+        assert index.get_guild_timezones(300) == set()
+        # Removing the guild doesn't affect other guilds
+        index.set_user_timezone(3, None, [])
+        assert index.get_guild_timezones(100) == {tz_london}
+
+
+class TestGetGuildTimezones:
+    async def test_uses_index(self, index):
+        db = mock.AsyncMock()
+        timezones = await _get_guild_timezones(db, fake_guild(100, set()), index)
+        assert timezones == {tz_london, tz_new_york}
+        db.get_all_timezones.assert_not_called()
+
+    async def test_falls_back_to_database(self, database):
+        await database.set_timezone(1, tz_tokyo)
+        await database.set_privacy_timezone(1, PrivacyType.PUBLIC)
+        timezones = await _get_guild_timezones(
+            database, fake_guild(100, {1}), GuildTimezoneIndex()
+        )
+        assert timezones == {tz_tokyo}
+
+
+class TestConversionCog:
+    @pytest.fixture()
+    async def cog(self, bot, database) -> Conversion:
+        await bot.add_cog(UserData(bot))
+        cog = Conversion(bot)
+        await bot.add_cog(cog)
+        return cog
+
+    @pytest.fixture()
+    def bot_guilds(self, bot):
+        guilds = [fake_guild(100, {1, 2})]
+        with mock.patch.object(type(bot), "guilds", mock.PropertyMock()) as p:
+            p.return_value = guilds
+            yield guilds
+
+    async def set_public_timezone(self, database, user_id, tz):
+        await database.set_timezone(user_id, tz)
+        await database.set_privacy_timezone(user_id, PrivacyType.PUBLIC)
+
+    async def test_build_and_notify(self, cog, database, bot_guilds):
+        await self.set_public_timezone(database, 1, tz_london)
+        await cog.build_timezone_index()
+        assert cog.timezone_index.get_guild_timezones(100) == {tz_london}
+
+        await self.set_public_timezone(database, 2, tz_tokyo)
+        await cog.notify_timezone_change(2)
+        assert cog.timezone_index.get_guild_timezones(100) == {tz_london, tz_tokyo}
+
+        await database.set_privacy_timezone(1, PrivacyType.PRIVATE)
+        await cog.notify_timezone_change(1)
+        assert cog.timezone_index.get_guild_timezones(100) == {tz_tokyo}
+
+        await database.delete_user(2)
+        await cog.notify_timezone_change(2)
+        assert cog.timezone_index.get_guild_timezones(100) == set()
+
+    async def test_notify_during_build(self, cog, database, bot_guilds):
+        await self.set_public_timezone(database, 1, tz_london)
+        get_all_timezones = database.get_all_timezones
+
+        async def change_during_build():
+            all_timezones = await get_all_timezones()
+            await self.set_public_timezone(database, 2, tz_tokyo)
+            await cog.notify_timezone_change(2)
+            return all_timezones
+
+        with mock.patch.object(
+            database, "get_all_timezones", side_effect=change_during_build
+        ):
+            await cog.build_timezone_index()
+        assert cog.timezone_index.get_guild_timezones(100) == {tz_london, tz_tokyo}
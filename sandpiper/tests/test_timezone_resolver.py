@@ -0,0 +1,61 @@
+from unittest import mock
+
+import pytest
+import pytz
+
+from sandpiper.conversion import timezone_resolver as resolver_module
+from sandpiper.conversion.timezone_resolver import TimezoneResolver
+
+
+@pytest.fixture()
+def fuzzy_match():
+    with mock.patch.object(
+        resolver_module,
+        "fuzzy_match_timezone",
+        wraps=resolver_module.fuzzy_match_timezone,
+    ) as fuzzy_match:
+        yield fuzzy_match
+
+
+class TestTimezoneResolver:
+    def test_resolve(self, fuzzy_match):
+        resolver = TimezoneResolver()
+        assert resolver.resolve("london") == pytz.timezone("Europe/London")
+        assert resolver.resolve("london") == pytz.timezone("Europe/London")
+        assert fuzzy_match.call_count == 1
+        assert resolver.stats.hits == 1
+        assert resolver.stats.misses == 1
+
+    def test_normalized(self, fuzzy_match):
+        resolver = TimezoneResolver()
+        tz = resolver.resolve("New York")
+        assert tz == pytz.timezone("America/New_York")
+        assert resolver.resolve("  new   YORK ") == tz
+        assert fuzzy_match.call_count == 1
+
+    def test_not_found_cached(self, fuzzy_match):
+        resolver = TimezoneResolver()
+        assert resolver.resolve("ZBNMBSAEFHJBGEWB") is None
+        assert resolver.resolve("zbnmbsaefhjbgewb") is None
+        assert fuzzy_match.call_count == 1
+
+    def test_lru_eviction(self, fuzzy_match):
+        resolver = TimezoneResolver(max_size=1)
+        resolver.resolve("london")
+        resolver.resolve("tokyo")
+        resolver.resolve("london")
+        assert fuzzy_match.call_count == 3
+        assert resolver.stats.size == 1
+
+    def test_disabled(self, fuzzy_match):
+        resolver = TimezoneResolver(max_size=0)
+        resolver.resolve("london")
+        resolver.resolve("london")
+        assert fuzzy_match.call_count == 2
+
+    def test_clear_cache(self, fuzzy_match):
+        resolver = TimezoneResolver()
+        resolver.resolve("london")
+        resolver.clear_cache()
+        resolver.resolve("london")
+        assert fuzzy_match.call_count == 2
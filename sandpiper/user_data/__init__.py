@@ -6,7 +6,11 @@ __all__ = [
     "Database",
     "DatabaseError",
     "UserNotInDatabase",
+    "UserSnapshot",
+    "CachedDatabase",
     "DatabaseSQLite",
+    "SQLiteEngineProfile",
+    "OutboxState",
     "PrivacyType",
     "Pronouns",
     "common_pronouns",
@@ -21,8 +25,9 @@ from discord.ext.commands import Bot
 
 from .cog import DatabaseUnavailable, UserData
 from .database import *
-from .database_sqlite import DatabaseSQLite
-from .enums import PrivacyType
+from .database_cached import CachedDatabase
+from .database_sqlite import DatabaseSQLite, SQLiteEngineProfile
+from .enums import OutboxState, PrivacyType
 from .pronouns import Pronouns, common_pronouns
 
 if typing.TYPE_CHECKING:
@@ -32,12 +37,30 @@ DB_FILE = Path(__file__).parent.parent / "sandpiper.db"
 
 
 async def setup(bot: Sandpiper):
+    config = bot.modules_config.user_data
     user_data = UserData(bot)
-    db = DatabaseSQLite(DB_FILE)
+    sqlite_config = config.sqlite
+    db_sqlite = DatabaseSQLite(
+        DB_FILE,
+        SQLiteEngineProfile(
+            journal_mode=sqlite_config.journal_mode,
+            synchronous=sqlite_config.synchronous,
+            busy_timeout=sqlite_config.busy_timeout,
+            cache_size=sqlite_config.cache_size,
+            mmap_size=sqlite_config.mmap_size,
+            temp_store=sqlite_config.temp_store,
+            pool_size=sqlite_config.pool_size,
+        ),
+    )
+    db = db_sqlite
+    if config.cache_max_users > 0:
+        db = CachedDatabase(
+            db_sqlite, max_users=config.cache_max_users, ttl=config.cache_ttl
+        )
     asyncio.run_coroutine_threadsafe(db.connect(), bot.loop)
     user_data.set_database_adapter(db)
     await bot.add_cog(user_data)
-    bot.add_listener(set_bot_user_id(bot, db), "on_ready")
+    bot.add_listener(set_bot_user_id(bot, db_sqlite), "on_ready")
 
 
 def set_bot_user_id(bot: Sandpiper, db: DatabaseSQLite):
@@ -0,0 +1,40 @@
+"""Add indexed birthday_month_day column for birthday range queries.
+
+Revision ID: 3f1c9a7e52d4
+Revises: eaa603d93189
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3f1c9a7e52d4"
+down_revision = "eaa603d93189"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """
+    birthday_month_day stores a birthday's month and day as the integer MMDD
+    (e.g. 214 for February 14), so birthdays can be filtered by date range
+    regardless of their year.
+    """
+
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("birthday_month_day", sa.SmallInteger))
+        batch_op.create_index("index_users_birthday_month_day", ["birthday_month_day"])
+
+    op.execute(
+        "UPDATE users "
+        "SET birthday_month_day = CAST(strftime('%m%d', birthday) AS INTEGER) "
+        "WHERE birthday IS NOT NULL"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_index("index_users_birthday_month_day")
+        batch_op.drop_column("birthday_month_day")
@@ -0,0 +1,32 @@
+"""Add birthday_outbox table
+
+Revision ID: b7e2d94c0a61
+Revises: 3f1c9a7e52d4
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b7e2d94c0a61"
+down_revision = "3f1c9a7e52d4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "birthday_outbox",
+        sa.Column("user_id", sa.String(20), primary_key=True),
+        sa.Column("fire_time", sa.DateTime, nullable=False),
+        sa.Column(
+            "state", sa.SmallInteger, nullable=False, server_default=sa.text("0")
+        ),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default=sa.text("0")),
+    )
+
+
+def downgrade():
+    op.drop_table("birthday_outbox")
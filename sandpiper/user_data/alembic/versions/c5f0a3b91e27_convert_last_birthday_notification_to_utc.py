@@ -0,0 +1,56 @@
+"""Convert last_birthday_notification from server-local time to UTC.
+
+Revision ID: c5f0a3b91e27
+Revises: b7e2d94c0a61
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+import datetime as dt
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+
+# revision identifiers, used by Alembic.
+revision = "c5f0a3b91e27"
+down_revision = "b7e2d94c0a61"
+branch_labels = None
+depends_on = None
+
+# Build a little fake table with just the columns we need to update
+users = sa.table(
+    "users",
+    sa.column("user_id", sa.String(20)),
+    sa.column("last_birthday_notification", sa.DateTime),
+)
+
+
+def _convert(convert):
+    conn: Connection = op.get_bind()
+    rows = conn.execute(
+        sa.select(users.c.user_id, users.c.last_birthday_notification).where(
+            users.c.last_birthday_notification.is_not(None)
+        )
+    ).all()
+    for user_id, last_notification in rows:
+        conn.execute(
+            users.update()
+            .where(users.c.user_id == user_id)
+            .values(last_birthday_notification=convert(last_notification))
+        )
+
+
+def upgrade():
+    # These used to be written as naive datetimes in the server's local time,
+    # but are now naive UTC. This assumes the migration runs on the same host
+    # (or at least in the same timezone) as the bot that wrote them.
+    # astimezone treats naive datetimes as system-local time.
+    _convert(lambda local: local.astimezone(dt.timezone.utc).replace(tzinfo=None))
+
+
+def downgrade():
+    _convert(
+        lambda utc: utc.replace(tzinfo=dt.timezone.utc)
+        .astimezone()
+        .replace(tzinfo=None)
+    )
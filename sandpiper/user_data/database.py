@@ -2,10 +2,14 @@ __all__ = [
     "DEFAULT_PRIVACY",
     "DatabaseError",
     "UserNotInDatabase",
+    "UserSnapshot",
+    "USER_FIELDS",
     "Database",
 ]
 
 from abc import ABCMeta, abstractmethod
+from collections.abc import Iterable
+from dataclasses import dataclass, fields
 import datetime as dt
 from typing import Annotated, Optional
 
@@ -26,6 +30,61 @@ class UserNotInDatabase(DatabaseError):
     pass
 
 
+@dataclass(frozen=True)
+class UserSnapshot:
+    """
+    An immutable record of all of a user's stored data at the time it was
+    fetched. Use ``Database.get_user_snapshot`` to get all of a user's fields
+    and privacies in a single query instead of getting them one by one.
+    """
+
+    user_id: int
+    preferred_name: Optional[str] = None
+    pronouns: Optional[str] = None
+    birthday: Optional[dt.date] = None
+    timezone: Optional[TimezoneType] = None
+    privacy_preferred_name: PrivacyType = DEFAULT_PRIVACY
+    privacy_pronouns: PrivacyType = DEFAULT_PRIVACY
+    privacy_birthday: PrivacyType = DEFAULT_PRIVACY
+    privacy_age: PrivacyType = DEFAULT_PRIVACY
+    privacy_timezone: PrivacyType = DEFAULT_PRIVACY
+    last_birthday_notification: Optional[dt.datetime] = None
+
+    def get_pronouns_parsed(self) -> list[Pronouns]:
+        """
+        Parse the user's stored pronouns and return a list of corresponding
+        Pronouns objects. The list may be empty.
+        """
+        if self.pronouns is None:
+            return []
+        return Pronouns.parse(self.pronouns)
+
+    def get_age(self, at_time: Optional[dt.datetime] = None) -> Optional[int]:
+        """
+        Calculate the user's age at ``at_time`` (defaults to now) using their
+        birthday and timezone. Returns None if the user's birthday is unset
+        or yearless.
+        """
+        if self.birthday is None:
+            return None
+        if self.birthday.year == 1:
+            # Birthdays with year == 1 are considered yearless since year can't
+            # be None
+            return None
+
+        tz = self.timezone
+        if tz is None:
+            tz = pytz.UTC
+        if at_time is None:
+            at_time = utc_now()
+
+        return Database._calculate_age(self.birthday, tz, at_time)
+
+
+# Names of the fields that can be passed to ``Database.update_user``
+USER_FIELDS = frozenset(f.name for f in fields(UserSnapshot)) - {"user_id"}
+
+
 class Database(metaclass=ABCMeta):
     @abstractmethod
     async def connect(self):
@@ -61,6 +120,47 @@ class Database(metaclass=ABCMeta):
     async def create_user(self, user_id: int):
         pass
 
+    @abstractmethod
+    async def get_user_snapshot(self, user_id: int) -> UserSnapshot:
+        """
+        Get all of a user's fields and privacies at once.
+
+        :param user_id: the user's Discord ID
+        :return: an immutable snapshot of the user's data
+        :raises UserNotInDatabase: if the user has no data stored
+        """
+        pass
+
+    @abstractmethod
+    async def get_users_bulk(self, user_ids: Iterable[int]) -> dict[int, UserSnapshot]:
+        """
+        Get snapshots of many users at once.
+
+        :param user_ids: the Discord IDs of the users to get
+        :return: a mapping of user_id -> snapshot. Users with no data stored
+            are omitted.
+        """
+        pass
+
+    @abstractmethod
+    async def update_user(self, user_id: int, **fields):
+        """
+        Set any of a user's fields and privacies at once in a single
+        transaction, so either all of them are changed or none are.
+
+        If every new value is None (the user is deleting data), the user won't
+        be created if they aren't in the database already.
+
+        :param user_id: the user's Discord ID
+        :param fields: new values keyed by ``UserSnapshot`` field name, like
+            ``preferred_name="Greg"`` or ``privacy_age=PrivacyType.PUBLIC``
+        :raises ValueError: if a field name isn't in ``USER_FIELDS``
+        :raises DatabaseError: if a privacy value isn't a ``PrivacyType``
+        :raises UserNotInDatabase: if every new value is None and the user has
+            no data stored
+        """
+        pass
+
     @abstractmethod
     async def delete_user(self, user_id: int):
         pass
@@ -182,19 +282,8 @@ class Database(metaclass=ABCMeta):
         return year_diff
 
     async def get_age(self, user_id: int) -> Optional[int]:
-        birthday = await self.get_birthday(user_id)
-        if birthday is None:
-            return None
-        if birthday.year == 1:
-            # Birthdays with year == 1 are considered yearless since year can't
-            # be None
-            return None
-
-        tz = await self.get_timezone(user_id)
-        if tz is None:
-            tz = pytz.UTC
-
-        return self._calculate_age(birthday, tz, utc_now())
+        snapshot = await self.get_user_snapshot(user_id)
+        return snapshot.get_age()
 
     @abstractmethod
     async def get_privacy_age(self, user_id: int) -> Optional[PrivacyType]:
@@ -238,6 +327,92 @@ class Database(metaclass=ABCMeta):
     async def set_last_birthday_notification(self, user_id: int, new_date: dt.datetime):
         pass
 
+    # endregion
+    # region Birthday outbox
+
+    @abstractmethod
+    async def set_birthday_outbox(
+        self, user_id: int, fire_time: dt.datetime
+    ) -> Optional[dt.datetime]:
+        """
+        Add a pending birthday notification for a user to the outbox,
+        replacing the one they already have. A notification that is currently
+        being sent is left alone, and one that is waiting to be retried keeps
+        its attempt count and retry time.
+
+        :param user_id: the user's Discord ID
+        :param fire_time: the timezone-aware datetime to send the notification
+        :return: the time the pending notification will be sent, or None if
+            the user's notification is currently being sent
+        """
+        pass
+
+    @abstractmethod
+    async def delete_birthday_outbox(self, user_id: int):
+        """
+        Remove a user's birthday notification from the outbox, unless it is
+        currently being sent.
+
+        :param user_id: the user's Discord ID
+        """
+        pass
+
+    @abstractmethod
+    async def recover_birthday_outbox(
+        self, expire_before: Optional[dt.datetime] = None
+    ) -> list[tuple[int, dt.datetime]]:
+        """
+        Get all birthday notifications which haven't been sent yet. Any that
+        were being sent (e.g. when the bot stopped mid-send) are made pending
+        again so they can be retried. This should be called on startup.
+
+        :param expire_before: notifications with a fire time before this are
+            too late to send, so they're marked as failed instead of being
+            recovered
+        :return: a list of (user_id, fire_time)
+        """
+        pass
+
+    @abstractmethod
+    async def claim_birthday_outbox(
+        self, user_id: int, expire_before: Optional[dt.datetime] = None
+    ) -> Optional[int]:
+        """
+        Atomically mark a user's pending birthday notification as being sent.
+
+        :param user_id: the user's Discord ID
+        :param expire_before: if the notification's fire time is before this,
+            it's too late to send, so it's marked as failed instead
+        :return: the number of this attempt (starting at 1), or None if the
+            user has no pending notification (e.g. it was canceled, already
+            sent, or expired)
+        """
+        pass
+
+    @abstractmethod
+    async def release_birthday_outbox(
+        self, user_id: int, retry_time: Optional[dt.datetime]
+    ):
+        """
+        Mark a user's claimed birthday notification as failed.
+
+        :param user_id: the user's Discord ID
+        :param retry_time: when to try sending it again. If None, the
+            notification will not be retried.
+        """
+        pass
+
+    @abstractmethod
+    async def complete_birthday_outbox(self, user_id: int, sent_time: dt.datetime):
+        """
+        Mark a user's claimed birthday notification as sent and set their last
+        birthday notification time, both in one transaction.
+
+        :param user_id: the user's Discord ID
+        :param sent_time: the time the notification was sent
+        """
+        pass
+
     # endregion
     # region Guild settings
 
@@ -251,4 +426,17 @@ class Database(metaclass=ABCMeta):
     ):
         pass
 
+    @abstractmethod
+    async def get_guild_birthday_channels(
+        self, guild_ids: Iterable[int]
+    ) -> dict[int, int]:
+        """
+        Get the birthday channels of many guilds at once.
+
+        :param guild_ids: the Discord IDs of the guilds to get
+        :return: a mapping of guild_id -> birthday channel ID. Guilds without
+            a birthday channel are omitted.
+        """
+        pass
+
     # endregion
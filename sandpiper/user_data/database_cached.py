@@ -0,0 +1,325 @@
+__all__ = ["CachedDatabase"]
+
+from collections.abc import Iterable
+import datetime as dt
+import logging
+from typing import Annotated, Optional
+
+from sandpiper.common.cache import MISSING, CacheStats, LRUCache
+from sandpiper.common.time import TimezoneType
+from .database import *
+from .enums import PrivacyType
+
+logger = logging.getLogger(__name__)
+
+
+class CachedDatabase(Database):
+    """
+    A write-through caching layer that wraps another database adapter.
+
+    Users are cached as ``UserSnapshot`` objects in an LRU, so all of a
+    user's per-field getters are served from a single cached row. Users who
+    aren't in the database are cached too, so repeated lookups for users
+    with no data don't hit the database either. Every write to a user
+    invalidates their entry; everything else is passed through to the
+    wrapped adapter.
+    """
+
+    def __init__(
+        self, database: Database, *, max_users: int = 1024, ttl: Optional[float] = None
+    ):
+        """
+        :param database: the database adapter to wrap
+        :param max_users: the maximum number of users to keep in the cache
+        :param ttl: if not None, cached users expire after this many seconds
+        """
+        self.database = database
+        # user_id -> snapshot, or None if the user isn't in the database
+        self._users: LRUCache[int, Optional[UserSnapshot]] = LRUCache(max_users, ttl)
+        # Incremented on every write so reads that were in flight during a
+        # write don't put stale data back in the cache
+        self._write_epoch = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._users.stats()
+
+    def clear_cache(self):
+        self._users.clear()
+
+    def _invalidate(self, user_id: int):
+        self._write_epoch += 1
+        self._users.invalidate(user_id)
+
+    async def _get_cached_user(self, user_id: int) -> Optional[UserSnapshot]:
+        snapshot = self._users.get(user_id, MISSING)
+        if snapshot is not MISSING:
+            return snapshot
+
+        epoch = self._write_epoch
+        try:
+            snapshot = await self.database.get_user_snapshot(user_id)
+        except UserNotInDatabase:
+            snapshot = None
+        if epoch == self._write_epoch:
+            self._users.set(user_id, snapshot)
+        return snapshot
+
+    async def _get_user_or_raise(self, user_id: int) -> UserSnapshot:
+        snapshot = await self._get_cached_user(user_id)
+        if snapshot is None:
+            raise UserNotInDatabase
+        return snapshot
+
+    async def _get_privacy(
+        self, field_name: str, user_id: int
+    ) -> Optional[PrivacyType]:
+        snapshot = await self._get_cached_user(user_id)
+        if snapshot is None:
+            return None
+        return getattr(snapshot, f"privacy_{field_name}")
+
+    # region Lifecycle
+
+    async def connect(self):
+        await self.database.connect()
+
+    async def disconnect(self):
+        logger.info("User cache stats at disconnect (%s)", self.stats)
+        self.clear_cache()
+        await self.database.disconnect()
+
+    async def connected(self) -> bool:
+        return await self.database.connected()
+
+    async def ready(self):
+        await self.database.ready()
+
+    # endregion
+    # region Sandpiper meta
+
+    async def get_sandpiper_version(self) -> str:
+        return await self.database.get_sandpiper_version()
+
+    async def set_sandpiper_version(self, new_version: str):
+        await self.database.set_sandpiper_version(new_version)
+
+    # endregion
+    # region Full user
+
+    async def create_user(self, user_id: int):
+        try:
+            await self.database.create_user(user_id)
+        finally:
+            self._invalidate(user_id)
+
+    async def get_user_snapshot(self, user_id: int) -> UserSnapshot:
+        return await self._get_user_or_raise(user_id)
+
+    async def get_users_bulk(self, user_ids: Iterable[int]) -> dict[int, UserSnapshot]:
+        snapshots = {}
+        uncached = []
+        for user_id in dict.fromkeys(user_ids):
+            snapshot = self._users.get(user_id, MISSING)
+            if snapshot is MISSING:
+                uncached.append(user_id)
+            elif snapshot is not None:
+                snapshots[user_id] = snapshot
+
+        if uncached:
+            epoch = self._write_epoch
+            fetched = await self.database.get_users_bulk(uncached)
+            if epoch == self._write_epoch:
+                for user_id in uncached:
+                    self._users.set(user_id, fetched.get(user_id))
+            snapshots.update(fetched)
+        return snapshots
+
+    async def update_user(self, user_id: int, **fields):
+        try:
+            await self.database.update_user(user_id, **fields)
+        finally:
+            self._invalidate(user_id)
+
+    async def delete_user(self, user_id: int):
+        try:
+            await self.database.delete_user(user_id)
+        finally:
+            self._invalidate(user_id)
+
+    async def get_all_user_ids(self) -> list[int]:
+        return await self.database.get_all_user_ids()
+
+    # endregion
+    # region Preferred name
+
+    async def get_preferred_name(self, user_id: int) -> Optional[str]:
+        return (await self._get_user_or_raise(user_id)).preferred_name
+
+    async def set_preferred_name(self, user_id: int, new_preferred_name: Optional[str]):
+        try:
+            await self.database.set_preferred_name(user_id, new_preferred_name)
+        finally:
+            self._invalidate(user_id)
+
+    async def get_privacy_preferred_name(self, user_id: int) -> Optional[PrivacyType]:
+        return await self._get_privacy("preferred_name", user_id)
+
+    async def set_privacy_preferred_name(self, user_id: int, new_privacy: PrivacyType):
+        try:
+            await self.database.set_privacy_preferred_name(user_id, new_privacy)
+        finally:
+            self._invalidate(user_id)
+
+    async def find_users_by_preferred_name(self, name: str) -> list[tuple[int, str]]:
+        return await self.database.find_users_by_preferred_name(name)
+
+    # endregion
+    # region Pronouns
+
+    async def get_pronouns(self, user_id: int) -> Optional[str]:
+        return (await self._get_user_or_raise(user_id)).pronouns
+
+    async def set_pronouns(self, user_id: int, new_pronouns: Optional[str]):
+        try:
+            await self.database.set_pronouns(user_id, new_pronouns)
+        finally:
+            self._invalidate(user_id)
+
+    async def get_privacy_pronouns(self, user_id: int) -> Optional[PrivacyType]:
+        return await self._get_privacy("pronouns", user_id)
+
+    async def set_privacy_pronouns(self, user_id: int, new_privacy: PrivacyType):
+        try:
+            await self.database.set_privacy_pronouns(user_id, new_privacy)
+        finally:
+            self._invalidate(user_id)
+
+    # endregion
+    # region Birthday
+
+    async def get_birthday(self, user_id: int) -> Optional[dt.date]:
+        return (await self._get_user_or_raise(user_id)).birthday
+
+    async def set_birthday(self, user_id: int, new_birthday: Optional[dt.date]):
+        try:
+            await self.database.set_birthday(user_id, new_birthday)
+        finally:
+            self._invalidate(user_id)
+
+    async def get_privacy_birthday(self, user_id: int) -> Optional[PrivacyType]:
+        return await self._get_privacy("birthday", user_id)
+
+    async def set_privacy_birthday(self, user_id: int, new_privacy: PrivacyType):
+        try:
+            await self.database.set_privacy_birthday(user_id, new_privacy)
+        finally:
+            self._invalidate(user_id)
+
+    async def get_birthdays_range(
+        self,
+        start: dt.date,
+        end: dt.date,
+        max_last_notification_time: Optional[dt.date] = None,
+    ) -> list[tuple[Annotated[int, "user_id"], dt.date]]:
+        return await self.database.get_birthdays_range(
+            start, end, max_last_notification_time
+        )
+
+    # endregion
+    # region Age
+
+    async def get_privacy_age(self, user_id: int) -> Optional[PrivacyType]:
+        return await self._get_privacy("age", user_id)
+
+    async def set_privacy_age(self, user_id: int, new_privacy: PrivacyType):
+        try:
+            await self.database.set_privacy_age(user_id, new_privacy)
+        finally:
+            self._invalidate(user_id)
+
+    # endregion
+    # region Timezone
+
+    async def get_timezone(self, user_id: int) -> Optional[TimezoneType]:
+        return (await self._get_user_or_raise(user_id)).timezone
+
+    async def set_timezone(self, user_id: int, new_timezone: Optional[TimezoneType]):
+        try:
+            await self.database.set_timezone(user_id, new_timezone)
+        finally:
+            self._invalidate(user_id)
+
+    async def get_privacy_timezone(self, user_id: int) -> Optional[PrivacyType]:
+        return await self._get_privacy("timezone", user_id)
+
+    async def set_privacy_timezone(self, user_id: int, new_privacy: PrivacyType):
+        try:
+            await self.database.set_privacy_timezone(user_id, new_privacy)
+        finally:
+            self._invalidate(user_id)
+
+    async def get_all_timezones(self) -> list[tuple[int, TimezoneType]]:
+        return await self.database.get_all_timezones()
+
+    # endregion
+    # region Other user stuff
+
+    async def get_last_birthday_notification(self, user_id: int) -> dt.datetime:
+        return (await self._get_user_or_raise(user_id)).last_birthday_notification
+
+    async def set_last_birthday_notification(self, user_id: int, new_date: dt.datetime):
+        try:
+            await self.database.set_last_birthday_notification(user_id, new_date)
+        finally:
+            self._invalidate(user_id)
+
+    # endregion
+    # region Birthday outbox
+
+    async def set_birthday_outbox(
+        self, user_id: int, fire_time: dt.datetime
+    ) -> Optional[dt.datetime]:
+        return await self.database.set_birthday_outbox(user_id, fire_time)
+
+    async def delete_birthday_outbox(self, user_id: int):
+        await self.database.delete_birthday_outbox(user_id)
+
+    async def recover_birthday_outbox(
+        self, expire_before: Optional[dt.datetime] = None
+    ) -> list[tuple[int, dt.datetime]]:
+        return await self.database.recover_birthday_outbox(expire_before)
+
+    async def claim_birthday_outbox(
+        self, user_id: int, expire_before: Optional[dt.datetime] = None
+    ) -> Optional[int]:
+        return await self.database.claim_birthday_outbox(user_id, expire_before)
+
+    async def release_birthday_outbox(
+        self, user_id: int, retry_time: Optional[dt.datetime]
+    ):
+        await self.database.release_birthday_outbox(user_id, retry_time)
+
+    async def complete_birthday_outbox(self, user_id: int, sent_time: dt.datetime):
+        try:
+            await self.database.complete_birthday_outbox(user_id, sent_time)
+        finally:
+            self._invalidate(user_id)
+
+    # endregion
+    # region Guild settings
+
+    async def get_guild_birthday_channel(self, guild_id: int) -> Optional[int]:
+        return await self.database.get_guild_birthday_channel(guild_id)
+
+    async def set_guild_birthday_channel(
+        self, guild_id: int, new_birthday_channel: Optional[int]
+    ):
+        await self.database.set_guild_birthday_channel(guild_id, new_birthday_channel)
+
+    async def get_guild_birthday_channels(
+        self, guild_ids: Iterable[int]
+    ) -> dict[int, int]:
+        return await self.database.get_guild_birthday_channels(guild_ids)
+
+    # endregion
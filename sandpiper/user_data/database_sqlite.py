@@ -1,5 +1,9 @@
+__all__ = ["DatabaseSQLite", "SQLiteEngineProfile"]
+
 import asyncio
+from collections.abc import Iterable, Iterator
 from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
 import datetime as dt
 import logging
 from pathlib import Path
@@ -7,6 +11,7 @@ from typing import Annotated, Any, Callable, Optional, Union, cast
 
 import pytz
 import sqlalchemy as sa
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
@@ -15,18 +20,75 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from sandpiper.common.time import TimezoneType
 from . import alembic_utils as alembic_utils
 from .database import *
-from .enums import PrivacyType
-from .models import Base, Guild, SandpiperMeta, User
+from .enums import OutboxState, PrivacyType
+from .models import Base, BirthdayOutbox, Guild, SandpiperMeta, User
 
 logger = logging.getLogger(__name__)
+# Every read and write of user data is logged here. There are a lot of them,
+# so they're usually sampled (see ``SandpiperConfig._Logging``).
+access_logger = logging.getLogger("sandpiper.user_data.access")
 
 T_Sessionmaker = Callable[[], AbstractAsyncContextManager[AsyncSession]]
 
 
+@dataclass(frozen=True)
+class SQLiteEngineProfile:
+    """
+    Pragmas and pooling for SQLite connections. Pragmas are run on every new
+    connection; a field set to None leaves SQLite's default alone.
+    """
+
+    # WAL lets readers keep reading while a write is in progress
+    journal_mode: Optional[str] = "WAL"
+    # NORMAL is safe from corruption in WAL mode and syncs much less often
+    synchronous: Optional[str] = "NORMAL"
+    # Milliseconds to wait for a lock before raising "database is locked"
+    busy_timeout: Optional[int] = 5000
+    # Size of the page cache in KiB
+    cache_size: Optional[int] = 16384
+    # Maximum bytes of the database file to memory-map, in MiB
+    mmap_size: Optional[int] = 64
+    temp_store: Optional[str] = "MEMORY"
+    # Number of connections to keep open to a database file. If None, a new
+    # connection is opened for every session, which is SQLAlchemy's default.
+    pool_size: Optional[int] = 5
+
+    @classmethod
+    def sqlite_defaults(cls) -> "SQLiteEngineProfile":
+        """A profile that leaves all of SQLite's and SQLAlchemy's defaults alone"""
+        return cls(
+            journal_mode=None,
+            synchronous=None,
+            busy_timeout=None,
+            cache_size=None,
+            mmap_size=None,
+            temp_store=None,
+            pool_size=None,
+        )
+
+    def pragmas(self) -> list[str]:
+        pragmas = []
+        if self.journal_mode is not None:
+            pragmas.append(f"journal_mode = {self.journal_mode}")
+        if self.synchronous is not None:
+            pragmas.append(f"synchronous = {self.synchronous}")
+        if self.busy_timeout is not None:
+            pragmas.append(f"busy_timeout = {int(self.busy_timeout)}")
+        if self.cache_size is not None:
+            # Negative sizes are in KiB rather than pages
+            pragmas.append(f"cache_size = {-int(self.cache_size)}")
+        if self.mmap_size is not None:
+            pragmas.append(f"mmap_size = {int(self.mmap_size) * 1024 * 1024}")
+        if self.temp_store is not None:
+            pragmas.append(f"temp_store = {self.temp_store}")
+        return pragmas
+
+
 class DatabaseSQLite(Database):
 
     _connected: bool = False
@@ -35,14 +97,28 @@ class DatabaseSQLite(Database):
     db_path: Union[str, Path]
     bot_user_id: Optional[int] = None
 
-    def __init__(self, db_path: Union[str, Path]):
+    # Older SQLite versions allow at most 999 bound parameters per statement
+    MAX_BOUND_PARAMETERS = 500
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        profile: Optional[SQLiteEngineProfile] = None,
+    ):
+        """
+        :param db_path: the path to the database file, or ":memory:"
+        :param profile: pragmas and pooling for the database's connections.
+            If None, the default ``SQLiteEngineProfile`` is used.
+        """
         if isinstance(db_path, Path):
             db_path = db_path.absolute()
         self.db_path = db_path
+        self.profile = profile if profile is not None else SQLiteEngineProfile()
         self._ready_fut = None
+        self._build_statements()
 
     async def connect(self):
-        logger.info(f"Connecting to database (path={self.db_path})")
+        logger.info("Connecting to database (path=%s)", self.db_path)
         if self._connected:
             raise RuntimeError("Database is already connected")
         self._connected = True
@@ -51,9 +127,7 @@ class DatabaseSQLite(Database):
         # Let dependents await until ready
         self._ready_fut = loop.create_future()
 
-        self._engine = create_async_engine(
-            f"sqlite+aiosqlite:///{self.db_path}", echo=False, future=True
-        )
+        self._engine = self._create_engine()
         self._session_maker = cast(
             T_Sessionmaker,
             sessionmaker(self._engine, expire_on_commit=False, class_=AsyncSession),
@@ -63,8 +137,37 @@ class DatabaseSQLite(Database):
 
         self._ready_fut.set_result(None)
 
+    def _create_engine(self) -> AsyncEngine:
+        engine_kwargs = {}
+        # An in-memory database only lives as long as its connection, so it
+        # must keep SQLAlchemy's default single shared connection
+        if self.profile.pool_size is not None and self.db_path != ":memory:":
+            engine_kwargs.update(
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=self.profile.pool_size,
+                max_overflow=0,
+            )
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{self.db_path}",
+            echo=False,
+            future=True,
+            **engine_kwargs,
+        )
+
+        pragmas = self.profile.pragmas()
+        if pragmas:
+
+            @sa.event.listens_for(engine.sync_engine, "connect")
+            def set_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                for pragma in pragmas:
+                    cursor.execute(f"PRAGMA {pragma}")
+                cursor.close()
+
+        return engine
+
     async def disconnect(self):
-        logger.info(f"Disconnecting from database (path={self.db_path})")
+        logger.info("Disconnecting from database (path=%s)", self.db_path)
         if not self._connected:
             raise RuntimeError("Database is not connected")
         self._connected = False
@@ -147,71 +250,103 @@ class DatabaseSQLite(Database):
             session.add(sandpiper_meta)
             return sandpiper_meta
 
-    @staticmethod
-    async def _get_user(
-        session: AsyncSession, user_id: int, create_if_missing=True
-    ) -> Optional[User]:
-        try:
-            return (
-                await session.execute(sa.select(User).where(User.user_id == user_id))
-            ).scalar_one()
-        except NoResultFound:
-            if not create_if_missing:
-                return None
-            user = User(user_id=user_id)
-            session.add(user)
-            return user
+    @classmethod
+    def _chunked(cls, ids: list[int]) -> Iterator[list[int]]:
+        """
+        Split IDs into chunks for IN clauses, to stay under SQLite's bound
+        parameter limit.
+        """
+        for i in range(0, len(ids), cls.MAX_BOUND_PARAMETERS):
+            yield ids[i : i + cls.MAX_BOUND_PARAMETERS]
 
     @staticmethod
-    async def _get_guild(session: AsyncSession, guild_id: int) -> Guild:
-        try:
-            return (
-                await session.execute(
-                    sa.select(Guild).where(Guild.guild_id == guild_id)
-                )
-            ).scalar_one()
-        except NoResultFound:
-            guild = Guild(guild_id=guild_id)
-            session.add(guild)
-            return guild
+    def _row_to_snapshot(row: sa.engine.Row) -> UserSnapshot:
+        return UserSnapshot(
+            user_id=row.user_id,
+            preferred_name=row.preferred_name,
+            pronouns=row.pronouns,
+            birthday=row.birthday,
+            timezone=pytz.timezone(row.timezone) if row.timezone else None,
+            privacy_preferred_name=PrivacyType(row.privacy_preferred_name),
+            privacy_pronouns=PrivacyType(row.privacy_pronouns),
+            privacy_birthday=PrivacyType(row.privacy_birthday),
+            privacy_age=PrivacyType(row.privacy_age),
+            privacy_timezone=PrivacyType(row.privacy_timezone),
+            last_birthday_notification=row.last_birthday_notification,
+        )
+
+    def _build_statements(self):
+        """
+        Build the statements for frequent lookups once, with the IDs as bound
+        parameters. Reusing the same statement objects skips building them
+        and lets SQLAlchemy reuse their memoized cache keys to find the
+        compiled SQL in its cache.
+        """
+        user_id = sa.bindparam("user_id", type_=User.user_id.type)
+        # Column name -> SELECT of that column for one user
+        self._user_field_statements: dict[str, sa.sql.Select] = {
+            column.name: sa.select(column).where(User.user_id == user_id)
+            for column in User.__table__.columns
+        }
+        self._user_snapshot_statement = sa.select(*User.__table__.columns).where(
+            User.user_id == user_id
+        )
+        self._guild_birthday_channel_statement = sa.select(
+            Guild.birthday_channel
+        ).where(Guild.guild_id == sa.bindparam("guild_id", type_=Guild.guild_id.type))
 
     async def _get_user_field(self, field_name: str, user_id: int) -> Optional[Any]:
-        logger.info(f"Getting {field_name} (user_id={user_id})")
+        access_logger.info("Getting %s (user_id=%s)", field_name, user_id)
         async with self._session_maker() as session, session.begin():
             try:
                 return (
                     await session.execute(
-                        sa.select(getattr(User, field_name)).where(
-                            User.user_id == user_id
-                        )
+                        self._user_field_statements[field_name], {"user_id": user_id}
                     )
                 ).scalar_one()
             except NoResultFound:
                 raise UserNotInDatabase
 
+    @staticmethod
+    async def _upsert_user(session: AsyncSession, user_id: int, **values: Any):
+        """
+        Set columns of a user's row in a single statement, creating the row
+        if it doesn't exist.
+        """
+        await session.execute(
+            sqlite_insert(User)
+            .values(user_id=user_id, **values)
+            .on_conflict_do_update(index_elements=[User.user_id], set_=values)
+        )
+
+    @staticmethod
+    async def _update_existing_user(session: AsyncSession, user_id: int, **values: Any):
+        """
+        Set columns of a user's row without creating it.
+
+        :raises UserNotInDatabase: if the user doesn't have a row
+        """
+        result = await session.execute(
+            sa.update(User)
+            .where(User.user_id == user_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            raise UserNotInDatabase
+
     async def _set_user_field(self, field_name: str, user_id: int, value: Any):
-        logger.info(f"Setting {field_name} (user_id={user_id}, new_value={value})")
-        async with self._session_maker() as session, session.begin():
-            if value is None:
-                # When using the delete command, it sends None. We don't want
-                # to create a new user if they're just trying to delete data
-                user = await self._get_user(session, user_id, create_if_missing=False)
-                if user is None:
-                    raise UserNotInDatabase
-            else:
-                user = await self._get_user(session, user_id)
-            setattr(user, field_name, value)
+        await self.update_user(user_id, **{field_name: value})
 
     async def _get_user_privacy_field(
         self, field_name: str, user_id: int
     ) -> Optional[PrivacyType]:
-        logger.info(f"Getting {field_name} privacy (user_id={user_id})")
+        access_logger.info("Getting %s privacy (user_id=%s)", field_name, user_id)
         async with self._session_maker() as session, session.begin():
             privacy = (
                 await session.execute(
-                    sa.select(getattr(User, f"privacy_{field_name}")).where(
-                        User.user_id == user_id
-                    )
+                    self._user_field_statements[f"privacy_{field_name}"],
+                    {"user_id": user_id},
                 )
             ).scalar()
             return PrivacyType(privacy) if privacy is not None else None
@@ -219,19 +354,13 @@ class DatabaseSQLite(Database):
     async def _set_user_privacy_field(
         self, field_name: str, user_id: int, new_privacy: PrivacyType
     ):
-        logger.info(
-            f"Setting {field_name} privacy (user_id={user_id} "
-            f"new_value={new_privacy})"
-        )
-        async with self._session_maker() as session, session.begin():
-            user = await self._get_user(session, user_id)
-            setattr(user, f"privacy_{field_name}", new_privacy)
+        await self.update_user(user_id, **{f"privacy_{field_name}": new_privacy})
 
     # endregion
     # region Sandpiper meta
 
     async def get_sandpiper_version(self) -> str:
-        logger.info(f"Getting Sandpiper version")
+        access_logger.info("Getting Sandpiper version")
         async with self._session_maker() as session, session.begin():
             return (
                 await session.execute(
@@ -240,7 +369,7 @@ class DatabaseSQLite(Database):
             ).scalar()
 
     async def set_sandpiper_version(self, new_version: str):
-        logger.info(f"Setting Sandpiper version (new_value={new_version})")
+        logger.info("Setting Sandpiper version (new_value=%s)", new_version)
         async with self._session_maker() as session, session.begin():
             sandpiper_meta = await self._get_sandpiper_meta(session)
             sandpiper_meta.version = new_version
@@ -249,18 +378,84 @@ class DatabaseSQLite(Database):
     # region Full user
 
     async def create_user(self, user_id: int):
-        logger.info(f"Creating user (user_id={user_id})")
+        logger.info("Creating user (user_id=%s)", user_id)
         async with self._session_maker() as session, session.begin():
             user = User(user_id=user_id)
             session.add(user)
 
+    async def get_user_snapshot(self, user_id: int) -> UserSnapshot:
+        access_logger.info("Getting user snapshot (user_id=%s)", user_id)
+        async with self._session_maker() as session, session.begin():
+            row = (
+                await session.execute(
+                    self._user_snapshot_statement, {"user_id": user_id}
+                )
+            ).one_or_none()
+        if row is None:
+            raise UserNotInDatabase
+        return self._row_to_snapshot(row)
+
+    async def get_users_bulk(self, user_ids: Iterable[int]) -> dict[int, UserSnapshot]:
+        user_ids = list(dict.fromkeys(user_ids))
+        access_logger.info("Getting users in bulk (count=%s)", len(user_ids))
+        if not user_ids:
+            return {}
+
+        snapshots = {}
+        async with self._session_maker() as session, session.begin():
+            for chunk in self._chunked(user_ids):
+                rows = await session.execute(
+                    sa.select(*User.__table__.columns).where(User.user_id.in_(chunk))
+                )
+                for row in rows:
+                    snapshots[row.user_id] = self._row_to_snapshot(row)
+        return snapshots
+
+    async def update_user(self, user_id: int, **fields):
+        # Only log the field names, since the values are personal data
+        access_logger.info(
+            "Updating user (user_id=%s, fields=%s)", user_id, ", ".join(sorted(fields))
+        )
+        if unknown := fields.keys() - USER_FIELDS:
+            raise ValueError(f"Unknown user fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+
+        values = dict(fields)
+        for name, value in fields.items():
+            if name.startswith("privacy_"):
+                # Privacies can't be null, so check them here instead of
+                # letting the database raise an IntegrityError
+                try:
+                    values[name] = PrivacyType(value)
+                except ValueError:
+                    raise DatabaseError(f"Invalid privacy for {name}: {value!r}")
+        if "timezone" in values and values["timezone"] is not None:
+            values["timezone"] = values["timezone"].zone
+        if "birthday" in values:
+            birthday = values["birthday"]
+            values["birthday_month_day"] = (
+                self._month_day(birthday) if birthday is not None else None
+            )
+
+        async with self._session_maker() as session, session.begin():
+            if all(value is None for value in fields.values()):
+                # When using the delete command, it sends None. We don't want
+                # to create a new user if they're just trying to delete data
+                await self._update_existing_user(session, user_id, **values)
+            else:
+                await self._upsert_user(session, user_id, **values)
+
     async def delete_user(self, user_id: int):
-        logger.info(f"Deleting user (user_id={user_id})")
+        logger.info("Deleting user (user_id=%s)", user_id)
         async with self._session_maker() as session, session.begin():
             await session.execute(sa.delete(User).where(User.user_id == user_id))
+            await session.execute(
+                sa.delete(BirthdayOutbox).where(BirthdayOutbox.user_id == user_id)
+            )
 
     async def get_all_user_ids(self) -> list[int]:
-        logger.info(f"Getting all user IDs")
+        access_logger.info("Getting all user IDs")
         async with self._session_maker() as session, session.begin():
             return (await session.execute(sa.select(User.user_id))).scalars().all()
 
@@ -280,9 +475,9 @@ class DatabaseSQLite(Database):
         await self._set_user_privacy_field("preferred_name", user_id, new_privacy)
 
     async def find_users_by_preferred_name(self, name: str) -> list[tuple[int, str]]:
-        logger.info(f"Finding users by preferred name (name={name})")
+        access_logger.info("Finding users by preferred name (name=%s)", name)
         if name == "":
-            logger.info("Skipping empty string")
+            access_logger.info("Skipping empty string")
             return []
 
         async with self._session_maker() as session, session.begin():
@@ -325,38 +520,8 @@ class DatabaseSQLite(Database):
         await self._set_user_privacy_field("birthday", user_id, new_privacy)
 
     @staticmethod
-    def _birthday_range_predicate(start: dt.date, end: dt.date):
-        wrap = (32 * start.month + start.day) > (32 * end.month + end.day)
-
-        def f(d: dt.date) -> bool:
-            if wrap:
-                # Start date goes forward and wraps around the year to end date
-                if end.month < d.month < start.month:
-                    # Between the start and end months
-                    return False
-            else:
-                if d.month < start.month or d.month > end.month:
-                    # Around the start and end months
-                    return False
-
-            if wrap and (d.month == start.month and d.month == end.month):
-                # We're wrapping around and the start/end month are the same.
-                # This means there will be a little sliver of exclusion within
-                # this month, between the end and start day.
-                if end.day < d.day < start.day:
-                    return False
-            else:
-                # Otherwise we just need to ensure the day is greater/less than
-                # the target days if this date's month equals either of the
-                # bounded dates' months
-                if d.month == start.month and d.day < start.day:
-                    return False
-                if d.month == end.month and d.day > end.day:
-                    return False
-
-            return True
-
-        return f
+    def _month_day(d: dt.date) -> int:
+        return d.month * 100 + d.day
 
     async def get_birthdays_range(
         self,
@@ -364,17 +529,30 @@ class DatabaseSQLite(Database):
         end: dt.date,
         max_last_notification_time: Optional[dt.date] = None,
     ) -> list[tuple[Annotated[int, "user_id"], dt.date]]:
-        logger.info(
-            f"Getting all birthdays between {start.day}-{start.month} and "
-            f"{end.day}-{end.month}"
+        access_logger.info(
+            "Getting all birthdays between %s-%s and %s-%s",
+            start.day,
+            start.month,
+            end.day,
+            end.month,
         )
         if not isinstance(start, dt.date) or not isinstance(end, dt.date):
             raise TypeError("start and end must be instances of datetime.date")
 
+        start_month_day = self._month_day(start)
+        end_month_day = self._month_day(end)
+        if start_month_day <= end_month_day:
+            in_range = User.birthday_month_day.between(start_month_day, end_month_day)
+        else:
+            # Start date goes forward and wraps around the year to end date
+            in_range = (User.birthday_month_day >= start_month_day) | (
+                User.birthday_month_day <= end_month_day
+            )
+
         async with self._session_maker() as session, session.begin():
             stmt = (
                 sa.select(User.user_id, User.birthday)
-                .where(User.birthday.isnot(None))
+                .where(in_range)
                 .where(User.privacy_birthday == PrivacyType.PUBLIC)
             )
             if max_last_notification_time is not None:
@@ -382,14 +560,7 @@ class DatabaseSQLite(Database):
                     User.last_birthday_notification.is_(None)
                     | (User.last_birthday_notification <= max_last_notification_time)
                 )
-            birthdays_unfiltered = (await session.execute(stmt)).all()
-
-        return list(
-            filter(
-                lambda r: self._birthday_range_predicate(start, end)(r[1]),
-                birthdays_unfiltered,
-            )
-        )
+            return (await session.execute(stmt)).all()
 
     # endregion
     # region Age
@@ -410,8 +581,6 @@ class DatabaseSQLite(Database):
         return None
 
     async def set_timezone(self, user_id: int, new_timezone: Optional[TimezoneType]):
-        if new_timezone:
-            new_timezone = new_timezone.zone
         await self._set_user_field("timezone", user_id, new_timezone)
 
     async def get_privacy_timezone(self, user_id: int) -> Optional[PrivacyType]:
@@ -421,7 +590,7 @@ class DatabaseSQLite(Database):
         await self._set_user_privacy_field("timezone", user_id, new_privacy)
 
     async def get_all_timezones(self) -> list[tuple[int, TimezoneType]]:
-        logger.info(f"Getting all user timezones")
+        access_logger.info("Getting all user timezones")
         async with self._session_maker() as session, session.begin():
             stmt = (
                 sa.select(User.user_id, User.timezone)
@@ -442,15 +611,173 @@ class DatabaseSQLite(Database):
     async def set_last_birthday_notification(self, user_id: int, new_date: dt.datetime):
         await self._set_user_field("last_birthday_notification", user_id, new_date)
 
+    # endregion
+    # region Birthday outbox
+
+    @staticmethod
+    def _to_naive_utc(d: dt.datetime) -> dt.datetime:
+        return d.astimezone(pytz.utc).replace(tzinfo=None)
+
+    @staticmethod
+    def _expire_outbox_statement(expire_before: dt.datetime) -> sa.sql.Update:
+        return (
+            sa.update(BirthdayOutbox)
+            .where(BirthdayOutbox.state == OutboxState.PENDING)
+            .where(BirthdayOutbox.fire_time < expire_before)
+            .values(state=OutboxState.FAILED)
+        )
+
+    async def set_birthday_outbox(
+        self, user_id: int, fire_time: dt.datetime
+    ) -> Optional[dt.datetime]:
+        logger.info(
+            "Setting birthday outbox (user_id=%s, fire_time=%s)", user_id, fire_time
+        )
+        fire_time = self._to_naive_utc(fire_time)
+        # A pending notification with attempts is waiting to be retried, so it
+        # keeps its attempt count and retry time. One that is being sent is
+        # not touched at all, otherwise it would be sent a second time.
+        retrying = sa.and_(
+            BirthdayOutbox.state == OutboxState.PENDING, BirthdayOutbox.attempts > 0
+        )
+        insert = sqlite_insert(BirthdayOutbox).values(
+            user_id=user_id,
+            fire_time=fire_time,
+            state=OutboxState.PENDING,
+            attempts=0,
+        )
+        async with self._session_maker() as session, session.begin():
+            await session.execute(
+                insert.on_conflict_do_update(
+                    index_elements=[BirthdayOutbox.user_id],
+                    set_={
+                        "fire_time": sa.case(
+                            (retrying, BirthdayOutbox.fire_time),
+                            else_=insert.excluded.fire_time,
+                        ),
+                        "state": OutboxState.PENDING,
+                        "attempts": sa.case(
+                            (retrying, BirthdayOutbox.attempts), else_=0
+                        ),
+                    },
+                    where=BirthdayOutbox.state != OutboxState.SENDING,
+                )
+            )
+            row = (
+                await session.execute(
+                    sa.select(BirthdayOutbox.state, BirthdayOutbox.fire_time).where(
+                        BirthdayOutbox.user_id == user_id
+                    )
+                )
+            ).one()
+            if row.state != OutboxState.PENDING:
+                return None
+            return pytz.utc.localize(row.fire_time)
+
+    async def delete_birthday_outbox(self, user_id: int):
+        logger.info("Deleting birthday outbox (user_id=%s)", user_id)
+        async with self._session_maker() as session, session.begin():
+            await session.execute(
+                sa.delete(BirthdayOutbox)
+                .where(BirthdayOutbox.user_id == user_id)
+                .where(BirthdayOutbox.state != OutboxState.SENDING)
+            )
+
+    async def recover_birthday_outbox(
+        self, expire_before: Optional[dt.datetime] = None
+    ) -> list[tuple[int, dt.datetime]]:
+        logger.info("Recovering birthday outbox (expire_before=%s)", expire_before)
+        async with self._session_maker() as session, session.begin():
+            await session.execute(
+                sa.update(BirthdayOutbox)
+                .where(BirthdayOutbox.state == OutboxState.SENDING)
+                .values(state=OutboxState.PENDING)
+            )
+            if expire_before is not None:
+                await session.execute(
+                    self._expire_outbox_statement(self._to_naive_utc(expire_before))
+                )
+            rows = await session.execute(
+                sa.select(BirthdayOutbox.user_id, BirthdayOutbox.fire_time).where(
+                    BirthdayOutbox.state == OutboxState.PENDING
+                )
+            )
+            return [
+                (user_id, pytz.utc.localize(fire_time)) for user_id, fire_time in rows
+            ]
+
+    async def claim_birthday_outbox(
+        self, user_id: int, expire_before: Optional[dt.datetime] = None
+    ) -> Optional[int]:
+        logger.info("Claiming birthday outbox (user_id=%s)", user_id)
+        async with self._session_maker() as session, session.begin():
+            if expire_before is not None:
+                await session.execute(
+                    self._expire_outbox_statement(
+                        self._to_naive_utc(expire_before)
+                    ).where(BirthdayOutbox.user_id == user_id)
+                )
+            result = await session.execute(
+                sa.update(BirthdayOutbox)
+                .where(BirthdayOutbox.user_id == user_id)
+                .where(BirthdayOutbox.state == OutboxState.PENDING)
+                .values(state=OutboxState.SENDING, attempts=BirthdayOutbox.attempts + 1)
+            )
+            if result.rowcount == 0:
+                return None
+            return (
+                await session.execute(
+                    sa.select(BirthdayOutbox.attempts).where(
+                        BirthdayOutbox.user_id == user_id
+                    )
+                )
+            ).scalar_one()
+
+    async def release_birthday_outbox(
+        self, user_id: int, retry_time: Optional[dt.datetime]
+    ):
+        logger.info(
+            "Releasing birthday outbox (user_id=%s, retry_time=%s)", user_id, retry_time
+        )
+        if retry_time is None:
+            values = {"state": OutboxState.FAILED}
+        else:
+            values = {
+                "state": OutboxState.PENDING,
+                "fire_time": self._to_naive_utc(retry_time),
+            }
+        async with self._session_maker() as session, session.begin():
+            await session.execute(
+                sa.update(BirthdayOutbox)
+                .where(BirthdayOutbox.user_id == user_id)
+                .where(BirthdayOutbox.state == OutboxState.SENDING)
+                .values(**values)
+            )
+
+    async def complete_birthday_outbox(self, user_id: int, sent_time: dt.datetime):
+        logger.info("Completing birthday outbox (user_id=%s)", user_id)
+        async with self._session_maker() as session, session.begin():
+            await session.execute(
+                sa.update(BirthdayOutbox)
+                .where(BirthdayOutbox.user_id == user_id)
+                .values(state=OutboxState.SENT)
+            )
+            await session.execute(
+                sa.update(User)
+                .where(User.user_id == user_id)
+                .values(last_birthday_notification=sent_time)
+                .execution_options(synchronize_session=False)
+            )
+
     # endregion
     # region Guilds
 
     async def get_guild_birthday_channel(self, guild_id: int) -> Optional[str]:
-        logger.info(f"Getting guild birthday_channel (guild_id={guild_id})")
+        access_logger.info("Getting guild birthday_channel (guild_id=%s)", guild_id)
         async with self._session_maker() as session, session.begin():
             return (
                 await session.execute(
-                    sa.select(Guild.birthday_channel).where(Guild.guild_id == guild_id)
+                    self._guild_birthday_channel_statement, {"guild_id": guild_id}
                 )
             ).scalar()
 
@@ -458,11 +785,37 @@ class DatabaseSQLite(Database):
         self, guild_id: int, new_birthday_channel: Optional[int]
     ):
         logger.info(
-            f"Setting guild birthday_channel (guild_id={guild_id}, "
-            f"new_value={new_birthday_channel})"
+            "Setting guild birthday_channel (guild_id=%s, new_value=%s)",
+            guild_id,
+            new_birthday_channel,
         )
         async with self._session_maker() as session, session.begin():
-            guild = await self._get_guild(session, guild_id)
-            guild.birthday_channel = new_birthday_channel
+            await session.execute(
+                sqlite_insert(Guild)
+                .values(guild_id=guild_id, birthday_channel=new_birthday_channel)
+                .on_conflict_do_update(
+                    index_elements=[Guild.guild_id],
+                    set_={"birthday_channel": new_birthday_channel},
+                )
+            )
+
+    async def get_guild_birthday_channels(
+        self, guild_ids: Iterable[int]
+    ) -> dict[int, int]:
+        guild_ids = list(dict.fromkeys(guild_ids))
+        access_logger.info("Getting guild birthday channels (count=%s)", len(guild_ids))
+        if not guild_ids:
+            return {}
+
+        channels = {}
+        async with self._session_maker() as session, session.begin():
+            for chunk in self._chunked(guild_ids):
+                rows = await session.execute(
+                    sa.select(Guild.guild_id, Guild.birthday_channel)
+                    .where(Guild.guild_id.in_(chunk))
+                    .where(Guild.birthday_channel.isnot(None))
+                )
+                channels.update(rows.all())
+        return channels
 
     # endregion
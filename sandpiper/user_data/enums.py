@@ -4,3 +4,10 @@ from enum import IntEnum
 class PrivacyType(IntEnum):
     PRIVATE = 0
     PUBLIC = 1
+
+
+class OutboxState(IntEnum):
+    PENDING = 0
+    SENDING = 1
+    SENT = 2
+    FAILED = 3
@@ -1,4 +1,5 @@
 from .base import Base
+from .birthday_outbox import BirthdayOutbox
 from .guild import Guild
 from .sandpiper_meta import SandpiperMeta
 from .user import User
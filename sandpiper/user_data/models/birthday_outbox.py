@@ -0,0 +1,21 @@
+from sqlalchemy import Column
+import sqlalchemy as sa
+
+from ._types import Snowflake
+from .base import Base
+from ..enums import OutboxState
+
+
+class BirthdayOutbox(Base):
+    __tablename__ = "birthday_outbox"
+    __mapper_args__ = {"eager_defaults": True}
+
+    # Each user has at most one birthday notification in the outbox
+    user_id = Column(Snowflake, primary_key=True)
+    fire_time = Column(sa.DateTime, nullable=False)
+    state = Column(
+        sa.SmallInteger,
+        nullable=False,
+        server_default=sa.text(str(OutboxState.PENDING.value)),
+    )
+    attempts = Column(sa.Integer, nullable=False, server_default=sa.text("0"))
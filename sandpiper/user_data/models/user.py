@@ -10,13 +10,19 @@ DEFAULT_PRIVACY = PrivacyType.PRIVATE.value
 
 class User(Base):
     __tablename__ = "users"
-    __table_args__ = (Index("index_users_preferred_name", "preferred_name"),)
+    __table_args__ = (
+        Index("index_users_preferred_name", "preferred_name"),
+        Index("index_users_birthday_month_day", "birthday_month_day"),
+    )
     __mapper_args__ = {"eager_defaults": True}
 
     user_id = Column(Snowflake, primary_key=True)
     preferred_name = Column(sa.String)
     pronouns = Column(sa.String)
     birthday = Column(sa.Date)
+    # The birthday's month and day as the integer MMDD, for range queries
+    # that ignore the year
+    birthday_month_day = Column(sa.SmallInteger)
     timezone = Column(sa.String)
 
     privacy_preferred_name = Column(